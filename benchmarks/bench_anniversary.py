@@ -0,0 +1,87 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：bench_anniversary.py
+@文档说明：
+节日索引和纪念日计算的性能基准
+"""
+import logging
+from datetime import timedelta
+
+from custom_components.date_time.anniversary import AnniversaryEngine, build_record, next_occurrence
+from custom_components.date_time.sensor import AnniversarySensor, CoordinatorData, DateCoordinator
+
+from conftest import FIXED_DAY, FIXED_NOW
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def bench_get_festival(benchmark, hass, peak_memory):
+    """查询今天起60天内每天的节日和下一个节日，索引每天只建一次"""
+    coordinator = DateCoordinator(hass, {}, _LOGGER)
+    days = [FIXED_DAY + timedelta(days=offset) for offset in range(60)]
+
+    def query_days():
+        return [coordinator.get_festival(day) for day in days]
+
+    peak_memory(query_days)
+    results = await hass.async_add_executor_job(benchmark, query_days)
+    assert results[0][1]['date'] > FIXED_DAY
+
+
+def bench_next_occurrence(benchmark, roster, peak_memory):
+    """逐个计算全部纪念日的下一次日期（对应原DateCoordinator._next_day）"""
+    engine = AnniversaryEngine(roster)
+    items = list(zip(engine.origins, engine.is_solar))
+
+    def next_dates():
+        return [next_occurrence(origin, is_solar, FIXED_DAY) for origin, is_solar in items]
+
+    peak_memory(next_dates)
+    assert min(benchmark(next_dates)) >= FIXED_DAY
+
+
+def bench_build_attributes(benchmark, roster, peak_memory):
+    """组装全部纪念日的数据（对应原DateCoordinator.get_anni_attributes），每个纪念日一个不可变的AnniversaryRecord"""
+    engine = AnniversaryEngine(roster)
+    engine.advance(FIXED_DAY)
+    ordinal = FIXED_DAY.toordinal()
+    update_time = FIXED_NOW.strftime('%m月%d日 %H:%M')
+    items = [
+        (entry, origin, FIXED_DAY + timedelta(days=next_ordinal - ordinal), next_ordinal - ordinal,
+         ordinal - origin.toordinal())
+        for entry, origin, next_ordinal in zip(engine.entries, engine.solar_origins, engine.next_ordinals)
+    ]
+
+    def build_all():
+        return [build_record(*item, update_time) for item in items]
+
+    peak_memory(build_all)
+    assert len(benchmark(build_all)) == len(roster)
+
+
+def bench_anniversary_engine_daily(benchmark, roster, peak_memory):
+    """纪念日引擎推进一天并组装全部数据，即每天定时刷新时的纪念日部分"""
+    def yesterday_engine():
+        engine = AnniversaryEngine(roster)
+        engine.advance(FIXED_DAY - timedelta(days=1))
+        return (engine, FIXED_NOW), {}
+
+    def next_day(engine, now):
+        return engine.build(now)
+
+    peak_memory(lambda: next_day(*yesterday_engine()[0]))
+    result = benchmark.pedantic(next_day, setup=yesterday_engine, rounds=200)
+    assert len(result) == len(roster)
+
+
+async def bench_anniversary_sensor_read(benchmark, hass, roster, peak_memory):
+    """读取全部纪念日传感器的名称、状态和属性，即写入状态时每个实体的读取；属性在数据变化时已生成"""
+    coordinator = DateCoordinator(hass, {'anniversaries': roster}, _LOGGER)
+    coordinator.data = CoordinatorData(None, coordinator.anniversary_engine.build(FIXED_NOW))
+    sensors = [AnniversarySensor(coordinator, key) for key in dict.fromkeys(coordinator.anniversary_engine.keys)]
+
+    def read_all():
+        return [(sensor.name, sensor.native_value, sensor.extra_state_attributes) for sensor in sensors]
+
+    peak_memory(read_all)
+    assert len(benchmark(read_all)) == len(sensors)
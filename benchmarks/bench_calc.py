@@ -0,0 +1,58 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：bench_calc.py
+@文档说明：
+节假日查询的性能基准
+"""
+from datetime import date, timedelta
+
+from custom_components.date_time.calc import RestDay
+from custom_components.date_time.holiday_store import HolidayStore, YearRecord, encode
+
+from conftest import FIXED_NOW, holidays_2025
+
+YEAR_DAYS = [date(2025, 1, 1) + timedelta(days=offset) for offset in range(365)]
+
+
+def bench_rest_day_query(benchmark, holiday_cache, peak_memory):
+    """逐日查询全年365天的节假日状态"""
+    rest_day = RestDay(FIXED_NOW, auto_update=False, cache=holiday_cache)
+    rest_day.get_this_year_holidays(auto_update=False)
+
+    def query_year():
+        return [rest_day.query(day) for day in YEAR_DAYS]
+
+    peak_memory(query_year)
+    states = benchmark(query_year)
+    assert states[0] == '节假日' and states.count('调休日') == 5
+
+
+def bench_rest_day_get_this_year_holidays(benchmark, holiday_cache, peak_memory):
+    """读取本地节假日数据，文件未变化时只比较文件签名"""
+    rest_day = RestDay(FIXED_NOW, cache=holiday_cache)
+    peak_memory(rest_day.get_this_year_holidays)
+    holidays = benchmark(rest_day.get_this_year_holidays)
+    assert '2025-10-01' in holidays
+
+
+def bench_rest_day_count_workdays(benchmark, holiday_cache, peak_memory):
+    """统计全年的工作日数"""
+    rest_day = RestDay(FIXED_NOW, auto_update=False, cache=holiday_cache)
+    peak_memory(rest_day.count_workdays, date(2025, 1, 1), date(2026, 1, 1))
+    assert benchmark(rest_day.count_workdays, date(2025, 1, 1), date(2026, 1, 1)) == 248
+
+
+def bench_holiday_store_open(benchmark, peak_memory):
+    """打开保存了100个年度的holiday.bin并解码其中一年：只解析文件头和年度目录，其余年度不解码"""
+    holidays = holidays_2025()
+    raw = encode(
+        YearRecord.from_holidays(year, {key.replace('2025', str(year), 1): value for key, value in holidays.items()})
+        for year in range(1950, 2050)
+    )
+
+    def open_year():
+        return HolidayStore(raw).record(2025)
+
+    peak_memory(open_year)
+    record = benchmark(open_year)
+    assert len(record.entries) == len(holidays)
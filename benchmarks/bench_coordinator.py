@@ -0,0 +1,87 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：bench_coordinator.py
+@文档说明：
+协调器完整刷新、黄历预计算和时间段查询的性能基准
+协调器的刷新是协程，基准在executor线程中计时，协程仍在HA的事件循环中执行
+"""
+import asyncio
+import logging
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from custom_components.date_time.almanac import AlmanacCache
+from custom_components.date_time.periods import REFERENCE_SUN
+from custom_components.date_time.sensor import DateCoordinator, TimePeriodSensor
+
+from conftest import FIXED_DAY
+
+_LOGGER = logging.getLogger(__name__)
+TZ = ZoneInfo('Asia/Shanghai')
+
+
+def _cold(coordinator: DateCoordinator):
+    """清空上一次刷新的结果，下一次刷新全部重新计算"""
+    def setup():
+        coordinator.data = None
+        coordinator.festival_index = None
+        coordinator._almanac = None
+        coordinator._anniversaries_inputs = coordinator._holidays_inputs = None
+        coordinator.anniversary_engine.today = None
+        return (), {}
+    return setup
+
+
+async def bench_update_data_cold(benchmark, hass, holiday_cache, almanac_cache, roster, peak_memory):
+    """当天的首次刷新：节假日、节日索引和全部纪念日都重新计算，黄历读预计算的缓存"""
+    coordinator = DateCoordinator(hass, {'anniversaries': roster}, _LOGGER)
+
+    def refresh():
+        return asyncio.run_coroutine_threadsafe(coordinator._async_update_data(), hass.loop).result()
+
+    await hass.async_add_executor_job(peak_memory, lambda: (_cold(coordinator)(), refresh()))
+    data = await hass.async_add_executor_job(
+        lambda: benchmark.pedantic(refresh, setup=_cold(coordinator), rounds=20)
+    )
+    assert data.holidays.state == '工作日'
+    assert len(data.anniversaries) == len(roster)
+
+
+async def bench_update_data_incremental(benchmark, hass, holiday_cache, almanac_cache, roster, peak_memory):
+    """同一天内的再次刷新（如手动刷新按钮），输入不变时沿用上一次的结果"""
+    coordinator = DateCoordinator(hass, {'anniversaries': roster}, _LOGGER)
+    coordinator.data = await coordinator._async_update_data()
+
+    def refresh():
+        return asyncio.run_coroutine_threadsafe(coordinator._async_update_data(), hass.loop).result()
+
+    await hass.async_add_executor_job(peak_memory, refresh)
+    data = await hass.async_add_executor_job(benchmark, refresh)
+    assert data is not None
+
+
+def bench_almanac_precompute(benchmark, peak_memory):
+    """缓存为空时批量预计算30天的黄历"""
+    def precompute():
+        cache = AlmanacCache(days_ahead=30)
+        return cache, cache.precompute(FIXED_DAY)
+
+    peak_memory(precompute)
+    cache, computed = benchmark(precompute)
+    assert computed == len(cache) == 30
+
+
+def bench_time_period(benchmark, peak_memory):
+    """查询一天中每15分钟所在的时间段"""
+    sensor = TimePeriodSensor(None, '当前时间段', 'bench')
+    sensor.tz = TZ
+    sensor._local_sun = {event: datetime.combine(FIXED_DAY, moment, TZ) for event, moment in REFERENCE_SUN.items()}
+    sensor._table = sensor._build_periods(datetime.combine(FIXED_DAY, time(), TZ))
+    moments = [datetime.combine(FIXED_DAY, time(), TZ) + timedelta(minutes=15 * i) for i in range(96)]
+
+    def lookup_day():
+        return [sensor._time_period(moment) for moment in moments]
+
+    peak_memory(lookup_day)
+    periods = benchmark(lookup_day)
+    assert '未知错误' not in periods
@@ -0,0 +1,189 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：conftest.py
+@文档说明：
+性能基准的公共夹具：固定的日期、节假日数据、预计算的黄历和纪念日列表，以及基于tracemalloc的内存峰值基线
+"""
+import json
+import pathlib
+import random
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+import pytest
+from pytest_benchmark.utils import parse_compare_fail
+
+from custom_components.date_time import calc, sensor
+from custom_components.date_time.almanac import ALMANAC_CACHE
+from custom_components.date_time.calc import HOLIDAY_CACHE
+from custom_components.date_time.holiday_store import YearRecord, encode
+from custom_components.date_time.lunar_cache import cache_clear, solar_to_lunar
+from custom_components.date_time.lunar_table import load_table
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+BASELINE_DIR = pathlib.Path(__file__).parent / 'baseline'
+MEMORY_BASELINE = BASELINE_DIR / 'memory.json'
+# 基准日：2025年6月16日（周一）2:00，即每天定时刷新的时刻
+FIXED_NOW = datetime(2025, 6, 16, 2, 0)
+FIXED_DAY = FIXED_NOW.date()
+ROSTER_SIZE = 500
+# 平均耗时超过基线的比例阈值
+TIME_THRESHOLD = '25%'
+# 内存峰值在比例阈值之外额外允许的绝对误差，避免峰值很小的基准因解释器内部的分配而误报
+MEMORY_SLACK_KIB = 16
+# 2025年的放假安排：(名称, (放假开始, 放假结束), (调休上班日, ...))
+HOLIDAYS_2025 = (
+    ('元旦', ('2025-01-01', '2025-01-01'), ()),
+    ('春节', ('2025-01-28', '2025-02-04'), ('2025-01-26', '2025-02-08')),
+    ('清明节', ('2025-04-04', '2025-04-06'), ()),
+    ('劳动节', ('2025-05-01', '2025-05-05'), ('2025-04-27',)),
+    ('端午节', ('2025-05-31', '2025-06-02'), ()),
+    ('国庆节,中秋节', ('2025-10-01', '2025-10-08'), ('2025-09-28', '2025-10-11')),
+)
+
+
+def holidays_2025() -> dict:
+    """按api的格式展开2025年的节假日数据"""
+    data = {}
+    for name, (first, last), workdays in HOLIDAYS_2025:
+        day, last = date.fromisoformat(first), date.fromisoformat(last)
+        while day <= last:
+            data[day.isoformat()] = {'date': day.isoformat(), 'name': name, 'isOffDay': True}
+            day += timedelta(days=1)
+        for workday in workdays:
+            data[workday] = {'date': workday, 'name': name, 'isOffDay': False}
+    return dict(sorted(data.items()))
+
+
+class FixedDate(date):
+    @classmethod
+    def today(cls):
+        return cls(FIXED_DAY.year, FIXED_DAY.month, FIXED_DAY.day)
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        fixed = cls(FIXED_NOW.year, FIXED_NOW.month, FIXED_NOW.day, FIXED_NOW.hour, FIXED_NOW.minute)
+        return fixed if tz is None else fixed.replace(tzinfo=tz)
+
+    @classmethod
+    def today(cls):
+        return cls.now()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('date_time')
+    group.addoption('--memory-threshold', type=float, default=0.25,
+                    help='内存峰值超过基线的比例阈值，默认0.25')
+    group.addoption('--memory-save', action='store_true',
+                    help='把本次的内存峰值写入benchmarks/baseline/memory.json')
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # 耗时基线固定保存在benchmarks/baseline中，与运行时的当前目录无关
+    if config.getoption('benchmark_storage', None) == 'file://./.benchmarks':
+        config.option.benchmark_storage = f'file://{BASELINE_DIR}'
+    # 已有本机的耗时基线时，自动与最新的基线比较，平均耗时超过阈值即失败
+    if (not config.getoption('benchmark_compare', None) and not config.getoption('benchmark_save', None)
+            and any(BASELINE_DIR.glob('*/*.json'))):
+        config.option.benchmark_compare = True
+        if not config.getoption('benchmark_compare_fail', None):
+            config.option.benchmark_compare_fail = [parse_compare_fail(f'mean:{TIME_THRESHOLD}')]
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    yield
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock(monkeypatch):
+    """集成内部取“今天”“现在”的地方都固定为FIXED_NOW，不影响计时器"""
+    for module in (sensor, calc):
+        monkeypatch.setattr(module, 'date', FixedDate)
+        monkeypatch.setattr(module, 'datetime', FixedDatetime)
+    load_table()
+    yield
+
+
+@pytest.fixture
+def holiday_cache(tmp_path, monkeypatch):
+    """指向临时节假日文件的共享缓存，只包含2025年的数据，不会请求api"""
+    path = tmp_path / 'holiday.bin'
+    path.write_bytes(encode([YearRecord.from_holidays(2025, holidays_2025())]))
+    monkeypatch.setattr(HOLIDAY_CACHE, 'path', str(path))
+    monkeypatch.setattr(HOLIDAY_CACHE, 'seed_path', None)
+    monkeypatch.setattr(HOLIDAY_CACHE, 'legacy_path', None)
+    HOLIDAY_CACHE.load()
+    return HOLIDAY_CACHE
+
+
+@pytest.fixture(scope='session')
+def almanac_cache():
+    """基准日起days_ahead天的黄历预先算好，协调器刷新时启动的后台预计算没有需要计算的日期，不会与计时重叠"""
+    ALMANAC_CACHE.precompute(FIXED_DAY)
+    return ALMANAC_CACHE
+
+
+@pytest.fixture(scope='session')
+def roster() -> list[dict]:
+    """固定随机种子生成的纪念日列表，阳历、农历，纪念日、生日各约一半"""
+    rng = random.Random(20250616)
+    entries = []
+    for number in range(ROSTER_SIZE):
+        day = date(1950, 1, 1) + timedelta(days=rng.randrange(27000))
+        date_type = rng.choice(('阳历', '阴历'))
+        if date_type == '阴历':  # 农历纪念日填写当天的农历日期，包括二月三十这类不是合法阳历日期的日子
+            year, month, lunar_day = solar_to_lunar(day)
+            value = f'{year:04d}{abs(month):02d}{lunar_day:02d}'
+        else:
+            value = day.strftime('%Y%m%d')
+        entries.append({
+            'anniversary_name': f'成员{number:03d}',
+            'date_type': date_type,
+            'anniversary_type': rng.choice(('生日', '纪念日')),
+            'anniversary_date': value,
+        })
+    return entries
+
+
+@pytest.fixture(scope='session')
+def memory_baseline(request):
+    baseline = json.loads(MEMORY_BASELINE.read_text(encoding='utf-8')) if MEMORY_BASELINE.exists() else {}
+    yield baseline
+    if request.config.getoption('--memory-save'):
+        BASELINE_DIR.mkdir(exist_ok=True)
+        MEMORY_BASELINE.write_text(json.dumps(dict(sorted(baseline.items())), indent=2) + '\n', encoding='utf-8')
+
+
+@pytest.fixture
+def peak_memory(request, benchmark, memory_baseline):
+    """
+    先预热调用一次被测函数（结果与之前运行过哪些基准无关），再用tracemalloc记录第二次调用的内存峰值，并与基线比较
+    :return: measure(func, *args)，返回峰值（KiB）
+    """
+    threshold = request.config.getoption('--memory-threshold')
+    save = request.config.getoption('--memory-save')
+
+    def measure(func, *args) -> float:
+        cache_clear()
+        func(*args)
+        tracemalloc.start()
+        try:
+            func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_kib = round(peak / 1024, 1)
+        benchmark.extra_info['peak_kib'] = peak_kib
+        name = request.node.name
+        if save:
+            memory_baseline[name] = peak_kib
+        elif (baseline := memory_baseline.get(name)) is not None and peak_kib > baseline * (1 + threshold) + MEMORY_SLACK_KIB:
+            pytest.fail(f'{name}的内存峰值{peak_kib}KiB超过基线{baseline}KiB的{threshold:.0%}')
+        return peak_kib
+
+    return measure
@@ -0,0 +1,71 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：importtime.py
+@文档说明：
+用python -X importtime测量集成的导入耗时
+HA启动时已经导入的模块（HA核心、sensor/button平台、astral、aiohttp等）先行导入，不计入集成的耗时；
+和实际运行的HA一样使用已缓存的字节码（先预热一次），多次运行取中位数。用法：python benchmarks/importtime.py [次数]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# HA加载本集成之前已经导入的模块
+PRELOADED = (
+    'homeassistant.core', 'homeassistant.config_entries', 'homeassistant.helpers.config_validation',
+    'homeassistant.helpers.update_coordinator', 'homeassistant.helpers.event', 'homeassistant.helpers.storage',
+    'homeassistant.helpers.sun', 'homeassistant.helpers.aiohttp_client', 'homeassistant.helpers.selector',
+    'homeassistant.helpers.entity_platform', 'homeassistant.components.sensor', 'homeassistant.components.button',
+    'homeassistant.util.json', 'astral', 'aiohttp',
+)
+# HA加载本集成时导入的模块：集成本身和各平台
+INTEGRATION = (
+    'custom_components.date_time', 'custom_components.date_time.sensor',
+    'custom_components.date_time.button', 'custom_components.date_time.config_flow',
+)
+# 单独统计的第三方依赖
+DEPENDENCIES = ('lunar_python',)
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+# 预先导入结束后写到stderr的分隔行
+_SENTINEL = '-- integration --'
+
+
+def measure_once() -> dict[str, int]:
+    """
+    运行一次，返回各模块的累计导入耗时（微秒），'total'为集成所有顶层导入之和
+    """
+    code = (f"import sys, {', '.join(PRELOADED)}\nsys.stderr.write('{_SENTINEL}\\n')\n"
+            + ''.join(f'import {module}\n' for module in INTEGRATION))
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            capture_output=True, text=True, env=env).stderr
+    # 预先导入的模块及其间接导入的依赖不计入
+    stderr = stderr.split(_SENTINEL, 1)[1]
+    result = {'total': 0}
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        cumulative, depth, name = int(match[2]), len(match[3]) // 2, match[4]
+        if name.startswith('custom_components.date_time') or name in DEPENDENCIES:
+            result[name] = result.get(name, 0) + cumulative
+        if depth == 0:
+            result['total'] += cumulative
+    return result
+
+
+def main(runs: int = 21) -> None:
+    measure_once()  # 预热：生成字节码缓存
+    samples: dict[str, list[int]] = {}
+    for _ in range(runs):
+        for name, value in measure_once().items():
+            samples.setdefault(name, []).append(value)
+    print(f'{"module":45s} {"median ms":>10s} {"runs":>5s}')
+    for name in ['total'] + sorted(name for name in samples if name != 'total'):
+        print(f'{name:45s} {statistics.median(samples[name]) / 1000:10.1f} {len(samples[name]):5d}')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 21)
@@ -1,19 +1,38 @@
 """Date and Time Sensor integration."""
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import STORAGE_DIR
 
+from .calc import HOLIDAY_CACHE, HOLIDAY_STORAGE_FILE
 from .const import DOMAIN
+from .ics_export import CalendarExportView
+from .lunar_table import load_table
+from .services import async_setup_services
+
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up integration via YAML (not used)."""
+    # 节假日数据保存在配置目录的.storage中，集成自带的数据只用于初始化
+    HOLIDAY_CACHE.relocate(hass.config.path(STORAGE_DIR, HOLIDAY_STORAGE_FILE))
+    async_setup_services(hass)
+    hass.http.register_view(CalendarExportView(hass))
     return True
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up integration from UI config flow."""
     hass.data.setdefault(DOMAIN, {})
+    # 在executor中映射农历对照表，之后的农历换算都直接查表
+    await hass.async_add_executor_job(load_table)
     await hass.config_entries.async_forward_entry_setups(entry, ["sensor","button"])
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload integration after options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload integration."""
     return await hass.config_entries.async_unload_platforms(entry, ["sensor","button"])
@@ -0,0 +1,256 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：almanac.py
+@文档说明：
+黄历（农历日期、宜、忌、冲、煞）的预计算缓存
+lunar_python的getDayYi、getDayJi、getDayChongDesc、getDaySha是每次刷新中最耗时的调用，
+改为在后台一次批量计算从今天起days_ahead天的黄历，保存在有上限的LRU缓存中，刷新和任意日期的查询都先查缓存
+宜、忌、冲、煞的取值只有几百种，用sys.intern驻留，缓存中相同的字符串只保存一份
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DOMAIN, FORMAT_DATE, FORMAT_DATETIME
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AlmanacDay:
+    """
+    一天的黄历
+    """
+    __slots__ = ('day', 'today', 'lunar', 'yi', 'ji', 'chong', 'sha')
+
+    def __init__(self, day: date, today: str, lunar: str, yi: tuple[str, ...], ji: tuple[str, ...], chong: str,
+                 sha: str) -> None:
+        self.day = day
+        # 如“2025年03月20日 星期四”
+        self.today = today
+        # 如“乙巳(蛇)年 二月廿一”
+        self.lunar = lunar
+        self.yi = yi
+        self.ji = ji
+        self.chong = chong
+        self.sha = sha
+
+    @classmethod
+    def compute(cls, day: date) -> 'AlmanacDay':
+        """
+        计算一天的黄历（阻塞）
+        批量预计算不经过lunar_cache的LRU缓存，避免一次挤掉其他换算缓存的Lunar对象；
+        不调用toFullString，它会为当天的其他节日重复计算农历年，是原来最慢的一步
+        :param day: 阳历日期
+        :return:
+        """
+        from lunar_python import Lunar
+        lunar = Lunar.fromDate(datetime(day.year, day.month, day.day))
+        return cls(
+            day,
+            f'{day.strftime("%Y年%m月%d日")} 星期{lunar.getWeekInChinese()}',
+            f'{lunar.getYearInGanZhi()}({lunar.getYearShengXiao()})年 {lunar.getMonthInChinese()}月{lunar.getDayInChinese()}',
+            tuple(sys.intern(item) for item in lunar.getDayYi()),
+            tuple(sys.intern(item) for item in lunar.getDayJi()),
+            sys.intern(lunar.getDayChongDesc()),
+            sys.intern(lunar.getDaySha()),
+        )
+
+    def as_dict(self) -> dict:
+        """服务返回的格式"""
+        return {
+            'date': self.day.strftime(FORMAT_DATE),
+            'lunar': self.lunar,
+            'yi': list(self.yi),
+            'ji': list(self.ji),
+            'chong': self.chong,
+            'sha': self.sha,
+        }
+
+
+class AlmanacCache:
+    """
+    按日期的黄历缓存，最多保存maxsize天，超出时淘汰最久未用的日期；可在多个线程中同时使用
+    """
+
+    def __init__(self, days_ahead: int = 366, maxsize: int = 800) -> None:
+        """
+        :param days_ahead: 后台预计算的天数（含今天）
+        :param maxsize: 缓存的最大天数，不小于days_ahead
+        """
+        self.days_ahead = days_ahead
+        self.maxsize = max(maxsize, days_ahead)
+        self._days: OrderedDict[date, AlmanacDay] = OrderedDict()
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+        # 设置后正在进行的预计算在当前日期算完后停止
+        self._stop = threading.Event()
+        # 正在使用缓存的协调器（每个配置条目一个），全部卸载后才停止预计算
+        self._owners: set = set()
+        # 命中统计和最近一次预计算的情况
+        self.hits: int = 0
+        self.misses: int = 0
+        self.precomputed_days: int = 0
+        # 最近一次预计算的范围：从precomputed_from起days_ahead天，precomputed_until为已算到的日期
+        self.precomputed_from: date | None = None
+        self.precomputed_until: date | None = None
+        self.precompute_time: datetime | None = None
+        self.precompute_duration: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def get(self, day: date) -> AlmanacDay | None:
+        """
+        只查缓存，不计算
+        :param day: 阳历日期
+        :return: 未缓存时返回None
+        """
+        with self._lock:
+            almanac = self._days.get(day)
+            if almanac is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._days.move_to_end(day)
+            return almanac
+
+    def _put(self, almanac: AlmanacDay) -> None:
+        with self._lock:
+            self._days[almanac.day] = almanac
+            self._days.move_to_end(almanac.day)
+            while len(self._days) > self.maxsize:
+                self._days.popitem(last=False)
+
+    def in_window(self, day: date) -> bool:
+        """
+        日期是否在最近一次预计算的范围内
+        :param day: 阳历日期
+        :return: 还没有预计算过时返回False
+        """
+        start = self.precomputed_from
+        return start is not None and 0 <= day.toordinal() - start.toordinal() < self.days_ahead
+
+    def lookup(self, day: date, store: bool = True) -> AlmanacDay:
+        """
+        查询一天的黄历，未缓存时计算（阻塞）
+        :param day: 阳历日期
+        :param store: 计算结果是否放入缓存
+        :return:
+        """
+        day = date(day.year, day.month, day.day)
+        almanac = self.get(day)
+        if almanac is None:
+            almanac = AlmanacDay.compute(day)
+            if store:
+                self._put(almanac)
+        return almanac
+
+    def lookup_range(self, start: date, end: date) -> list[AlmanacDay]:
+        """
+        查询[start, end)内每天的黄历（阻塞）
+        预计算范围之外的日期只计算、不放入缓存，查询很远的日期不会挤掉预计算的黄历
+        :param start: 起始日期
+        :param end: 结束日期（不含）
+        :return:
+        """
+        return [
+            self.lookup(day, store=self.in_window(day))
+            for day in map(date.fromordinal, range(start.toordinal(), end.toordinal()))
+        ]
+
+    def precompute(self, start: date) -> int:
+        """
+        批量计算从start起days_ahead天中尚未缓存的黄历（阻塞），调用async_stop后提前结束
+        :param start: 起始日期，通常为今天
+        :return: 新计算的天数
+        """
+        started = time.perf_counter()
+        computed = 0
+        self.precomputed_from = start
+        for ordinal in range(start.toordinal(), start.toordinal() + self.days_ahead):
+            if self._stop.is_set():
+                break
+            day = date.fromordinal(ordinal)
+            with self._lock:
+                cached = day in self._days
+            if not cached:
+                self._put(AlmanacDay.compute(day))
+                computed += 1
+            self.precomputed_until = day
+        self.precomputed_days += computed
+        self.precompute_time = datetime.now()
+        self.precompute_duration = round((time.perf_counter() - started) * 1000, 1)
+        return computed
+
+    @callback
+    def async_schedule_precompute(self, hass: HomeAssistant, start: date) -> None:
+        """
+        在后台任务中预计算，上一次预计算尚未结束时不重复启动
+        :param hass:
+        :param start: 起始日期，通常为今天
+        :return:
+        """
+        if self._task is not None and not self._task.done():
+            return
+        self._stop.clear()
+        self._task = hass.async_create_background_task(
+            self._async_precompute(hass, start), name=f'{DOMAIN}_almanac_precompute'
+        )
+
+    async def _async_precompute(self, hass: HomeAssistant, start: date) -> None:
+        computed = await hass.async_add_executor_job(self.precompute, start)
+        _LOGGER.debug(f'预计算了{computed}天的黄历，耗时{self.precompute_duration}ms')
+
+    @callback
+    def async_stop(self) -> None:
+        """让正在进行的预计算尽快结束，卸载时不必等它算完"""
+        self._stop.set()
+
+    @callback
+    def async_attach(self, owner: object) -> None:
+        """
+        登记一个使用缓存的协调器
+        :param owner: 协调器
+        :return:
+        """
+        self._owners.add(owner)
+
+    @callback
+    def async_detach(self, owner: object) -> None:
+        """
+        注销一个协调器，最后一个协调器注销后停止预计算；可重复调用
+        :param owner: 协调器
+        :return:
+        """
+        self._owners.discard(owner)
+        if not self._owners:
+            self.async_stop()
+
+    def stats(self) -> dict:
+        """命中统计和预计算的情况"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._days),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 3) if total else None,
+            'precomputed_days': self.precomputed_days,
+            'precomputed_until': self.precomputed_until.strftime(FORMAT_DATE) if self.precomputed_until else None,
+            'precompute_time': self.precompute_time.strftime(FORMAT_DATETIME) if self.precompute_time else None,
+            'precompute_ms': self.precompute_duration,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._days.clear()
+
+
+# 进程内共享的黄历缓存
+ALMANAC_CACHE = AlmanacCache()
@@ -0,0 +1,197 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：anniversary.py
+@文档说明：
+纪念日/生日引擎：按下一次日期维护一个最小堆，每天只推进已经过去的条目（只有这些条目需要做农历换算），
+倒数天数、纪念天数用数组整体计算，“下一个纪念日”直接取堆顶
+每个纪念日的数据是不可变的AnniversaryRecord，没有变化的条目在刷新之间沿用同一个对象
+"""
+import heapq
+from array import array
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from .const import FORMAT_DATETIME_SHORT
+from .lunar_cache import resolve_lunar
+
+
+@dataclass(frozen=True, slots=True)
+class LunarDate:
+    """
+    农历纪念日的日期，按农历年月日保存：二月三十这类不是合法阳历日期的农历日期不能用date表示
+    """
+    year: int
+    month: int
+    day: int
+
+
+def parse_origin(entry: dict) -> tuple[date | LunarDate, date]:
+    """
+    解析纪念日配置中的日期，纪念日引擎和ics导出共用：阳历按阳历日期解析，农历只拆出年月日，再经对照表换算为阳历
+    :param entry: 纪念日配置
+    :return: (纪念日日期：阳历为date，农历为LunarDate, 纪念日当天的阳历日期)
+    """
+    value = entry['anniversary_date']
+    if entry['date_type'] == '阳历':
+        origin = datetime.strptime(value, '%Y%m%d').date()
+        return origin, origin
+    origin = LunarDate(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    return origin, resolve_lunar(origin.year, origin.month, origin.day)
+
+
+def next_occurrence(origin: date | LunarDate, is_solar: bool, today: date) -> date:
+    """
+    根据纪念日的日期，计算不早于今天的最近一次纪念日日期
+    :param origin: 纪念日日期，农历纪念日时为LunarDate
+    :param is_solar: 是否为阳历
+    :param today: 今天
+    :return:
+    """
+    if is_solar:
+        for year in (today.year, today.year + 1):
+            try:
+                candidate = origin.replace(year=year)
+            except ValueError:  # 2月29日在平年取2月28日
+                candidate = date(year, 2, 28)
+            if candidate >= today:
+                return candidate
+    # 农历日期在腊月时会比阳历早一年，如1988年1月实际上是农历的1987年
+    # 从上一个农历年开始，取第一个不早于今天的日期；小月没有三十、当年没有闰月时按resolve_lunar的规则处理
+    for year in (today.year - 1, today.year, today.year + 1):
+        candidate = resolve_lunar(year, origin.month, origin.day)
+        if candidate >= today:
+            return candidate
+    return candidate
+
+
+def entry_key(entry: dict) -> str:
+    """纪念日配置的键：名字+类型+日期"""
+    return f"{entry['anniversary_name']}{entry['anniversary_type']}{entry['anniversary_date']}"
+
+
+@dataclass(frozen=True, slots=True)
+class AnniversaryRecord:
+    """
+    单个纪念日的数据
+    """
+    # 实体名称：名字+类型
+    name: str
+    # 如“小明阳历25岁生日”“结婚15周年纪念日”
+    hint: str
+    # 纪念日当天的阳历日期，农历纪念日已换算
+    origin: date
+    next_date: date
+    age: int
+    days_left: int
+    days: int
+    # 更新时间不参与比较，只有更新时间不同的两条数据视为相同
+    update_time: str = field(compare=False)
+
+    def attributes(self) -> dict:
+        """纪念日传感器的属性，由传感器在数据变化时生成一次"""
+        return {
+            "纪念年数": self.age,
+            "纪念日期": datetime(self.origin.year, self.origin.month, self.origin.day),
+            "到期日期": datetime(self.next_date.year, self.next_date.month, self.next_date.day),
+            "倒数天数": self.days_left,
+            "纪念名称": self.hint,
+            "更新时间": self.update_time,
+        }
+
+
+def build_record(entry: dict, origin: date, next_date: date, days_left: int, days: int,
+                 update_time: str) -> AnniversaryRecord:
+    """
+    组装单个纪念日的数据
+    :param entry: 纪念日配置
+    :param origin: 纪念日当天的阳历日期
+    :param next_date: 下一次日期
+    :param days_left: 倒数天数
+    :param days: 纪念天数
+    :param update_time: 更新时间
+    :return:
+    """
+    age = next_date.year - origin.year
+    if entry['anniversary_type'] == '纪念日':
+        hint = f"{entry['anniversary_name']}{age}周年纪念日"
+    else:
+        hint = f"{entry['anniversary_name']}{entry['date_type']}{age}岁生日"
+    return AnniversaryRecord(f"{entry['anniversary_name']}{entry['anniversary_type']}", hint, origin, next_date, age,
+                             days_left, days, update_time)
+
+
+class AnniversaryEngine:
+    """
+    纪念日引擎，条目按配置顺序编号，数组下标即编号
+    """
+
+    def __init__(self, entries: list[dict]) -> None:
+        self.entries: list[dict] = list(entries)
+        self.keys: list[str] = [entry_key(entry) for entry in self.entries]
+        parsed = [parse_origin(entry) for entry in self.entries]
+        # 推算下一次日期用的纪念日日期，农历为LunarDate
+        self.origins: list[date | LunarDate] = [origin for origin, _ in parsed]
+        # 纪念日当天的阳历日期，纪念天数和年数都按它计算
+        self.solar_origins: list[date] = [solar for _, solar in parsed]
+        self.is_solar: list[bool] = [entry['date_type'] == '阳历' for entry in self.entries]
+        self.origin_ordinals: array = array('l', (origin.toordinal() for origin in self.solar_origins))
+        self.next_ordinals: array = array('l', [0]) * len(self.entries)
+        # (下一次日期的ordinal, 编号)的最小堆
+        self._heap: list[tuple[int, int]] = []
+        self.today: date | None = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def advance(self, today: date) -> list[int]:
+        """
+        推进到今天：只重新计算下一次日期早于今天的条目；首次调用或日期倒退时全部重新计算
+        :param today: 今天
+        :return: 被重新计算的条目编号
+        """
+        if self.today is None or today < self.today:
+            due = list(range(len(self.entries)))
+            for index in due:
+                self.next_ordinals[index] = next_occurrence(self.origins[index], self.is_solar[index], today).toordinal()
+            self._heap = [(self.next_ordinals[index], index) for index in due]
+            heapq.heapify(self._heap)
+        else:
+            due = []
+            ordinal = today.toordinal()
+            while self._heap and self._heap[0][0] < ordinal:
+                index = heapq.heappop(self._heap)[1]
+                due.append(index)
+                self.next_ordinals[index] = next_occurrence(self.origins[index], self.is_solar[index], today).toordinal()
+            for index in due:
+                heapq.heappush(self._heap, (self.next_ordinals[index], index))
+        self.today = today
+        return due
+
+    def peek(self) -> tuple[int, date] | None:
+        """
+        最近的一个纪念日
+        :return: (编号, 日期)，没有纪念日时返回None
+        """
+        if not self._heap:
+            return None
+        ordinal, index = self._heap[0]
+        return index, date.fromordinal(ordinal)
+
+    def build(self, now: datetime) -> dict[str, AnniversaryRecord]:
+        """
+        推进到今天并组装全部纪念日的数据
+        :param now: 当前时间
+        :return: {纪念日的键: 数据}
+        """
+        today = now.date()
+        self.advance(today)
+        ordinal = today.toordinal()
+        # 倒数天数、纪念天数整体计算，不做任何日期换算
+        days_left = array('l', (next_ordinal - ordinal for next_ordinal in self.next_ordinals))
+        days = array('l', (ordinal - origin_ordinal for origin_ordinal in self.origin_ordinals))
+        update_time = now.strftime(FORMAT_DATETIME_SHORT)
+        return {
+            key: build_record(self.entries[index], self.solar_origins[index],
+                              date.fromordinal(self.next_ordinals[index]), days_left[index], days[index], update_time)
+            for index, key in enumerate(self.keys)
+        }
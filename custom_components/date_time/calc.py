@@ -8,111 +8,706 @@
 @文档说明：
 v1.0:
 """
-import json
+import asyncio
+import bisect
 import os.path
 import logging
+import random
+import threading
+import time
+from array import array
 from typing import Literal
-from lunar_python import Lunar, LunarMonth
-from datetime import datetime
-import requests
-from .const import FORMAT_DATE, SOLAR_FESTIVAL, LUNAR_FESTIVAL
+from datetime import date, datetime
+from functools import partial
+import aiohttp
+from .lunar_cache import lunar_to_solar, lunar_month_days, solar_to_lunar
+from .const import (DOMAIN, FORMAT_DATETIME, HOLIDAY_API, SOLAR_FESTIVAL, LUNAR_FESTIVAL, HOLIDAY_STATE_ENUM_VALUES,
+                    STATE_SHIFT_WORKDAY)
+from .holiday_store import HolidayStore, YearRecord, encode, from_json, holiday_codes, write_atomic
 
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.helpers.event import async_call_later
 from homeassistant.util.json import load_json
 
 _LOGGER = logging.getLogger(__name__)
 BASE_DIR: str = os.path.dirname(__file__)
 
 
+class HolidayIndex:
+    """
+    单个年度的节假日索引：按年内序号（1月1日为0）存放每天的状态码
+    状态码取值见const中的STATE_*，构建一次后按日期或ordinal查询均为O(1)
+    """
+    __slots__ = ('year', 'first_ordinal', 'codes', '_workday_prefix')
+
+    def __init__(self, year: int, holidays: dict = None, codes: bytearray = None) -> None:
+        """
+        :param year: 年份
+        :param holidays: api格式的年度节假日数据，先按周末规则填充全年，再用节假日数据覆盖
+        :param codes: 已有的全年状态码（如holiday.bin中解码出的），传入时忽略holidays
+        """
+        self.year: int = year
+        self.first_ordinal: int = date(year, 1, 1).toordinal()
+        self.codes: bytearray = codes if codes is not None else holiday_codes(year, holidays)
+        self._workday_prefix: array | None = None
+
+    @property
+    def last_ordinal(self) -> int:
+        """本年度最后一天的下一天的ordinal（不含）"""
+        return self.first_ordinal + len(self.codes)
+
+    @property
+    def workday_prefix(self) -> array:
+        """
+        工作日（含调休日）前缀和：workday_prefix[i]为年内前i天的工作日数，长度为全年天数+1，首次访问时计算
+        """
+        if self._workday_prefix is None:
+            prefix = array('H', [0]) * (len(self.codes) + 1)
+            total = 0
+            for offset, code in enumerate(self.codes):
+                total += code <= STATE_SHIFT_WORKDAY
+                prefix[offset + 1] = total
+            self._workday_prefix = prefix
+        return self._workday_prefix
+
+    def code_at(self, ordinal: int) -> int:
+        """
+        按ordinal（date.toordinal()）查询状态码
+        :param ordinal: 日期的ordinal，必须落在本年度内
+        :return:
+        """
+        offset = ordinal - self.first_ordinal
+        if not 0 <= offset < len(self.codes):
+            raise ValueError(f'{date.fromordinal(ordinal)}不在{self.year}年度的节假日索引内')
+        return self.codes[offset]
+
+    def code(self, q_date: date) -> int:
+        """
+        按日期查询状态码
+        :param q_date: 查询的日期，date或datetime均可
+        :return:
+        """
+        return self.code_at(q_date.toordinal())
+
+    def state(self, q_date: date) -> str:
+        """
+        按日期查询状态名称：工作日/调休日/休息日/节假日
+        :param q_date: 查询的日期，date或datetime均可
+        :return:
+        """
+        return HOLIDAY_STATE_ENUM_VALUES[self.code_at(q_date.toordinal())]
+
+
+class FestivalIndex:
+    """
+    滚动的节日索引：把SOLAR_FESTIVAL和LUNAR_FESTIVAL换算成阳历日期，按日期排序
+    覆盖从起始日起13个月，今天的节日和下一个节日都用bisect查询，每天重建一次即可
+    """
+    horizon_months: int = 13
+
+    def __init__(self, start: date = None) -> None:
+        start = date.fromordinal((start or date.today()).toordinal())
+        self.start: date = start
+        end_year, end_month = divmod(start.month - 1 + self.horizon_months, 12)
+        self.end: date = date(start.year + end_year, end_month + 1, 1)
+        festivals: dict[int, list[str]] = {}
+        # 腊月的农历日期对应下一个阳历年，所以农历从前一年开始换算
+        for year in range(start.year - 1, self.end.year + 1):
+            for key, names in LUNAR_FESTIVAL.items():
+                self._add(festivals, self._lunar_to_solar(year, int(key[0:2]), int(key[2:4]), names), names)
+        for year in range(start.year, self.end.year + 1):
+            for key, names in SOLAR_FESTIVAL.items():
+                try:
+                    self._add(festivals, date(year, int(key[0:2]), int(key[2:4])), names)
+                except ValueError:  # 非闰年的0229
+                    continue
+        self.ordinals: list[int] = sorted(festivals)
+        self.names: list[list[str]] = [festivals[ordinal] for ordinal in self.ordinals]
+
+    @staticmethod
+    def _lunar_to_solar(year: int, month: int, day: int, names: list[str]) -> date | None:
+        """农历节日换算为阳历，除夕固定为腊月最后一天，其余不存在的日期（如小月的三十）跳过"""
+        if '除夕' in names:
+            day = lunar_month_days(year, month)
+        try:
+            return lunar_to_solar(year, month, day)
+        except ValueError:
+            return None
+
+    def _add(self, festivals: dict, solar: date | None, names: list[str]) -> None:
+        if solar is not None and self.start <= solar < self.end:
+            festivals.setdefault(solar.toordinal(), []).extend(names)
+
+    def covers(self, q_date: date) -> bool:
+        """
+        指定日期是否在索引的覆盖范围内，且索引中在它之后还有节日可作为下一个节日
+        :param q_date: 查询的日期
+        :return:
+        """
+        return self.start.toordinal() <= q_date.toordinal() < self.ordinals[-1]
+
+    def festivals_on(self, q_date: date) -> list[str]:
+        """
+        查询指定日期的节日
+        :param q_date: 查询的日期，需在覆盖范围内
+        :return: 没有节日时返回空列表
+        """
+        ordinal = q_date.toordinal()
+        i = bisect.bisect_left(self.ordinals, ordinal)
+        if i < len(self.ordinals) and self.ordinals[i] == ordinal:
+            return list(self.names[i])
+        return []
+
+    def next_festival(self, q_date: date) -> dict:
+        """
+        查询指定日期之后（不含当天）的下一个节日
+        :param q_date: 查询的日期，需在覆盖范围内
+        :return: {'date': 阳历日期, 'name': 节日列表}
+        """
+        i = bisect.bisect_right(self.ordinals, q_date.toordinal())
+        return {'date': date.fromordinal(self.ordinals[i]), 'name': list(self.names[i])}
+
+
+def festivals_of(q_date: date) -> list[str]:
+    """
+    不建索引，直接查询一天的节日，适用于零散、彼此相隔很远的日期；结果与FestivalIndex.festivals_on一致（农历节日在前）
+    :param q_date: 查询的日期，date或datetime均可
+    :return: 没有节日时返回空列表
+    """
+    lunar_year, lunar_month, lunar_day = solar_to_lunar(q_date)
+    festivals = []
+    # 闰月没有节日；除夕固定为腊月最后一天
+    if lunar_month > 0:
+        for key, names in LUNAR_FESTIVAL.items():
+            if int(key[0:2]) != lunar_month:
+                continue
+            if '除夕' in names:
+                if lunar_day == lunar_month_days(lunar_year, lunar_month):
+                    festivals.extend(names)
+            elif int(key[2:4]) == lunar_day:
+                festivals.extend(names)
+    festivals.extend(SOLAR_FESTIVAL.get(f'{q_date.month:02d}{q_date.day:02d}', ()))
+    return festivals
+
+
+class HolidayCache:
+    """
+    进程内共享的节假日缓存：读取holiday.bin（格式见holiday_store.py），按年度缓存节假日数据和编译好的HolidayIndex
+    读取时只解析文件头和年度目录，各年度在第一次用到时才解码；文件中保留所有年度的历史数据
+    写入先更新内存，再由flush原子地写入文件，在HA中用async_delay_save合并短时间内的多次写入
+    以文件的mtime/size判断是否需要重新读取，所有读写都加锁，可以在executor线程中安全使用
+    """
+    # async_delay_save合并写入的等待时间（秒）
+    save_delay: float = 10
+
+    def __init__(self, path: str, seed_path: str = None, legacy_path: str = None) -> None:
+        """
+        :param path: 可写的holiday.bin的路径
+        :param seed_path: 随集成发布的holiday.bin，path不存在时用它初始化数据，本身不会被写入
+        :param legacy_path: 旧版holiday.json，path不存在时与seed_path合并（以它为准）
+        """
+        self.path: str = path
+        self.seed_path: str | None = seed_path
+        self.legacy_path: str | None = legacy_path
+        self._lock = threading.RLock()
+        # 上一次读取时各文件的(路径, mtime_ns, size)：path存在时只有path，否则为存在的种子文件
+        self._signature: tuple[tuple[str, int, int], ...] = ()
+        self._loaded: bool = False
+        # 数据每变化一次加一，供调用方判断节假日数据是否变化
+        self._version: int = 0
+        self._store: HolidayStore = HolidayStore()
+        self._years: dict[int, dict] = {}
+        self._indexes: dict[int, HolidayIndex] = {}
+        # 尚未写入文件的内容
+        self._pending: bytes | None = None
+        self._unsub_save = None
+        self._unsub_final_write = None
+        # 读取次数统计：reads为实际读取文件的次数，hits为文件未变化直接返回的次数，writes为写入文件的次数
+        self.reads: int = 0
+        self.hits: int = 0
+        self.writes: int = 0
+
+    def relocate(self, path: str) -> None:
+        """
+        把可写的文件移到path（如HA配置目录下的.storage，不会被集成更新覆盖），原来的文件只作为种子数据
+        :param path: 新的路径
+        :return:
+        """
+        with self._lock:
+            if path == self.path:
+                return
+            self.seed_path, self.path = self.path, path
+            self._loaded = False
+
+    def _stat(self) -> tuple[tuple[str, int, int], ...]:
+        signature = []
+        for path in (self.path, self.seed_path, self.legacy_path):
+            if path is None:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+            if path == self.path:
+                break
+        return tuple(signature)
+
+    def load(self) -> bool:
+        """
+        读取节假日文件（阻塞，在事件循环中请使用async_load），文件未变化或有尚未写入的数据时直接返回
+        可写的文件不存在或无法解析时，用种子文件初始化，结果待下次flush时写入
+        :return: 是否重新读取了文件
+        """
+        with self._lock:
+            signature = self._stat()
+            if self._loaded and (signature == self._signature or self._pending is not None):
+                self.hits += 1
+                return False
+            self.reads += 1
+            pending = None
+            try:
+                store = HolidayStore.read(self.path) if signature and signature[0][0] == self.path else None
+            except ValueError as e:
+                _LOGGER.error(f'节假日文件{self.path}无法解析，改用随集成发布的数据：{e}')
+                store = None
+            if store is None:
+                records = self._seed_records()
+                pending = encode(records.values()) if records else None
+                store = HolidayStore(pending or b'')
+            self._reset(store, signature)
+            self._pending = pending
+            return True
+
+    def _seed_records(self) -> dict[int, YearRecord]:
+        records = {}
+        for path, legacy in ((self.seed_path, False), (self.legacy_path, True)):
+            if path is None or not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'rb') as file:
+                    raw = file.read()
+                store = HolidayStore(from_json(raw) if legacy else raw)
+            except ValueError as e:
+                _LOGGER.error(f'节假日文件{path}无法解析：{e}')
+                continue
+            records.update((year, store.record(year)) for year in store.years)
+        return records
+
+    def _reset(self, store: HolidayStore, signature: tuple[tuple[str, int, int], ...]) -> None:
+        self._store = store
+        self._years = {}
+        self._indexes = {}
+        self._signature = signature
+        self._loaded = True
+        self._version += 1
+
+    @property
+    def version(self) -> int:
+        """数据版本号，每次重新读取或写入后加一"""
+        return self._version
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未写入文件的数据"""
+        return self._pending is not None
+
+    def stats(self) -> dict:
+        """读写次数、命中率和数据版本号"""
+        total = self.reads + self.hits
+        return {
+            'reads': self.reads,
+            'hits': self.hits,
+            'writes': self.writes,
+            'hit_ratio': round(self.hits / total, 3) if total else None,
+            'version': self._version,
+            'dirty': self.dirty,
+            'years': self._store.years,
+            'decoded_years': sorted(self._years),
+        }
+
+    async def async_load(self, hass) -> bool:
+        """
+        在executor中读取节假日文件，用种子文件初始化时安排一次写入
+        :param hass: HomeAssistant实例
+        :return: 是否重新读取了文件
+        """
+        reloaded = await hass.async_add_executor_job(self.load)
+        if self.dirty:
+            self.async_delay_save(hass)
+        return reloaded
+
+    @property
+    def years(self) -> list[int]:
+        """文件中的所有年度"""
+        return self._store.years
+
+    @property
+    def digest(self) -> str:
+        """节假日数据内容的摘要，数据不变时不变，可用作ETag等缓存校验"""
+        return self._store.digest
+
+    def record(self, year: int) -> YearRecord | None:
+        """
+        获取指定年度解码后的数据（每天的状态码和有名称的日期），不做任何文件读写
+        :param year: 年份
+        :return: 没有该年度数据时返回None
+        """
+        with self._lock:
+            return self._store.record(year)
+
+    def get_year(self, year: int) -> dict | None:
+        """
+        获取指定年度的节假日数据，第一次访问时从文件内容中解码，不做任何文件读写
+        :param year: 年份
+        :return: 没有该年度数据时返回None
+        """
+        with self._lock:
+            data = self._years.get(year)
+            if data is None and (record := self._store.record(year)) is not None:
+                data = self._years[year] = record.to_holidays()
+            return data
+
+    def get_index(self, year: int) -> HolidayIndex:
+        """
+        获取指定年度的节假日索引，每个年度只编译一次，没有节假日数据的年度只按周末规则编译
+        :param year: 年份
+        :return:
+        """
+        index = self._indexes.get(year)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(year)
+                if index is None:
+                    record = self._store.record(year)
+                    index = self._indexes[year] = HolidayIndex(year, codes=record.codes if record else None)
+        return index
+
+    def save_year(self, year: int, data: dict) -> None:
+        """
+        更新一个年度的数据，其他年度原样保留；只更新内存，文件由flush写入
+        :param year: 数据所属年度
+        :param data: 年度节假日字典
+        :return:
+        """
+        with self._lock:
+            records = {y: self._store.record(y) for y in self._store.years}
+            records[year] = YearRecord.from_holidays(year, data)
+            raw = encode(records.values())
+            self._reset(HolidayStore(raw), self._signature)
+            self._pending = raw
+
+    def flush(self) -> bool:
+        """
+        把尚未写入的数据原子地写入文件（阻塞，在事件循环中请使用async_flush）
+        :return: 是否写入了文件
+        """
+        with self._lock:
+            if self._pending is None:
+                return False
+            write_atomic(self.path, self._pending)
+            self._pending = None
+            self._signature = self._stat()
+            self.writes += 1
+            return True
+
+    def async_delay_save(self, hass) -> None:
+        """
+        save_delay秒后在executor中写入文件，期间的多次调用只写入一次；HA退出前的最终写入阶段会立即写入
+        :param hass: HomeAssistant实例
+        :return:
+        """
+        if self._unsub_save is None:
+            self._unsub_save = async_call_later(hass, self.save_delay, partial(self._async_delayed_flush, hass))
+        if self._unsub_final_write is None:
+            self._unsub_final_write = hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_FINAL_WRITE, partial(self._async_final_write, hass)
+            )
+
+    async def _async_delayed_flush(self, hass, _now) -> None:
+        self._unsub_save = None
+        await self.async_flush(hass)
+
+    async def _async_final_write(self, hass, _event) -> None:
+        self._unsub_final_write = None
+        await self.async_flush(hass)
+
+    async def async_flush(self, hass) -> bool:
+        """
+        取消等待中的写入，立即在executor中写入文件
+        :param hass: HomeAssistant实例
+        :return: 是否写入了文件
+        """
+        if self._unsub_save is not None:
+            self._unsub_save()
+            self._unsub_save = None
+        if self._unsub_final_write is not None:
+            self._unsub_final_write()
+            self._unsub_final_write = None
+        try:
+            return await hass.async_add_executor_job(self.flush)
+        except OSError as e:
+            _LOGGER.error(f'节假日文件{self.path}写入失败：{e}')
+            return False
+
+
+HOLIDAY_CACHE = HolidayCache(os.path.join(BASE_DIR, 'holiday.bin'), legacy_path=os.path.join(BASE_DIR, 'holiday.json'))
+# 在HA中可写的节假日文件，位于配置目录的.storage中
+HOLIDAY_STORAGE_FILE = f'{DOMAIN}.holidays.bin'
+
+
 class RestDay:
     """
-    每年查询一次，并将结果存于holiday.json中，保存一整年的节假日信息
-    这个类目前只用于判断工作日、调休日
+    节假日查询：判断工作日、调休日，数据和索引来自进程内共享的HolidayCache
+    新年度的数据由prefetch中的预取调度从节假日数据源获取并写入缓存，这个类只读
     """
-    # 采用节假日api调用，建议每年12月份开始更新查询
-    host_api: str = r'https://api.jiejiariapi.com/v1/holidays'
-    path: str = os.path.join(BASE_DIR, 'holiday.json')
-    has_json: bool = os.path.exists(path)
-    holidays: dict = None
-    holiday_dates: list[datetime] = None
-
-    def __init__(self, now: datetime = None) -> None:
+
+    def __init__(self, now: datetime = None, auto_update: bool = True, cache: HolidayCache = None) -> None:
+        """
+        :param now: 基准日期，默认为今天
+        :param auto_update: 为True时同步读取节假日文件（阻塞，不请求网络）；
+                            在事件循环中使用时应传False，事先await cache.async_load(hass)
+        :param cache: 节假日缓存，默认为进程内共享的HOLIDAY_CACHE
+        """
         if now is None:
             self.now: datetime = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
         else:
             self.now: datetime = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        self.get_this_year_holidays()
+        self.cache: HolidayCache = cache or HOLIDAY_CACHE
+        self.holidays: dict = {}
+        self.get_this_year_holidays(auto_update)
 
-    def get_this_year_holidays(self) -> dict:
+    def get_this_year_holidays(self, auto_update: bool = True) -> dict:
         """
         获取本地节假日数据
-        :return:
+        :param auto_update: 是否先读取节假日文件
+        :return: 今年的节假日信息，本地没有今年的数据时为空字典
         """
-        if self.has_json:
-            with open(self.path, 'rb') as file:
-                holidays_full = json.load(file)
-            if str(self.now.year) in holidays_full.keys():
-                self.holidays = holidays_full[str(self.now.year)]
-                self.holiday_dates = [datetime.strptime(s, FORMAT_DATE) for s in self.holidays.keys()]
-                return self.holidays
-
-        self.holidays = self.update()
-        self.holiday_dates = [datetime.strptime(s, FORMAT_DATE) for s in self.holidays.keys()]
+        if auto_update:
+            self.cache.load()
+        self.holidays = self.cache.get_year(self.now.year) or {}
         return self.holidays
 
-    def update(self) -> dict:
+    def get_index(self, year: int) -> HolidayIndex:
         """
-        更新holiday全年信息到holiday.json
+        获取指定年度的节假日索引，没有节假日数据的年度只按周末规则编译
+        :param year: 年份
         :return:
         """
-        today = datetime.today()
-        # 更新除夕
-        _str = f'12{LunarMonth.fromYm(today.year, 12).toString()[-4:-2]}'
-        if _str not in LUNAR_FESTIVAL.keys():
-            _, value = LUNAR_FESTIVAL.popitem()
-            LUNAR_FESTIVAL[_str] = value
-        # api请求
-        if self.holidays:
-            url = f'{self.host_api}/{str(self.now.year + 1)}'
-            response = requests.get(url=url)
-            if response.status_code != 200:
-                _LOGGER.info(f'{url.split("/")[-1]}年度的节假日信息api尚未更新')
-                return {}
-            json_data = {
-                f'{str(self.now.year)}': self.holidays,
-                f'{str(self.now.year + 1)}': response.json()
-            }
-        else:
-            url = f'{self.host_api}/{str(self.now.year)}'
-            response = requests.get(url=url)
-            if response.status_code != 200:
-                _LOGGER.warning(f'{url.split("/")[-1]}年度的节假日信息api更新失败')
-                return {}
-            self.holidays = response.json()
-            json_data = {
-                f'{str(self.now.year)}': self.holidays
-            }
-        with open(self.path, 'w', encoding='utf-8') as file:
-            json.dump(json_data, file, ensure_ascii=False)
-
-        # 把api获取到的字典直接传给返回值，用于get_this_year_holidays
-        return response.json()
-
-    def query(self, q_date: datetime = None) -> str:
+        return self.cache.get_index(year)
+
+    def query(self, q_date: date = None) -> str:
         """
         获取指定天或今天的节假日信息
-        :param q_date: 查询的指定日期，默认为None，如果是None，则指定为今天
+        :param q_date: 查询的指定日期，date或datetime均可，默认为None，如果是None，则指定为今天
+        :return:
+        """
+        q_date = q_date or self.now
+        return self.get_index(q_date.year).state(q_date)
+
+    def query_ordinal(self, ordinal: int) -> str:
+        """
+        按ordinal（date.toordinal()）获取节假日信息，适用于批量查询
+        :param ordinal: 日期的ordinal
+        :return:
+        """
+        return HOLIDAY_STATE_ENUM_VALUES[self.get_index(date.fromordinal(ordinal).year).code_at(ordinal)]
+
+    def query_range_codes(self, start: date, end: date) -> bytes:
+        """
+        批量获取[start, end)内每天的状态码，按年度整段切片，不逐日查询
+        :param start: 起始日期（含）
+        :param end: 结束日期（不含）
+        :return: 每天一个字节的状态码，取值见const中的STATE_*
+        """
+        ordinal, end_ordinal = start.toordinal(), end.toordinal()
+        chunks = []
+        while ordinal < end_ordinal:
+            index = self.get_index(date.fromordinal(ordinal).year)
+            stop = min(end_ordinal, index.last_ordinal)
+            chunks.append(index.codes[ordinal - index.first_ordinal:stop - index.first_ordinal])
+            ordinal = stop
+        return b''.join(chunks)
+
+    def query_range(self, start: date, end: date) -> list[str]:
+        """
+        批量获取[start, end)内每天的节假日信息
+        :param start: 起始日期（含）
+        :param end: 结束日期（不含）
+        :return: 与日期一一对应的工作日/调休日/休息日/节假日列表
+        """
+        return [HOLIDAY_STATE_ENUM_VALUES[code] for code in self.query_range_codes(start, end)]
+
+    def count_workdays(self, start: date, end: date) -> int:
+        """
+        统计[start, end)内的工作日数（含调休日），每个年度只做一次前缀和相减
+        :param start: 起始日期（含）
+        :param end: 结束日期（不含），早于start时返回负数
         :return:
         """
-        q_date = q_date.replace(hour=0, minute=0, second=0, microsecond=0) if q_date else self.now
-        if q_date in self.holiday_dates:
-            if self.holidays[q_date.strftime(FORMAT_DATE)]['isOffDay']:
-                return '节假日'
-            else:
-                return '调休日'
-        if q_date.weekday() in [5, 6]:
-            return '休息日'
+        ordinal, end_ordinal = start.toordinal(), end.toordinal()
+        if end_ordinal < ordinal:
+            return -self.count_workdays(end, start)
+        count = 0
+        while ordinal < end_ordinal:
+            index = self.get_index(date.fromordinal(ordinal).year)
+            stop = min(end_ordinal, index.last_ordinal)
+            prefix = index.workday_prefix
+            count += prefix[stop - index.first_ordinal] - prefix[ordinal - index.first_ordinal]
+            ordinal = stop
+        return count
+
+    def add_workdays(self, start: date, days: int) -> date:
+        """
+        计算start之后（days为负数时为之前）第days个工作日的日期，在前缀和上二分查找
+        :param start: 起始日期，不计入
+        :param days: 工作日数，为0时返回start
+        :return:
+        """
+        start = date.fromordinal(start.toordinal())
+        if days == 0:
+            return start
+        index = self.get_index(start.year)
+        offset = start.toordinal() - index.first_ordinal
+        if days > 0:
+            # 目标为本年度第target个工作日（从1开始），超出本年度时顺延到下一年度
+            target = index.workday_prefix[offset + 1] + days
+            while target > index.workday_prefix[-1]:
+                target -= index.workday_prefix[-1]
+                index = self.get_index(index.year + 1)
         else:
-            return '工作日'
+            target = index.workday_prefix[offset] + days + 1
+            while target < 1:
+                index = self.get_index(index.year - 1)
+                target += index.workday_prefix[-1]
+        return date.fromordinal(index.first_ordinal + bisect.bisect_left(index.workday_prefix, target) - 1)
+
+
+class HolidayProvider:
+    """
+    节假日数据源：按年度返回api格式的节假日字典，预取调度（prefetch.HolidayPrefetcher）只依赖这个接口，返回的数据由它写入HolidayCache
+    子类实现async_fetch，并在其中维护最近一次获取的统计字段
+    """
+    # 数据源类型，见const中的HOLIDAY_PROVIDERS
+    name: str = ''
+
+    def __init__(self, source: str) -> None:
+        """
+        :param source: 数据源的地址或文件路径
+        """
+        self.source = source
+        # 最近一次获取的统计：年份、状态（HTTP状态码、ok/missing，出错时为异常类名）、耗时、请求次数、完成时间
+        self.last_year: int | None = None
+        self.last_status: int | str | None = None
+        self.last_latency: float | None = None
+        self.last_attempts: int = 0
+        self.last_time: datetime | None = None
+        self.requests: int = 0
+
+    async def async_fetch(self, year: int) -> dict | None:
+        """
+        获取指定年度的节假日数据
+        :param year: 年份
+        :return: {'2025-10-01': {'date': '2025-10-01', 'name': '国庆节', 'isOffDay': True}, ...}；没有该年度的数据时返回None
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """最近一次获取的统计"""
+        return {
+            'provider': self.name,
+            'source': self.source,
+            'year': self.last_year,
+            'status': self.last_status,
+            'latency_ms': self.last_latency,
+            'attempts': self.last_attempts,
+            'time': self.last_time.strftime(FORMAT_DATETIME) if self.last_time else None,
+            'requests': self.requests,
+        }
+
+
+class HolidayFetcher(HolidayProvider):
+    """
+    节假日api的异步请求：使用共享的aiohttp会话，带超时、ETag/If-Modified-Since条件请求和带抖动的指数退避
+    请求失败或数据未变化时返回上一次成功的数据，实例应长期持有以保留这些状态
+    """
+    name: str = 'api'
+    timeout: float = 10
+    max_retries: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+
+    def __init__(self, session: aiohttp.ClientSession, host_api: str = HOLIDAY_API) -> None:
+        """
+        :param session: aiohttp会话，在HA中为async_get_clientsession(hass)
+        :param host_api: api地址，测试时可指向本地的替身http服务
+        """
+        super().__init__(host_api.rstrip('/'))
+        self.session = session
+        self.host_api = self.source
+        # 年份 -> 条件请求头（ETag/Last-Modified）
+        self._validators: dict[int, dict] = {}
+        # 年份 -> 上一次成功获取的数据
+        self._last_good: dict[int, dict] = {}
+
+    async def async_fetch(self, year: int) -> dict | None:
+        """
+        获取指定年度的节假日数据
+        :param year: 年份
+        :return: 年度节假日字典；api尚未发布且没有旧数据时返回None
+        """
+        url = f'{self.host_api}/{year}'
+        self.last_year = year
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt))
+            self.requests += 1
+            self.last_attempts = attempt + 1
+            self.last_time = datetime.now()
+            start = time.perf_counter()
+            try:
+                async with self.session.get(
+                        url,
+                        headers=self._validators.get(year, {}),
+                        timeout=aiohttp.ClientTimeout(total=self.timeout)
+                ) as response:
+                    self.last_status = response.status
+                    self.last_latency = round((time.perf_counter() - start) * 1000, 1)
+                    if response.status == 304:
+                        return self._last_good.get(year)
+                    if response.status == 200:
+                        data = await response.json(content_type=None)
+                        self._remember(year, response.headers, data)
+                        return data
+                    if response.status == 429 or response.status >= 500:
+                        _LOGGER.debug(f'{url}返回{response.status}，第{attempt + 1}次请求')
+                        continue
+                    _LOGGER.info(f'{year}年度的节假日信息api尚未更新（{response.status}）')
+                    return self._last_good.get(year)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                self.last_status = type(e).__name__
+                self.last_latency = round((time.perf_counter() - start) * 1000, 1)
+                _LOGGER.debug(f'{url}请求失败：{e!r}，第{attempt + 1}次请求')
+        _LOGGER.warning(f'{year}年度的节假日信息api更新失败，继续使用已有数据')
+        return self._last_good.get(year)
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        full jitter指数退避：在[0, min(上限, 基数*2^attempt)]内随机取值
+        :param attempt: 第几次重试，从1开始
+        :return:
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _remember(self, year: int, headers, data: dict) -> None:
+        """记录成功的数据及其校验信息，供下一次条件请求使用"""
+        self._last_good[year] = data
+        validators = {}
+        if etag := headers.get('ETag'):
+            validators['If-None-Match'] = etag
+        if last_modified := headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = last_modified
+        self._validators[year] = validators
 
 
 
@@ -1,10 +1,20 @@
 """Config flow for Date and Time Sensor integration."""
+import os.path
 import re
 import voluptuous as vol
 from datetime import datetime
-from lunar_python import Lunar
 from homeassistant import config_entries
-from .const import DOMAIN
+from homeassistant.core import callback
+from homeassistant.helpers.selector import (
+    NumberSelector, NumberSelectorConfig, NumberSelectorMode, SelectSelector, SelectSelectorConfig,
+    SelectSelectorMode, TextSelector, TextSelectorConfig
+)
+from .const import (DOMAIN, TIME_PERIODS, CONF_TIME_PERIODS, CONF_BLOCKING_THRESHOLD, DEFAULT_BLOCKING_THRESHOLD,
+                    CONF_HOLIDAY_PROVIDER, CONF_HOLIDAY_SOURCE, HOLIDAY_PROVIDERS)
+from .lunar_cache import lunar_to_solar
+from .lunar_table import load_table
+from .periods import periods_to_text, text_to_periods, validate_periods
+from .providers import is_url, resolve_source
 
 
 # 定义性别枚举验证器
@@ -19,14 +29,20 @@ class DateAndTimeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     def __init__(self):
         self.anniversaries = []
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """选项流程：自定义时间段"""
+        return DateAndTimeOptionsFlow()
+
 
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         errors = {}
         if user_input is not None:
             try:
-                # 验证当前输入的纪念日信息
-                validated_data = self._validate_input(user_input)
+                # 验证当前输入的纪念日信息，阴历日期的换算可能导入并调用lunar_python，放到executor中执行
+                validated_data = await self.hass.async_add_executor_job(self._validate_input, user_input)
                 # 将验证通过的纪念日添加到列表
                 self.anniversaries.append(validated_data)
 
@@ -102,7 +118,9 @@ class DateAndTimeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     @staticmethod
     def _validate_input(user_input: dict) -> dict:
-        """验证输入数据的自定义方法"""
+        """
+        验证输入数据的自定义方法（阻塞：对照表未加载或日期超出其范围时由lunar_python换算阴历日期）
+        """
         # 基础验证
         base_schema = vol.Schema({
             vol.Required("anniversary_name"): str,
@@ -131,8 +149,76 @@ class DateAndTimeConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             try:
                 # 验证阴历日期是否真实存在
                 # 注意：阴历月份和日期需符合农历规则（如腊月是12月，闰月会特殊处理）
-                Lunar(year, month, day, 0, 0, 0)
-            except Exception as e:
+                # 对照表通常已在启动时加载，这里确保加载过，1900—2100年的日期不必导入lunar_python
+                load_table()
+                lunar_to_solar(year, month, day)
+            except ValueError as e:
                 raise vol.Invalid(f"阴历日期格式错误：{str(e)}")
 
         return data
+
+
+class DateAndTimeOptionsFlow(config_entries.OptionsFlow):
+    """Options flow for date and time Sensor."""
+
+    async def async_step_init(self, user_input=None):
+        """自定义时间段（每行一个：开始,结束,名称）、刷新阶段占用事件循环的告警阈值和节假日数据源"""
+        errors = {}
+        if user_input is not None:
+            source = (user_input.get(CONF_HOLIDAY_SOURCE) or "").strip()
+            try:
+                periods = text_to_periods(user_input[CONF_TIME_PERIODS])
+                # 在保存前用参考日出日落编译一次，检查格式、缺口和重叠
+                validate_periods(periods)
+                await self._validate_source(user_input[CONF_HOLIDAY_PROVIDER], source)
+            except ValueError as e:
+                errors["base"] = str(e)
+            else:
+                return self.async_create_entry(data={
+                    **self.config_entry.options,
+                    CONF_TIME_PERIODS: periods,
+                    CONF_BLOCKING_THRESHOLD: user_input[CONF_BLOCKING_THRESHOLD],
+                    CONF_HOLIDAY_PROVIDER: user_input[CONF_HOLIDAY_PROVIDER],
+                    CONF_HOLIDAY_SOURCE: source,
+                })
+
+        current = self.config_entry.options.get(CONF_TIME_PERIODS, TIME_PERIODS)
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Required(CONF_TIME_PERIODS, default=periods_to_text(current)): TextSelector(
+                    TextSelectorConfig(multiline=True)
+                ),
+                vol.Required(CONF_BLOCKING_THRESHOLD, default=self.config_entry.options.get(
+                    CONF_BLOCKING_THRESHOLD, DEFAULT_BLOCKING_THRESHOLD)): NumberSelector(
+                    NumberSelectorConfig(min=1, max=5000, step=1, mode=NumberSelectorMode.BOX,
+                                         unit_of_measurement="ms")
+                ),
+                vol.Required(CONF_HOLIDAY_PROVIDER, default=self.config_entry.options.get(
+                    CONF_HOLIDAY_PROVIDER, HOLIDAY_PROVIDERS[0])): SelectSelector(
+                    SelectSelectorConfig(options=list(HOLIDAY_PROVIDERS), mode=SelectSelectorMode.DROPDOWN,
+                                         translation_key=CONF_HOLIDAY_PROVIDER)
+                ),
+                vol.Optional(CONF_HOLIDAY_SOURCE, description={
+                    "suggested_value": self.config_entry.options.get(CONF_HOLIDAY_SOURCE, "")}): TextSelector(),
+            }),
+            errors=errors,
+            description_placeholders={
+                "example": "sunset-0:30,21:30,傍晚"
+            }
+        )
+
+    async def _validate_source(self, provider: str, source: str) -> None:
+        """本地文件类的数据源需要填写路径且文件存在，api可以留空使用默认地址"""
+        if provider == "api":
+            if source and not is_url(source):
+                raise ValueError("节假日api的地址必须以http://或https://开头")
+            return
+        if not source:
+            raise ValueError("请填写节假日数据源的文件路径或网址")
+        if provider == "json" and is_url(source):
+            raise ValueError("json数据源只支持本地文件")
+        if not is_url(source):
+            path = resolve_source(self.hass, source)
+            if not await self.hass.async_add_executor_job(os.path.isfile, path):
+                raise ValueError(f"文件{path}不存在")
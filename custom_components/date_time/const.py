@@ -9,7 +9,6 @@
 v1.0:
 """
 import os
-from lunar_python import LunarMonth
 
 DOMAIN = "date_time"
 FORMAT_DATE: str = '%Y-%m-%d'
@@ -31,6 +30,36 @@ TIME_PERIODS = [
     ('23:00', '0:00', "午夜"),
 ]
 TIME_PERIOD_ENUM_VALUES = [label for _, _, label in TIME_PERIODS] + ["初始化中", "未知错误"]
+# 太阳事件名称，同时也是时间段配置中可以使用的时间点
+SOLAR_EVENTS: tuple[str, ...] = (
+    'dawn', 'sunrise', 'noon', 'sunset', 'dusk',
+    'golden_morning_start', 'golden_morning_end', 'golden_evening_start', 'golden_evening_end',
+)
+# 时间段实体属性中展示的太阳事件
+SOLAR_EVENT_LABELS: tuple[tuple[str, str], ...] = (
+    ('dawn', '曙光时间'),
+    ('sunrise', '日出时间'),
+    ('golden_morning_end', '晨间黄金时刻结束'),
+    ('noon', '正午时间'),
+    ('golden_evening_start', '傍晚黄金时刻开始'),
+    ('sunset', '日落时间'),
+    ('dusk', '暮光时间'),
+)
+# 二十四节气，按在阳历年内的顺序
+SOLAR_TERMS: tuple[str, ...] = (
+    '小寒', '大寒', '立春', '雨水', '惊蛰', '春分', '清明', '谷雨', '立夏', '小满', '芒种', '夏至',
+    '小暑', '大暑', '立秋', '处暑', '白露', '秋分', '寒露', '霜降', '立冬', '小雪', '大雪', '冬至',
+)
+# 选项中自定义时间段的键，值的格式同TIME_PERIODS
+CONF_TIME_PERIODS = "time_periods"
+# 选项中刷新阶段占用事件循环的告警阈值（毫秒）
+CONF_BLOCKING_THRESHOLD = "blocking_threshold"
+DEFAULT_BLOCKING_THRESHOLD = 50
+# 选项中节假日数据源的类型和地址（api地址、本地文件路径或.ics的网址），相对路径相对于HA的配置目录
+CONF_HOLIDAY_PROVIDER = "holiday_provider"
+CONF_HOLIDAY_SOURCE = "holiday_source"
+# 时间段切换时触发的事件，数据包含entity_id、from、to、start、end
+EVENT_PERIOD_CHANGED = "date_time_period_changed"
 # 开灯选项：第一个为白天（不开灯），第二个为晚上（强光），第三个为半夜（弱光）
 LIGHTING_OPTION = [
     (("上午", "中午", "下午"), "白天"),
@@ -46,7 +75,12 @@ VOICE_OPTION = [
 UPDATE_SCHEDULE = (2, 0, 0)
 
 # 节假日实体常数
+HOLIDAY_API: str = r'https://api.jiejiariapi.com/v1/holidays'
+# 节假日数据源类型：节假日api、本地json文件、iCalendar（本地文件或网址）
+HOLIDAY_PROVIDERS: tuple[str, ...] = ('api', 'json', 'ics')
 HOLIDAY_STATE_ENUM_VALUES = ["工作日", "调休日", "休息日", "节假日", "初始化中", "未知错误"]
+# 节假日索引中每天的状态码，与HOLIDAY_STATE_ENUM_VALUES的前四项一一对应
+STATE_WORKDAY, STATE_SHIFT_WORKDAY, STATE_WEEKEND, STATE_HOLIDAY = range(4)
 SOLAR_FESTIVAL: dict = {'0101': ['元旦节'], '0202': ['世界湿地日'], '0210': ['国际气象节'], '0214': ['情人节'],
                         '0301': ['国际海豹日'], '0303': ['全国爱耳日'], '0305': ['学雷锋纪念日'], '0308': ['妇女节'],
                         '0312': ['植树节', '孙中山逝世纪念日'], '0314': ['国际警察日'], '0315': ['消费者权益日'],
@@ -91,6 +125,19 @@ LUNAR_FESTIVAL: dict = {'0101': ['春节'], '0115': ['元宵节'], '0202': ['春
 
 # 纪念日/生日实体常数
 
+# 服务
+SERVICE_QUERY_RANGE = "query_range"
+SERVICE_COUNT_WORKDAYS = "count_workdays"
+SERVICE_ADD_WORKDAYS = "add_workdays"
+SERVICE_QUERY_ALMANAC = "query_almanac"
+SERVICE_QUERY_DATES = "query_dates"
+# 单次区间查询的最大天数
+MAX_QUERY_DAYS = 3660
+# 单次黄历查询的最大天数，黄历需要逐日计算，上限远小于节假日查询
+MAX_ALMANAC_DAYS = 366
+# 单次批量日期查询的最大日期数
+MAX_BATCH_DATES = 366
+
 __all__ = [
     'DOMAIN',
     'FORMAT_DATE',
@@ -99,10 +146,33 @@ __all__ = [
     'FORMAT_DATETIME_SHORT',
     'TIME_PERIODS',
     'TIME_PERIOD_ENUM_VALUES',
+    'SOLAR_EVENTS',
+    'SOLAR_EVENT_LABELS',
+    'SOLAR_TERMS',
+    'CONF_TIME_PERIODS',
+    'CONF_BLOCKING_THRESHOLD',
+    'DEFAULT_BLOCKING_THRESHOLD',
+    'CONF_HOLIDAY_PROVIDER',
+    'CONF_HOLIDAY_SOURCE',
+    'EVENT_PERIOD_CHANGED',
     'LIGHTING_OPTION',
     'VOICE_OPTION',
     'UPDATE_SCHEDULE',
+    'HOLIDAY_API',
+    'HOLIDAY_PROVIDERS',
     'HOLIDAY_STATE_ENUM_VALUES',
+    'STATE_WORKDAY',
+    'STATE_SHIFT_WORKDAY',
+    'STATE_WEEKEND',
+    'STATE_HOLIDAY',
     'SOLAR_FESTIVAL',
-    'LUNAR_FESTIVAL'
+    'LUNAR_FESTIVAL',
+    'SERVICE_QUERY_RANGE',
+    'SERVICE_COUNT_WORKDAYS',
+    'SERVICE_ADD_WORKDAYS',
+    'SERVICE_QUERY_ALMANAC',
+    'SERVICE_QUERY_DATES',
+    'MAX_QUERY_DAYS',
+    'MAX_ALMANAC_DAYS',
+    'MAX_BATCH_DATES'
 ]
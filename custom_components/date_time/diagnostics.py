@@ -0,0 +1,18 @@
+"""Diagnostics support for Date and Time Sensor."""
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .lunar_cache import cache_stats
+from .metrics import collect
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """诊断信息：配置概要、最近一次刷新的性能指标和农历缓存的原始统计"""
+    coordinator = hass.data.get(DOMAIN, {}).get('refreshable_sensor')
+    return {
+        'anniversaries': len(entry.data.get('anniversaries', [])),
+        'options': dict(entry.options),
+        'metrics': collect(hass, coordinator) if coordinator is not None else None,
+        'lunar_cache': cache_stats(),
+    }
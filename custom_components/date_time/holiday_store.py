@@ -0,0 +1,248 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：holiday_store.py
+@文档说明：
+节假日数据的紧凑二进制格式（holiday.bin），保留所有年度的历史数据
+每个年度保存按天打包的状态码（每天2位）和有名称的日期列表，名称在整个文件中只保存一次
+读取时只解析文件头、名称表和年度目录，各年度的数据在第一次用到时才解码
+
+文件格式（小端）：
+  文件头     HEADER：魔数、版本、名称数、年度数
+  名称表     每个名称为NAME_LENGTH（UTF-8字节数）+ UTF-8字节
+  年度目录   DIRECTORY × 年度数：年份、年度数据在文件中的偏移、长度
+  年度数据   YEAR_HEADER：天数、有名称的日期数；打包的状态码 ceil(天数/4) 字节；ENTRY × 日期数：年内序号、名称序号
+"""
+import calendar
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from datetime import date
+from typing import Iterable
+
+from .const import STATE_HOLIDAY, STATE_SHIFT_WORKDAY, STATE_WEEKEND, STATE_WORKDAY
+
+MAGIC: bytes = b'DTHD'
+VERSION: int = 1
+HEADER = struct.Struct('<4sHHH')
+NAME_LENGTH = struct.Struct('<H')
+DIRECTORY = struct.Struct('<HII')
+YEAR_HEADER = struct.Struct('<HH')
+ENTRY = struct.Struct('<HH')
+# 一个字节中的4个状态码，按字节值查表解包
+_UNPACK: tuple[bytes, ...] = tuple(bytes((value >> shift) & 3 for shift in (0, 2, 4, 6)) for value in range(256))
+
+
+def holiday_codes(year: int, holidays: dict = None) -> bytearray:
+    """
+    按周末规则填充全年的状态码，再用api格式的节假日数据覆盖
+    :param year: 年份
+    :param holidays: {'2025-10-01': {'date': ..., 'name': ..., 'isOffDay': True}, ...}
+    :return: 每天一个字节的状态码，取值见const中的STATE_*
+    """
+    first_ordinal = date(year, 1, 1).toordinal()
+    # 不构造下一年的1月1日，9999年也能编译
+    days = 366 if calendar.isleap(year) else 365
+    first_weekday = date(year, 1, 1).weekday()
+    codes = bytearray(
+        STATE_WEEKEND if (first_weekday + offset) % 7 >= 5 else STATE_WORKDAY for offset in range(days)
+    )
+    for key, value in (holidays or {}).items():
+        offset = date.fromisoformat(key).toordinal() - first_ordinal
+        if 0 <= offset < days:
+            codes[offset] = STATE_HOLIDAY if value['isOffDay'] else STATE_SHIFT_WORKDAY
+    return codes
+
+
+class YearRecord:
+    """
+    一个年度的节假日数据：每天的状态码和有名称的日期
+    """
+    __slots__ = ('year', 'codes', 'entries')
+
+    def __init__(self, year: int, codes: bytearray, entries: list[tuple[int, str]]) -> None:
+        self.year = year
+        self.codes = codes
+        # (年内序号, 名称)，按年内序号排序
+        self.entries = entries
+
+    @classmethod
+    def from_holidays(cls, year: int, holidays: dict) -> 'YearRecord':
+        """
+        由api格式的年度数据构建，不属于该年度的日期被忽略
+        :param year: 年份
+        :param holidays: api返回的年度节假日字典
+        :return:
+        """
+        codes = holiday_codes(year, holidays)
+        first_ordinal = date(year, 1, 1).toordinal()
+        entries = []
+        for key, value in holidays.items():
+            offset = date.fromisoformat(key).toordinal() - first_ordinal
+            if 0 <= offset < len(codes):
+                entries.append((offset, value['name']))
+        entries.sort()
+        return cls(year, codes, entries)
+
+    def to_holidays(self) -> dict:
+        """还原为api格式的年度数据"""
+        first_ordinal = date(self.year, 1, 1).toordinal()
+        holidays = {}
+        for offset, name in self.entries:
+            key = date.fromordinal(first_ordinal + offset).isoformat()
+            holidays[key] = {'date': key, 'name': name, 'isOffDay': self.codes[offset] == STATE_HOLIDAY}
+        return holidays
+
+
+class HolidayStore:
+    """
+    holiday.bin的只读视图，年度数据在第一次访问时解码并缓存
+    """
+
+    def __init__(self, raw: bytes = b'') -> None:
+        """
+        :param raw: 文件内容，为空时表示没有任何年度
+        :raises ValueError: 文件格式或版本不符
+        """
+        self._raw = memoryview(raw)
+        self.names: list[str] = []
+        self._directory: dict[int, tuple[int, int]] = {}
+        self._records: dict[int, YearRecord] = {}
+        self._digest: str | None = None
+        if not raw:
+            return
+        if len(raw) < HEADER.size:
+            raise ValueError('节假日文件不完整')
+        magic, version, name_count, year_count = HEADER.unpack_from(raw)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'不是版本{VERSION}的节假日文件')
+        position = HEADER.size
+        for _ in range(name_count):
+            (length,) = NAME_LENGTH.unpack_from(raw, position)
+            position += NAME_LENGTH.size
+            self.names.append(bytes(raw[position:position + length]).decode('utf-8'))
+            position += length
+        for year, offset, size in DIRECTORY.iter_unpack(raw[position:position + DIRECTORY.size * year_count]):
+            self._directory[year] = (offset, size)
+
+    @property
+    def years(self) -> list[int]:
+        """文件中的所有年度"""
+        return sorted(self._directory)
+
+    @property
+    def digest(self) -> str:
+        """文件内容的摘要，第一次访问时计算"""
+        if self._digest is None:
+            self._digest = hashlib.blake2b(self._raw, digest_size=16).hexdigest()
+        return self._digest
+
+    def __contains__(self, year: int) -> bool:
+        return year in self._directory
+
+    def record(self, year: int) -> YearRecord | None:
+        """
+        获取一个年度的数据，第一次访问时解码
+        :param year: 年份
+        :return: 没有该年度时返回None
+        """
+        record = self._records.get(year)
+        if record is None and year in self._directory:
+            offset, _ = self._directory[year]
+            days, entry_count = YEAR_HEADER.unpack_from(self._raw, offset)
+            position = offset + YEAR_HEADER.size
+            packed = self._raw[position:position + (days + 3) // 4]
+            codes = bytearray(b''.join(_UNPACK[value] for value in packed)[:days])
+            position += len(packed)
+            entries = [
+                (day, self.names[name_id])
+                for day, name_id in ENTRY.iter_unpack(self._raw[position:position + ENTRY.size * entry_count])
+            ]
+            record = self._records[year] = YearRecord(year, codes, entries)
+        return record
+
+    @classmethod
+    def read(cls, path: str) -> 'HolidayStore':
+        """
+        读取文件（阻塞）
+        :param path: 文件路径
+        :return:
+        :raises ValueError: 文件格式或版本不符
+        """
+        with open(path, 'rb') as file:
+            return cls(file.read())
+
+
+def write_atomic(path: str, raw: bytes) -> None:
+    """
+    原子地写入文件（阻塞）：先写同目录下的临时文件并落盘，再替换目标文件，中途崩溃不会留下不完整的文件
+    :param path: 文件路径
+    :param raw: 文件内容
+    :return:
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(raw)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _pack(codes: bytearray) -> bytes:
+    packed = bytearray((len(codes) + 3) // 4)
+    for offset, code in enumerate(codes):
+        packed[offset >> 2] |= code << ((offset & 3) * 2)
+    return bytes(packed)
+
+
+def encode(records: Iterable[YearRecord]) -> bytes:
+    """
+    把各年度的数据编码为holiday.bin的内容
+    :param records: 各年度的数据
+    :return:
+    """
+    records = sorted(records, key=lambda record: record.year)
+    names: dict[str, int] = {}
+    for record in records:
+        for _, name in record.entries:
+            names.setdefault(name, len(names))
+    name_table = b''.join(
+        NAME_LENGTH.pack(len(encoded)) + encoded for encoded in (name.encode('utf-8') for name in names)
+    )
+    blocks = [
+        YEAR_HEADER.pack(len(record.codes), len(record.entries)) + _pack(record.codes)
+        + b''.join(ENTRY.pack(day, names[name]) for day, name in record.entries)
+        for record in records
+    ]
+    offset = HEADER.size + len(name_table) + DIRECTORY.size * len(records)
+    directory = bytearray()
+    for record, block in zip(records, blocks):
+        directory += DIRECTORY.pack(record.year, offset, len(block))
+        offset += len(block)
+    return HEADER.pack(MAGIC, VERSION, len(names), len(records)) + name_table + bytes(directory) + b''.join(blocks)
+
+
+def from_json(raw: bytes | str) -> bytes:
+    """
+    把旧版holiday.json（{年份: api格式的年度数据}）转换为holiday.bin的内容
+    :param raw: json文件内容
+    :return:
+    """
+    years = json.loads(raw)
+    return encode(YearRecord.from_holidays(int(year), holidays) for year, holidays in years.items())
+
+
+def to_json(store: HolidayStore) -> dict:
+    """
+    把holiday.bin还原为旧版holiday.json的结构，便于查看和比对
+    :param store:
+    :return: {年份字符串: api格式的年度数据}
+    """
+    return {str(year): store.record(year).to_holidays() for year in store.years}
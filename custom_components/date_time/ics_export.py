@@ -0,0 +1,186 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：ics_export.py
+@文档说明：
+导出iCalendar（.ics）订阅：节假日和调休上班日、阳历和农历节日、二十四节气，以及配置的纪念日/生日
+/api/date_time/calendar.ics?start=2025&end=2026，start、end为起止年份（含），默认为今年和明年
+与HA的其他api一样需要认证：请求头带Authorization: Bearer <长期访问令牌>，面向能设置请求头的系统（排班、会议室预订等）
+按网址订阅、不能设置请求头的日历客户端（手机日历等）无法直接订阅，需要由能带令牌的一方定期拉取后转发
+日历由生成器逐行产生，在executor中分批生成并写入响应，大的年份范围也不会整体留在内存中；
+ETag由格式版本、年份范围、节假日数据的摘要和纪念日配置决定，订阅方带If-None-Match轮询时直接返回304
+"""
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from itertools import islice
+from typing import Iterator
+
+from aiohttp import web
+from homeassistant.components.http import HomeAssistantView
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .anniversary import build_record, parse_origin
+from .calc import HOLIDAY_CACHE, FestivalIndex
+from .const import DOMAIN, STATE_HOLIDAY
+from .lunar_cache import resolve_lunar
+from .solar_terms import terms_for_years
+
+# 日历内容的格式版本，生成规则变化时加一，使订阅方的缓存失效
+FEED_VERSION = 1
+PRODID = '-//date_time//Home Assistant//ZH'
+# 一次最多导出的年数
+MAX_EXPORT_YEARS = 20
+# 每次在executor中生成的行数
+CHUNK_LINES = 2000
+# (开始日期, 结束日期（不含）, 摘要, 分类)
+Event = tuple[date, date, str, str]
+
+
+def _escape(text: str) -> str:
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def _fold(line: str) -> str:
+    """按RFC 5545把超过75字节的行折行，不拆开UTF-8字符"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts, start, limit = [], 0, 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and encoded[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start, limit = end, 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def holiday_events(year: int) -> Iterator[Event]:
+    """节假日数据中的放假和调休上班，同名且连续的日期合并为一个事件"""
+    record = HOLIDAY_CACHE.record(year)
+    if record is None:
+        return
+    first = date(year, 1, 1).toordinal()
+    run: list | None = None
+    for offset, name in record.entries:
+        label = f'{name} {"休" if record.codes[offset] == STATE_HOLIDAY else "班"}'
+        if run is not None and run[1] == offset and run[2] == label:
+            run[1] = offset + 1
+            continue
+        if run is not None:
+            yield date.fromordinal(first + run[0]), date.fromordinal(first + run[1]), run[2], '节假日'
+        run = [offset, offset + 1, label]
+    if run is not None:
+        yield date.fromordinal(first + run[0]), date.fromordinal(first + run[1]), run[2], '节假日'
+
+
+def festival_events(year: int) -> Iterator[Event]:
+    """SOLAR_FESTIVAL和LUNAR_FESTIVAL中当年的节日"""
+    index = FestivalIndex(date(year, 1, 1))
+    end = date(year + 1, 1, 1).toordinal()
+    for ordinal, names in zip(index.ordinals, index.names):
+        if ordinal >= end:
+            break
+        day = date.fromordinal(ordinal)
+        yield day, day + timedelta(days=1), '、'.join(names), '节日'
+
+
+def solar_term_events(year: int) -> Iterator[Event]:
+    """当年的二十四节气，不在共享的节气表中的年份单独计算，导出很远的年份也不会让共享的表增大"""
+    for moment, name in terms_for_years(year, year).year_terms(year):
+        yield moment.date(), moment.date() + timedelta(days=1), name, '节气'
+
+
+def anniversary_events(entries: list[dict], year: int) -> Iterator[Event]:
+    """配置的纪念日/生日在当年的日期，农历按纪念日传感器的规则换算"""
+    for entry in entries:
+        origin, solar_origin = parse_origin(entry)
+        if entry['date_type'] == '阳历':
+            try:
+                days = [origin.replace(year=year)]
+            except ValueError:  # 2月29日在平年取2月28日
+                days = [date(year, 2, 28)]
+        else:
+            # 农历年与阳历年错开，当年可能包含上一个农历年腊月的日期
+            days = [resolve_lunar(lunar_year, origin.month, origin.day) for lunar_year in (year - 1, year)]
+        for day in days:
+            if day.year == year > solar_origin.year:
+                hint = build_record(entry, solar_origin, day, 0, 0, '').hint
+                yield day, day + timedelta(days=1), hint, entry['anniversary_type']
+
+
+def ics_lines(first_year: int, last_year: int, anniversaries: list[dict], stamp: datetime) -> Iterator[str]:
+    """
+    逐行生成日历，每行以CRLF结尾
+    :param first_year: 起始年份
+    :param last_year: 结束年份（含）
+    :param anniversaries: 纪念日配置
+    :param stamp: DTSTAMP，UTC时间
+    :return:
+    """
+    yield from ('BEGIN:VCALENDAR\r\n', 'VERSION:2.0\r\n', f'PRODID:{PRODID}\r\n', 'CALSCALE:GREGORIAN\r\n',
+                'X-WR-CALNAME:日期和时间\r\n')
+    dtstamp = stamp.strftime('%Y%m%dT%H%M%SZ')
+    for year in range(first_year, last_year + 1):
+        for source in (holiday_events(year), festival_events(year), solar_term_events(year),
+                       anniversary_events(anniversaries, year)):
+            for start, end, summary, category in source:
+                uid = hashlib.sha1(f'{category}{start}{summary}'.encode('utf-8')).hexdigest()[:16]
+                yield from ('BEGIN:VEVENT\r\n', f'UID:{uid}@{DOMAIN}\r\n', f'DTSTAMP:{dtstamp}\r\n',
+                            f'DTSTART;VALUE=DATE:{start:%Y%m%d}\r\n', f'DTEND;VALUE=DATE:{end:%Y%m%d}\r\n',
+                            _fold(f'SUMMARY:{_escape(summary)}'), _fold(f'CATEGORIES:{_escape(category)}'),
+                            'TRANSP:TRANSPARENT\r\n', 'END:VEVENT\r\n')
+    yield 'END:VCALENDAR\r\n'
+
+
+def feed_etag(first_year: int, last_year: int, anniversaries: list[dict]) -> str:
+    """日历的ETag：格式版本、年份范围、节假日数据的摘要和纪念日配置都不变时不变"""
+    digest = hashlib.sha1(json.dumps(
+        [FEED_VERSION, first_year, last_year, HOLIDAY_CACHE.digest, anniversaries], ensure_ascii=False,
+        sort_keys=True).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+class CalendarExportView(HomeAssistantView):
+    """iCalendar导出，需要HA的访问令牌（Authorization请求头），不支持不带令牌的订阅网址"""
+    url = '/api/date_time/calendar.ics'
+    requires_auth = True
+    name = 'api:date_time:calendar'
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+
+    async def get(self, request: web.Request) -> web.StreamResponse:
+        this_year = dt_util.now().year
+        try:
+            first_year = int(request.query.get('start', this_year))
+            last_year = int(request.query.get('end', max(first_year, this_year) + 1))
+        except ValueError:
+            return self.json_message('start、end必须是年份', 400)
+        if not 1 <= last_year - first_year + 1 <= MAX_EXPORT_YEARS or first_year < 1901 or last_year > 2099:
+            return self.json_message(f'年份范围必须在1901—2099之间，且不超过{MAX_EXPORT_YEARS}年', 400)
+
+        await HOLIDAY_CACHE.async_load(self.hass)
+        anniversaries = [anniversary for entry in self.hass.config_entries.async_entries(DOMAIN)
+                         for anniversary in entry.data.get('anniversaries', [])]
+        etag = feed_etag(first_year, last_year, anniversaries)
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+        if etag in request.headers.get('If-None-Match', ''):
+            return web.Response(status=304, headers=headers)
+
+        response = web.StreamResponse(headers={
+            **headers,
+            'Content-Type': 'text/calendar; charset=utf-8',
+            'Content-Disposition': f'attachment; filename="date_time_{first_year}_{last_year}.ics"',
+        })
+        await response.prepare(request)
+        lines = ics_lines(first_year, last_year, anniversaries, dt_util.utcnow())
+        while chunk := await self.hass.async_add_executor_job(_next_chunk, lines):
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+
+def _next_chunk(lines: Iterator[str]) -> bytes:
+    return ''.join(islice(lines, CHUNK_LINES)).encode('utf-8')
@@ -0,0 +1,159 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：lunar_cache.py
+@文档说明：
+lunar_python换算的统一缓存层，所有农历/阳历换算都应经过这里
+每个换算都是有上限的LRU缓存，直接返回date对象，不再经过字符串和strptime
+对照表（lunar_table.bin）加载后，年月日换算直接查表，lunar_python只作为表范围之外的后备
+lunar_python在第一次用到时才导入（通常在executor中），不增加集成的导入时间
+"""
+from datetime import date, datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from .lunar_table import get_table
+
+if TYPE_CHECKING:
+    from lunar_python import Lunar
+
+
+def _as_date(day: date) -> date:
+    """datetime统一为date，保证缓存键一致"""
+    return date(day.year, day.month, day.day)
+
+
+@lru_cache(maxsize=512)
+def _lunar_from_date(day: date) -> 'Lunar':
+    from lunar_python import Lunar
+    return Lunar.fromDate(datetime(day.year, day.month, day.day))
+
+
+def lunar_from_date(day: date) -> 'Lunar':
+    """
+    阳历日期对应的Lunar对象（时辰为0点）
+    :param day: 阳历日期，date或datetime均可
+    :return:
+    """
+    return _lunar_from_date(_as_date(day))
+
+
+def solar_to_lunar(day: date) -> tuple[int, int, int]:
+    """
+    阳历日期换算为农历年月日
+    :param day: 阳历日期，date或datetime均可
+    :return: (农历年, 农历月（闰月为负数）, 农历日)
+    """
+    return _solar_to_lunar(_as_date(day))
+
+
+@lru_cache(maxsize=512)
+def _solar_to_lunar(day: date) -> tuple[int, int, int]:
+    table = get_table()
+    if table is not None and (result := table.solar_to_lunar(day)) is not None:
+        return result
+    lunar = _lunar_from_date(day)
+    return lunar.getYear(), lunar.getMonth(), lunar.getDay()
+
+
+@lru_cache(maxsize=1024)
+def lunar_to_solar(year: int, month: int, day: int) -> date:
+    """
+    农历日期换算为阳历日期
+    :param year: 农历年
+    :param month: 农历月，闰月为负数
+    :param day: 农历日
+    :return:
+    :raises ValueError: 农历日期不存在（如小月的三十、不存在的闰月）
+    """
+    table = get_table()
+    if table is not None and table.has_year(year):
+        return table.lunar_to_solar(year, month, day)
+    from lunar_python import Lunar
+    try:
+        solar = Lunar.fromYmd(year, month, day).getSolar()
+    except Exception as e:
+        raise ValueError(f'农历日期{year}年{month}月{day}日不存在：{e}') from e
+    return date(solar.getYear(), solar.getMonth(), solar.getDay())
+
+
+@lru_cache(maxsize=256)
+def lunar_month_days(year: int, month: int) -> int:
+    """
+    农历月的天数
+    :param year: 农历年
+    :param month: 农历月，闰月为负数
+    :return: 29或30
+    """
+    table = get_table()
+    if table is not None and (days := table.month_days(year, month)) is not None:
+        return days
+    from lunar_python import LunarMonth
+    return LunarMonth.fromYm(year, month).getDayCount()
+
+
+@lru_cache(maxsize=1024)
+def resolve_lunar(year: int, month: int, day: int) -> date:
+    """
+    按纪念日的规则把农历月日落到指定农历年：当年没有该闰月时取同名的普通月，
+    当月没有三十（小月）时取当月最后一天
+    :param year: 农历年
+    :param month: 农历月，闰月为负数
+    :param day: 农历日
+    :return:
+    """
+    table = get_table()
+    if table is not None and table.has_year(year):
+        return table.resolve(year, month, day)
+    from lunar_python import LunarYear
+    if month < 0 and LunarYear.fromYear(year).getLeapMonth() != -month:
+        month = -month
+    return lunar_to_solar(year, month, min(day, lunar_month_days(year, month)))
+
+
+_GAN = '甲乙丙丁戊己庚辛壬癸'
+_ZHI = '子丑寅卯辰巳午未申酉戌亥'
+_SHENGXIAO = '鼠牛虎兔龙蛇马羊猴鸡狗猪'
+_MONTHS = ('正', '二', '三', '四', '五', '六', '七', '八', '九', '十', '冬', '腊')
+_DAYS = ('初一', '初二', '初三', '初四', '初五', '初六', '初七', '初八', '初九', '初十',
+         '十一', '十二', '十三', '十四', '十五', '十六', '十七', '十八', '十九', '二十',
+         '廿一', '廿二', '廿三', '廿四', '廿五', '廿六', '廿七', '廿八', '廿九', '三十')
+
+
+def lunar_text(day: date) -> str:
+    """
+    阳历日期对应的农历写法，如“乙巳(蛇)年 闰六月初一”，与lunar_python的写法一致
+    只用solar_to_lunar的结果拼写，对照表范围内不需要lunar_python
+    :param day: 阳历日期，date或datetime均可
+    :return:
+    """
+    year, month, lunar_day = solar_to_lunar(day)
+    offset = year - 4
+    return (f'{_GAN[offset % 10]}{_ZHI[offset % 12]}({_SHENGXIAO[offset % 12]})年 '
+            f'{"闰" if month < 0 else ""}{_MONTHS[abs(month) - 1]}月{_DAYS[lunar_day - 1]}')
+
+
+_CACHED = {
+    'lunar_from_date': _lunar_from_date,
+    'solar_to_lunar': _solar_to_lunar,
+    'lunar_to_solar': lunar_to_solar,
+    'lunar_month_days': lunar_month_days,
+    'resolve_lunar': resolve_lunar,
+}
+
+
+def cache_stats() -> dict[str, dict[str, int]]:
+    """
+    各换算缓存的命中/未命中次数
+    :return: {换算名称: {'hits', 'misses', 'size', 'maxsize'}}
+    """
+    stats = {}
+    for name, func in _CACHED.items():
+        info = func.cache_info()
+        stats[name] = {'hits': info.hits, 'misses': info.misses, 'size': info.currsize, 'maxsize': info.maxsize}
+    return stats
+
+
+def cache_clear() -> None:
+    """清空所有换算缓存"""
+    for func in _CACHED.values():
+        func.cache_clear()
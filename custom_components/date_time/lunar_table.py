@@ -0,0 +1,135 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：lunar_table.py
+@文档说明：
+预先生成的农历/阳历对照表（lunar_table.bin），运行时用mmap映射，换算只是数组下标访问
+文件由scripts/gen_lunar_table.py生成，覆盖农历1899—2100年（即阳历1900—2100年全部日期）
+
+文件格式（小端）：
+  文件头   HEADER：魔数、版本、每日记录字节数、首日ordinal、天数、月数
+  月表     MONTH_RECORD × 月数：农历年、农历月（闰月为负数）、当月天数、首日在日表中的序号
+  日表     DAY_RECORD × 天数：农历年-BASE_YEAR、农历月（闰月为负数）、农历日
+"""
+import mmap
+import os.path
+import struct
+import threading
+from datetime import date
+
+MAGIC: bytes = b'DTLN'
+VERSION: int = 1
+BASE_YEAR: int = 1899
+HEADER = struct.Struct('<4sHHIII')
+MONTH_RECORD = struct.Struct('<HbBI')
+DAY_RECORD = struct.Struct('<BbB')
+PATH: str = os.path.join(os.path.dirname(__file__), 'lunar_table.bin')
+
+
+class LunarTable:
+    """
+    mmap映射的农历对照表，只读，可在多个线程中同时使用
+    """
+
+    def __init__(self, path: str = PATH) -> None:
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.first_ordinal, self.day_count, month_count = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or record_size != DAY_RECORD.size:
+            self._mmap.close()
+            raise ValueError(f'{path}不是版本{VERSION}的农历对照表')
+        self._days_offset = HEADER.size + MONTH_RECORD.size * month_count
+        # (农历年, 农历月) -> (首日序号, 天数)，约2500个月，加载时一次性读出
+        self._months: dict[tuple[int, int], tuple[int, int]] = {}
+        for year, month, days, start in MONTH_RECORD.iter_unpack(self._mmap[HEADER.size:self._days_offset]):
+            self._months[(year, month)] = (start, days)
+        self.first_year: int = min(year for year, _ in self._months)
+        self.last_year: int = max(year for year, _ in self._months)
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def solar_to_lunar(self, day: date) -> tuple[int, int, int] | None:
+        """
+        阳历换算农历
+        :param day: 阳历日期，date或datetime均可
+        :return: (农历年, 农历月（闰月为负数）, 农历日)，超出表的范围时返回None
+        """
+        index = day.toordinal() - self.first_ordinal
+        if not 0 <= index < self.day_count:
+            return None
+        year, month, lunar_day = DAY_RECORD.unpack_from(self._mmap, self._days_offset + index * DAY_RECORD.size)
+        return year + BASE_YEAR, month, lunar_day
+
+    def has_year(self, year: int) -> bool:
+        """农历年是否在表的范围内"""
+        return self.first_year <= year <= self.last_year
+
+    def month_days(self, year: int, month: int) -> int | None:
+        """
+        农历月的天数
+        :param year: 农历年
+        :param month: 农历月，闰月为负数
+        :return: 该月不存在（如当年没有这个闰月）时返回None
+        """
+        record = self._months.get((year, month))
+        return record[1] if record else None
+
+    def lunar_to_solar(self, year: int, month: int, day: int) -> date:
+        """
+        农历换算阳历
+        :param year: 农历年
+        :param month: 农历月，闰月为负数
+        :param day: 农历日
+        :return:
+        :raises ValueError: 农历日期不存在或超出表的范围
+        """
+        record = self._months.get((year, month))
+        if record is None or not 1 <= day <= record[1]:
+            raise ValueError(f'农历日期{year}年{month}月{day}日不存在')
+        return date.fromordinal(self.first_ordinal + record[0] + day - 1)
+
+    def resolve(self, year: int, month: int, day: int) -> date:
+        """
+        按纪念日的规则把农历月日落到指定农历年：当年没有该闰月时取同名的普通月，
+        当月没有三十（小月）时取当月最后一天
+        :param year: 农历年
+        :param month: 农历月，闰月为负数
+        :param day: 农历日
+        :return:
+        :raises ValueError: 超出表的范围或月份不合法
+        """
+        if (year, month) not in self._months:
+            month = abs(month)
+        days = self.month_days(year, month)
+        if days is None:
+            raise ValueError(f'农历{year}年没有{month}月')
+        return self.lunar_to_solar(year, month, min(day, days))
+
+
+_table: LunarTable | None = None
+_table_lock = threading.Lock()
+_table_missing: bool = False
+
+
+def load_table(path: str = PATH) -> LunarTable | None:
+    """
+    加载进程内共享的对照表（阻塞，在事件循环中应放到executor中执行），文件缺失或损坏时返回None
+    :param path: 对照表路径
+    :return:
+    """
+    global _table, _table_missing
+    with _table_lock:
+        if _table is None and not _table_missing:
+            try:
+                _table = LunarTable(path)
+            except (OSError, ValueError):
+                _table_missing = True
+        return _table
+
+
+def get_table() -> LunarTable | None:
+    """
+    获取已加载的对照表，不做任何文件读写；尚未加载时返回None，调用方应退回lunar_python
+    :return:
+    """
+    return _table
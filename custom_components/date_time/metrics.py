@@ -0,0 +1,54 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：metrics.py
+@文档说明：
+刷新性能指标的汇总：各阶段耗时、节假日数据源的状态和耗时、预取调度的状态、各缓存的命中率和黄历预计算的情况
+供诊断传感器和diagnostics.py共用
+"""
+from homeassistant.core import HomeAssistant
+
+from .almanac import ALMANAC_CACHE
+from .calc import HOLIDAY_CACHE
+from .const import DOMAIN, FORMAT_DATETIME
+from .lunar_cache import cache_stats
+
+
+def lunar_hit_ratios() -> dict[str, float | None]:
+    """农历换算各LRU缓存的命中率，从未调用过的为None"""
+    ratios = {}
+    for name, info in cache_stats().items():
+        total = info['hits'] + info['misses']
+        ratios[name] = round(info['hits'] / total, 3) if total else None
+    return ratios
+
+
+def collect(hass: HomeAssistant, coordinator) -> dict:
+    """
+    汇总协调器最近一次刷新的性能指标
+    :param hass:
+    :param coordinator: DateCoordinator
+    :return:
+    """
+    solar_cache = hass.data.get(DOMAIN, {}).get('solar_events')
+    return {
+        'refresh': {
+            'time': coordinator.last_refresh_time.strftime(FORMAT_DATETIME) if coordinator.last_refresh_time else None,
+            'duration_ms': coordinator.last_refresh_duration,
+            'count': coordinator.refresh_count,
+            'changed': coordinator.last_changed,
+            'success': coordinator.last_update_success,
+        },
+        'stages': {
+            stage: {'ms': elapsed, 'on_loop': on_loop}
+            for stage, (elapsed, on_loop) in coordinator.watchdog.timings.items()
+        },
+        'loop_blocked_ms': round(sum(elapsed for elapsed, on_loop in coordinator.watchdog.timings.values() if on_loop), 3),
+        'provider': coordinator.provider.stats(),
+        'prefetch': coordinator.prefetcher.stats(),
+        'caches': {
+            'lunar': lunar_hit_ratios(),
+            'holiday_file': HOLIDAY_CACHE.stats(),
+            'solar_events': solar_cache.stats() if solar_cache is not None else None,
+            'almanac': ALMANAC_CACHE.stats(),
+        },
+    }
@@ -0,0 +1,168 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：periods.py
+@文档说明：
+时间段定义的解析和编译
+时间点可以是固定时刻（如'21:30'），也可以是相对太阳事件的偏移（如'sunrise'、'sunset-00:30'、'dusk+1:00'），
+可用的太阳事件见const中的SOLAR_EVENTS
+每天把时间段编译成按开始时间排序的表，编译时检查缺口和重叠，查询时只做bisect
+"""
+import bisect
+import re
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+
+from .const import SOLAR_EVENTS
+
+_POINT_RE = re.compile(rf'^(?:(?P<event>{"|".join(SOLAR_EVENTS)})(?:(?P<sign>[+-])(?P<oh>\d{{1,2}}):(?P<om>\d{{2}}))?'
+                       r'|(?P<h>\d{1,2}):(?P<m>\d{2}))$')
+# 用于在选项流程中校验时间段配置的参考太阳事件时刻
+REFERENCE_SUN: dict[str, time] = {
+    'dawn': time(5, 30), 'sunrise': time(6, 0), 'noon': time(12, 0), 'sunset': time(18, 0), 'dusk': time(18, 30),
+    'golden_morning_start': time(5, 50), 'golden_morning_end': time(6, 40),
+    'golden_evening_start': time(17, 20), 'golden_evening_end': time(18, 10),
+}
+
+
+def parse_point(raw: str) -> tuple[str | None, timedelta]:
+    """
+    解析时间点
+    :param raw: 如'3:00'、'sunrise'、'sunset-00:30'
+    :return: (太阳事件名，固定时刻时为None, 相对事件或当天0点的偏移)
+    :raises ValueError: 格式不合法
+    """
+    match = _POINT_RE.match(raw.strip())
+    if match is None:
+        raise ValueError(f'时间点“{raw}”格式错误，应为H:MM、sunrise、dusk或sunset-0:30这样的形式')
+    if match['event']:
+        offset = timedelta(hours=int(match['oh'] or 0), minutes=int(match['om'] or 0))
+        return match['event'], -offset if match['sign'] == '-' else offset
+    hour, minute = int(match['h']), int(match['m'])
+    if hour > 23 or minute > 59:
+        raise ValueError(f'时间点“{raw}”超出范围')
+    return None, timedelta(hours=hour, minutes=minute)
+
+
+def parse_periods(periods) -> list[tuple[tuple, tuple, str]]:
+    """
+    解析时间段定义
+    :param periods: [(开始, 结束, 名称), ...]，格式同const中的TIME_PERIODS
+    :return: [((事件, 偏移), (事件, 偏移), 名称), ...]
+    :raises ValueError: 时间点格式错误或名称为空
+    """
+    parsed = []
+    for start, end, label in periods:
+        label = label.strip()
+        if not label:
+            raise ValueError(f'时间段[{start}, {end})缺少名称')
+        parsed.append((parse_point(start), parse_point(end), label))
+    if not parsed:
+        raise ValueError('至少需要一个时间段')
+    return parsed
+
+
+def text_to_periods(text: str) -> list[list[str]]:
+    """
+    选项流程中的文本转换为时间段定义，每行一个时间段：开始,结束,名称
+    :param text:
+    :return:
+    :raises ValueError: 某一行不是三列
+    """
+    periods = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        fields = [field.strip() for field in re.split(r'[,，]', line)]
+        if len(fields) != 3:
+            raise ValueError(f'第{number}行应为“开始,结束,名称”')
+        periods.append(fields)
+    return periods
+
+
+def periods_to_text(periods) -> str:
+    """时间段定义转换为选项流程中的文本"""
+    return '\n'.join(f'{start},{end},{label}' for start, end, label in periods)
+
+
+class PeriodTable:
+    """
+    编译好的某一天的时间段表，边界是带时区的datetime，覆盖当天0点到次日0点
+    """
+    __slots__ = ('day', 'starts', 'ends', 'labels')
+
+    def __init__(self, day: date, starts: list[datetime], ends: list[datetime], labels: list[str]) -> None:
+        self.day = day
+        self.starts = starts
+        self.ends = ends
+        self.labels = labels
+
+    def lookup(self, moment: datetime) -> tuple[datetime, datetime, str] | None:
+        """
+        查询时刻所在的时间段
+        :param moment: 带时区的时刻
+        :return: (开始, 结束, 名称)，不在当天范围内时返回None
+        """
+        i = bisect.bisect_right(self.starts, moment) - 1
+        if i < 0 or moment >= self.ends[i]:
+            return None
+        return self.starts[i], self.ends[i], self.labels[i]
+
+
+def compile_periods(parsed, day: date, tz: tzinfo, sun: dict[str, datetime]) -> PeriodTable:
+    """
+    把解析后的时间段编译成指定日期的时间段表
+    跨过0点的时间段拆成当天开头和结尾两段，编译后必须无缝、无重叠地覆盖当天0点到次日0点
+    :param parsed: parse_periods的结果
+    :param day: 本地日期
+    :param tz: 本地时区
+    :param sun: 当天的太阳事件时刻，{'sunrise': datetime, 'sunset': datetime, ...}
+    :return:
+    :raises ValueError: 时间段之间有缺口或重叠，或当天没有用到的太阳事件（极昼、极夜）
+    """
+    midnight = datetime.combine(day, time(), tz)
+    next_midnight = datetime.combine(day + timedelta(days=1), time(), tz)
+
+    def resolve(point: tuple[str | None, timedelta]) -> datetime:
+        event, offset = point
+        if event is not None and event not in sun:
+            raise ValueError(f'{day}没有{event}')
+        base = midnight if event is None else sun[event].astimezone(tz)
+        return base + offset
+
+    segments = []
+    for start_point, end_point, label in parsed:
+        start, end = resolve(start_point), resolve(end_point)
+        if end <= start:
+            end += timedelta(days=1)
+        if end > next_midnight:
+            # 跨过0点：拆成[开始, 次日0点)和[0点, 结束-1天)
+            segments.append((start, next_midnight, label))
+            segments.append((midnight, end - timedelta(days=1), label))
+        else:
+            segments.append((start, end, label))
+    segments = [segment for segment in segments if segment[0] < segment[1]]
+    segments.sort(key=lambda segment: segment[0])
+
+    cursor = midnight
+    for start, end, label in segments:
+        if start > cursor:
+            raise ValueError(f'{cursor:%H:%M}到{start:%H:%M}之间没有定义时间段')
+        if start < cursor:
+            raise ValueError(f'时间段“{label}”的开始{start:%H:%M}与上一个时间段重叠')
+        cursor = end
+    if cursor != next_midnight:
+        raise ValueError(f'{cursor:%H:%M}到24:00之间没有定义时间段')
+    return PeriodTable(day, [s for s, _, _ in segments], [e for _, e, _ in segments], [label for _, _, label in segments])
+
+
+def validate_periods(periods) -> list[tuple[tuple, tuple, str]]:
+    """
+    用参考日出日落时刻校验时间段定义，供选项流程使用
+    :param periods: [(开始, 结束, 名称), ...]
+    :return: parse_periods的结果
+    :raises ValueError: 格式错误、缺口或重叠
+    """
+    parsed = parse_periods(periods)
+    day = date(2000, 3, 20)
+    sun = {event: datetime.combine(day, moment, timezone.utc) for event, moment in REFERENCE_SUN.items()}
+    compile_periods(parsed, day, timezone.utc, sun)
+    return parsed
@@ -0,0 +1,153 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：prefetch.py
+@文档说明：
+后台预取节假日数据：每年从11月起向节假日数据源轮询下一年度的官方数据，取到后立即保存并停止，直到下一年的11月
+跨年时今年的数据已在本地，刷新不再需要读取数据源；缺少今年的数据时（如首次安装）立即开始轮询
+轮询间隔带抖动，数据尚未发布或读取失败时指数退避
+"""
+import logging
+import random
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_point_in_time
+from homeassistant.util import dt as dt_util
+
+from .calc import HOLIDAY_CACHE, HolidayCache, HolidayProvider
+from .const import FORMAT_DATETIME
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HolidayPrefetcher:
+    """
+    节假日数据的后台预取调度，由协调器持有，async_start后自行安排下一次轮询
+    """
+    # 每年从几月开始预取下一年度的数据
+    start_month: int = 11
+    # 预取下一年度时的轮询间隔（秒）
+    interval: float = 6 * 3600
+    # 缺少今年的数据时的轮询间隔（秒）
+    urgent_interval: float = 10 * 60
+    # 退避后的最大间隔（秒）
+    max_interval: float = 24 * 3600
+    # 启动后第一次轮询的随机延迟上限（秒），避免与启动时的其他请求挤在一起
+    startup_jitter: float = 60
+
+    def __init__(self, hass: HomeAssistant, provider: HolidayProvider, cache: HolidayCache = HOLIDAY_CACHE,
+                 on_update: Callable[[int], Awaitable[None]] = None) -> None:
+        """
+        :param hass:
+        :param provider: 协调器长期持有的节假日数据源
+        :param cache: 节假日缓存
+        :param on_update: 取到某个年度的数据后调用，参数为年份
+        """
+        self.hass = hass
+        self.provider = provider
+        self.cache = cache
+        self.on_update = on_update
+        self._unsub = None
+        self._stopped: bool = True
+        # 正在获取的年度，没有需要获取的年度时为None
+        self.target_year: int | None = None
+        self.next_poll: datetime | None = None
+        self.polls: int = 0
+        # 连续未取到数据的次数，用于退避
+        self.failures: int = 0
+        self.fetched_year: int | None = None
+        self.fetched_time: datetime | None = None
+
+    def target(self, today: date) -> int | None:
+        """
+        需要获取的年度：缺少今年的数据时为今年，start_month起缺少明年的数据时为明年，否则为None
+        :param today:
+        :return:
+        """
+        years = self.cache.years
+        if today.year not in years:
+            return today.year
+        if today.month >= self.start_month and today.year + 1 not in years:
+            return today.year + 1
+        return None
+
+    def _delay(self, base: float) -> float:
+        """
+        指数退避后加抖动：在[间隔/2, 间隔]内随机取值
+        :param base: 基础间隔（秒）
+        :return:
+        """
+        delay = min(self.max_interval, base * 2 ** self.failures)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @callback
+    def async_start(self) -> None:
+        """开始调度，需要获取数据时在startup_jitter秒内进行第一次轮询"""
+        self._stopped = False
+        self._schedule(dt_util.now(), random.uniform(0, self.startup_jitter))
+
+    @callback
+    def async_stop(self) -> None:
+        """停止调度"""
+        self._stopped = True
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        self.next_poll = None
+
+    @callback
+    def _schedule(self, now: datetime, delay: float = None) -> None:
+        """
+        安排下一次轮询：有需要获取的年度时按退避间隔轮询，否则等到下一个start_month的1日
+        :param now: 当前时间（带时区）
+        :param delay: 指定的延迟（秒），默认按退避间隔计算
+        :return:
+        """
+        if self._unsub is not None:
+            self._unsub()
+        today = now.date()
+        self.target_year = self.target(today)
+        if self.target_year is None:
+            self.failures = 0
+            window_year = today.year + 1 if today.month >= self.start_month else today.year
+            self.next_poll = dt_util.start_of_local_day(date(window_year, self.start_month, 1)) + timedelta(
+                seconds=random.uniform(0, self.interval))
+        else:
+            if delay is None:
+                delay = self._delay(self.urgent_interval if self.target_year == today.year else self.interval)
+            self.next_poll = now + timedelta(seconds=delay)
+        self._unsub = async_track_point_in_time(self.hass, self._async_poll, self.next_poll)
+
+    async def _async_poll(self, _now: datetime) -> None:
+        self._unsub = None
+        await self.cache.async_load(self.hass)
+        year = self.target(dt_util.now().date())
+        if year is not None:
+            self.polls += 1
+            data = await self.provider.async_fetch(year)
+            if data:
+                await self.hass.async_add_executor_job(self.cache.save_year, year, data)
+                self.cache.async_delay_save(self.hass)
+                self.failures = 0
+                self.fetched_year = year
+                self.fetched_time = datetime.now()
+                _LOGGER.info(f'已获取{year}年度的节假日信息')
+                if self.on_update is not None and not self._stopped:
+                    await self.on_update(year)
+            else:
+                self.failures += 1
+                _LOGGER.debug(f'{year}年度的节假日信息尚未发布，第{self.failures}次')
+        if not self._stopped:
+            self._schedule(dt_util.now())
+
+    def stats(self) -> dict:
+        """调度状态"""
+        return {
+            'target_year': self.target_year,
+            'next_poll': dt_util.as_local(self.next_poll).strftime(FORMAT_DATETIME) if self.next_poll else None,
+            'polls': self.polls,
+            'failures': self.failures,
+            'fetched_year': self.fetched_year,
+            'fetched_time': self.fetched_time.strftime(FORMAT_DATETIME) if self.fetched_time else None,
+        }
@@ -0,0 +1,255 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：providers.py
+@文档说明：
+节假日数据源：除calc中的节假日api（HolidayFetcher）外，还可以使用本地json文件或iCalendar（.ics）
+所有数据源都按年度返回api格式的节假日字典，由调用方写入HolidayCache，编译为同样的年度索引
+iCalendar逐行流式解析：网址按行读取响应，本地文件在executor中逐行读取，都不会把整个文件读入内存
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .calc import HolidayFetcher, HolidayProvider
+from .const import CONF_HOLIDAY_PROVIDER, CONF_HOLIDAY_SOURCE, HOLIDAY_API
+
+_LOGGER = logging.getLogger(__name__)
+# iCalendar中的事件：(开始日期, 结束日期（不含）, 摘要)
+IcsEvent = tuple[date, date, str]
+_ICS_ESCAPE = re.compile(r'\\([\\;,nN])')
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(('http://', 'https://'))
+
+
+def _entry(holidays: dict, day: date, name: str, is_off_day: bool) -> None:
+    key = day.isoformat()
+    holidays[key] = {'date': key, 'name': name, 'isOffDay': is_off_day}
+
+
+class _ReaderProvider(HolidayProvider):
+    """
+    读取文件或下载整个数据源的数据源基类：统一记录统计字段，读取失败时返回None
+    """
+
+    def __init__(self, hass: HomeAssistant, source: str) -> None:
+        super().__init__(source)
+        self.hass = hass
+
+    async def async_fetch(self, year: int) -> dict | None:
+        self.last_year = year
+        self.last_attempts = 1
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            holidays = await self._async_read(year)
+        except (OSError, ValueError, TypeError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.last_status = type(e).__name__
+            _LOGGER.warning(f'节假日数据源{self.source}读取失败：{e!r}')
+            holidays = None
+        else:
+            self.last_status = 'ok' if holidays else 'missing'
+        self.last_latency = round((time.perf_counter() - start) * 1000, 1)
+        self.last_time = datetime.now()
+        return holidays or None
+
+    async def _async_read(self, year: int) -> dict:
+        """
+        读取指定年度的节假日数据
+        :param year: 年份
+        :return: api格式的年度节假日字典，没有该年度时为空字典
+        """
+        raise NotImplementedError
+
+
+class JsonFileProvider(_ReaderProvider):
+    """
+    本地json文件：旧版holiday.json的{年份: 年度数据}，或直接保存的api返回值（{日期: 节假日}，可包含多个年度）
+    """
+    name: str = 'json'
+
+    async def _async_read(self, year: int) -> dict:
+        return await self.hass.async_add_executor_job(self._read, year)
+
+    def _read(self, year: int) -> dict:
+        with open(self.source, 'rb') as file:
+            return self.select(json.load(file), year)
+
+    @staticmethod
+    def select(data: dict, year: int) -> dict:
+        """
+        从json数据中取出指定年度，并整理为api格式
+        :param data: json文件的内容
+        :param year: 年份
+        :return:
+        :raises TypeError: 顶层或年度数据不是对象
+        """
+        if not isinstance(data, dict):
+            raise TypeError('节假日json文件的顶层必须是对象')
+        if str(year) in data:
+            data = data[str(year)]
+            if not isinstance(data, dict):
+                raise TypeError(f'节假日json文件中{year}年度的数据必须是对象')
+        holidays = {}
+        for key, value in data.items():
+            if key.startswith(f'{year}-') and isinstance(value, dict) and 'isOffDay' in value:
+                _entry(holidays, date.fromisoformat(key), value.get('name', ''), bool(value['isOffDay']))
+        return holidays
+
+
+class IcsReader:
+    """
+    iCalendar的逐行解析器：处理折行和转义，每读完一个VEVENT输出一个事件
+    只使用DTSTART、DTEND和SUMMARY，带时间的事件按日期处理；日期格式不对的事件整个丢弃，不影响其他事件
+    """
+
+    def __init__(self) -> None:
+        # 尚未结束的逻辑行（后续行可能是它的折行）
+        self._line: str | None = None
+        self._event: dict | None = None
+
+    def feed(self, line: str) -> Iterator[IcsEvent]:
+        """
+        读入一行
+        :param line: 原始行，可以带换行符
+        :return: 这一行之前结束的事件
+        """
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t'):
+            if self._line is not None:
+                self._line += line[1:]
+            return
+        if self._line is not None:
+            yield from self._property(self._line)
+        self._line = line
+
+    def close(self) -> Iterator[IcsEvent]:
+        """读完最后一行后调用，输出剩余的事件"""
+        if self._line is not None:
+            line, self._line = self._line, None
+            yield from self._property(line)
+
+    def _property(self, line: str) -> Iterator[IcsEvent]:
+        name, separator, value = line.partition(':')
+        if not separator:
+            return
+        name = name.split(';', 1)[0].upper()
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            self._event = {}
+        elif name == 'END' and value.upper() == 'VEVENT' and self._event is not None:
+            event, self._event = self._event, None
+            if (start := event.get('DTSTART')) is not None:
+                end = max(event.get('DTEND') or start, start + timedelta(days=1))
+                yield start, end, event.get('SUMMARY', '')
+        elif self._event is not None:
+            if name in ('DTSTART', 'DTEND'):
+                try:
+                    self._event[name] = self._date(value, name == 'DTEND')
+                except ValueError:
+                    _LOGGER.debug(f'忽略日期格式不对的事件：{line}')
+                    self._event = None
+            elif name == 'SUMMARY':
+                self._event[name] = _ICS_ESCAPE.sub(lambda m: ' ' if m[1] in 'nN' else m[1], value).strip()
+
+    @staticmethod
+    def _date(value: str, is_end: bool) -> date:
+        """
+        DATE（20251001）或DATE-TIME（20251001T090000[Z]），结束时间不在零点时包含当天
+        :raises ValueError: 不是这两种格式
+        """
+        if not (value[:8].isdigit() and (len(value) == 8 or value[8:9] == 'T' and value[9:15].isdigit())):
+            raise ValueError(f'不是DATE或DATE-TIME：{value}')
+        day = date(int(value[0:4]), int(value[4:6]), int(value[6:8]))
+        if is_end and len(value) > 8 and value[9:15].strip('0'):
+            day += timedelta(days=1)
+        return day
+
+
+def parse_ics(lines: Iterable[str]) -> Iterator[IcsEvent]:
+    """
+    逐行解析iCalendar
+    :param lines: 文本行，如打开的文件
+    :return: (开始日期, 结束日期（不含）, 摘要)
+    """
+    reader = IcsReader()
+    for line in lines:
+        yield from reader.feed(line)
+    yield from reader.close()
+
+
+class IcsProvider(_ReaderProvider):
+    """
+    iCalendar数据源（本地文件或网址），适用于各类节假日订阅日历
+    摘要以“休”“放假”等结尾的为节假日，以“班”“上班”“补班”结尾的为调休上班日，其余全天事件按节假日处理
+    """
+    name: str = 'ics'
+    # 下载整个日历的超时时间（秒）
+    timeout: float = 60
+    # 摘要末尾的放假/上班标记，如“国庆节 休”“春节（班）”“劳动节补班”
+    marker = re.compile(r'[\s,，、(（\[【]*(补班|上班|班|放假|休息|休)[)）\]】]?\s*$')
+
+    def __init__(self, hass: HomeAssistant, source: str, session: aiohttp.ClientSession) -> None:
+        super().__init__(hass, source)
+        self.session = session
+
+    async def _async_read(self, year: int) -> dict:
+        if not is_url(self.source):
+            return await self.hass.async_add_executor_job(self._read_file, year)
+        holidays = {}
+        reader = IcsReader()
+        async with self.session.get(self.source, timeout=aiohttp.ClientTimeout(total=self.timeout)) as response:
+            response.raise_for_status()
+            async for line in response.content:
+                for event in reader.feed(line.decode('utf-8', errors='replace')):
+                    self._add(holidays, year, *event)
+        for event in reader.close():
+            self._add(holidays, year, *event)
+        return holidays
+
+    def _read_file(self, year: int) -> dict:
+        holidays = {}
+        with open(self.source, encoding='utf-8', errors='replace') as file:
+            for event in parse_ics(file):
+                self._add(holidays, year, *event)
+        return holidays
+
+    def _add(self, holidays: dict, year: int, start: date, end: date, summary: str) -> None:
+        """把事件中落在指定年度内的每一天写入holidays"""
+        first, last = max(start, date(year, 1, 1)), min(end, date(year + 1, 1, 1))
+        if first >= last:
+            return
+        match = self.marker.search(summary)
+        is_off_day = match is None or '班' not in match[1]
+        name = (summary[:match.start()] if match else summary).strip() or summary
+        for ordinal in range(first.toordinal(), last.toordinal()):
+            _entry(holidays, date.fromordinal(ordinal), name, is_off_day)
+
+
+def resolve_source(hass: HomeAssistant, source: str) -> str:
+    """网址原样返回，文件路径相对于HA的配置目录"""
+    return source if is_url(source) else hass.config.path(source)
+
+
+def create_provider(hass: HomeAssistant, options: dict) -> HolidayProvider:
+    """
+    按选项创建节假日数据源，默认为节假日api
+    :param hass:
+    :param options: 配置条目的选项
+    :return:
+    """
+    kind = options.get(CONF_HOLIDAY_PROVIDER, 'api')
+    source = (options.get(CONF_HOLIDAY_SOURCE) or '').strip()
+    if kind == 'json' and source:
+        return JsonFileProvider(hass, resolve_source(hass, source))
+    if kind == 'ics' and source:
+        return IcsProvider(hass, resolve_source(hass, source), async_get_clientsession(hass))
+    return HolidayFetcher(async_get_clientsession(hass), source if kind == 'api' and source else HOLIDAY_API)
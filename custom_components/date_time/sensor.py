@@ -1,38 +1,54 @@
-from datetime import datetime, timedelta
-from lunar_python import Lunar
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
 import logging
-from typing import Literal
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.components.sensor import SensorEntity, SensorDeviceClass, SensorStateClass
 from homeassistant.helpers.entity import EntityCategory
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.sun import get_astral_event_date
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.core import callback
-from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.event import async_track_point_in_time, async_track_time_change
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
-
-from .calc import RestDay
+from homeassistant.util import dt as dt_util
+
+from .metrics import collect
+from .solar_events import get_solar_cache
+from .watchdog import LoopWatchdog
+from .prefetch import HolidayPrefetcher
+from .periods import PeriodTable, compile_periods, parse_periods
+from .anniversary import AnniversaryEngine, AnniversaryRecord
+from .calc import RestDay, HolidayFetcher, HolidayProvider, FestivalIndex, HOLIDAY_CACHE
+from .providers import create_provider
+from .almanac import ALMANAC_CACHE
+from .solar_terms import get_terms, load_terms, terms_around
 from .const import *
 
 _LOGGER = logging.getLogger(__name__)
+# 性能指标传感器的监听上下文：每次刷新成功后都会通知，包括数据没有变化、其他实体都不通知的刷新
+METRICS_CONTEXT = "metrics"
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     """Set up sensor entity from config entry."""
-    coordinator = DateCoordinator(hass, config_entry.data, _LOGGER)
+    coordinator = DateCoordinator(hass, config_entry.data, _LOGGER, config_entry.options.get(
+        CONF_BLOCKING_THRESHOLD, DEFAULT_BLOCKING_THRESHOLD), create_provider(hass, config_entry.options))
+    config_entry.async_on_unload(coordinator.async_shutdown)
     await coordinator.async_config_entry_first_refresh()
-    entities: list[HolidaySensor | TimePeriodSensor | AnniversarySensor] = [
+    entities: list[HolidaySensor | TimePeriodSensor | SolarTermSensor | AnniversarySensor | RefreshMetricsSensor] = [
         HolidaySensor(coordinator),
-        TimePeriodSensor(hass, "当前时间段", config_entry.entry_id),
+        RefreshMetricsSensor(coordinator),
+        TimePeriodSensor(hass, "当前时间段", config_entry.entry_id, config_entry.options.get(CONF_TIME_PERIODS)),
+        SolarTermSensor(hass, config_entry.entry_id),
     ]
     # 有几条纪念日配置就建几个 AnniversarySensor
-    for entry in config_entry.data.get("anniversaries", []):
-        key = f"{entry['anniversary_name']}{entry['anniversary_type']}{entry['anniversary_date']}"
+    for key in dict.fromkeys(coordinator.anniversary_engine.keys):
         entities.append(AnniversarySensor(coordinator, key))
 
     async_add_entities(entities)
@@ -42,10 +58,52 @@ async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry, asyn
     hass.data[DOMAIN]['refreshable_sensor'] = coordinator
 
 
+@dataclass(frozen=True, slots=True)
+class HolidayData:
+    """节假日传感器的状态和属性，属性在刷新时组装一次，读取状态时直接返回"""
+    state: str
+    attributes: dict
+
+
+@dataclass(frozen=True, slots=True)
+class CoordinatorData:
+    """协调器一次刷新的结果，没有变化的部分沿用上一次的对象"""
+    holidays: HolidayData
+    # {纪念日的键（名字+类型+日期）: 数据}
+    anniversaries: dict[str, AnniversaryRecord]
+
+
 class DateCoordinator(DataUpdateCoordinator):
-    def __init__(self, hass: HomeAssistant, config, logger: logging.Logger):
-        super().__init__(hass, logger, name="holidays_anniversaries", update_interval=None)
+    def __init__(self, hass: HomeAssistant, config, logger: logging.Logger,
+                 blocking_threshold: float = DEFAULT_BLOCKING_THRESHOLD, provider: HolidayProvider = None):
+        super().__init__(hass, logger, name="holidays_anniversaries", update_interval=None, always_update=False)
         self.config = config  # 用来存放用户填的纪念日列表
+        # 节假日数据源，默认为节假日api；长期持有，保存条件请求的校验信息和上一次成功的数据
+        self.provider = provider or HolidayFetcher(async_get_clientsession(hass))
+        # 后台预取节假日数据，刷新本身不读取数据源
+        self.prefetcher = HolidayPrefetcher(hass, self.provider, on_update=self._async_holidays_fetched)
+        # 黄历缓存由所有配置条目共享，最后一个条目卸载时才停止预计算
+        ALMANAC_CACHE.async_attach(self)
+        # 从今天起13个月的节日索引，跨天后重建
+        self.festival_index: FestivalIndex | None = None
+        # 纪念日引擎，按下一次日期维护最小堆
+        self.anniversary_engine = AnniversaryEngine(config.get("anniversaries", []))
+        # 增量刷新：上一次计算纪念日、节假日时的输入，输入不变时直接沿用上一次的结果
+        self._anniversaries_inputs: tuple | None = None
+        self._holidays_inputs: tuple | None = None
+        # 本次刷新中数据有变化的监听上下文（"holidays"或纪念日的键），None表示通知全部监听者
+        self._changed_contexts: set | None = None
+        self._notified_success: bool | None = None
+        # 当天的农历、黄历、节日和节气，(日期, 数据)，跨天后重新计算
+        self._almanac: tuple[date, dict] | None = None
+        # 各刷新阶段的计时，占用事件循环超过阈值时告警
+        self.watchdog = LoopWatchdog(logger, blocking_threshold)
+        self._unsub_daily = None
+        # 最近一次刷新的性能指标，见metrics.collect
+        self.refresh_count: int = 0
+        self.last_refresh_time: datetime | None = None
+        self.last_refresh_duration: float | None = None
+        self.last_changed: int | None = None
         # self._update_task = None
 
     async def _async_schedule_daily(self, *args):
@@ -55,189 +113,228 @@ class DateCoordinator(DataUpdateCoordinator):
     async def async_config_entry_first_refresh(self) -> None:
         self.logger.info("first refresh entity config...")
         await self.async_refresh()
-        async_track_time_change(
+        self._unsub_daily = async_track_time_change(
             self.hass, self._async_schedule_daily, hour=2, minute=0, second=0
         )
+        self.prefetcher.async_start()
+
+    async def _async_holidays_fetched(self, year: int) -> None:
+        """后台取到节假日数据后，今年的数据需要刷新节假日传感器"""
+        if year == datetime.now().year:
+            await self.async_request_refresh()
 
-    async def _async_update_data(self) -> dict:
+    async def async_shutdown(self) -> None:
+        """
+        卸载时取消每天2:00的刷新和节假日数据的预取，并写入尚未保存的节假日数据；
+        没有其他配置条目使用黄历缓存时停止黄历的预计算
+        """
+        await super().async_shutdown()
+        self.prefetcher.async_stop()
+        ALMANAC_CACHE.async_detach(self)
+        if self._unsub_daily is not None:
+            self._unsub_daily()
+            self._unsub_daily = None
+        await HOLIDAY_CACHE.async_flush(self.hass)
+
+    async def _async_update_data(self) -> CoordinatorData:
         """
         实际更新状态的核心方法
+        只重新计算输入（日期、配置、节假日数据）有变化的部分，并按键比较结果，
+        没有变化的部分沿用上一次的对象，只通知数据有变化的实体
+        农历、纪念日等CPU密集的计算和文件读取在executor中并行执行，事件循环中只做比较和组装
         :return:
         """
+        self.watchdog.reset()
+        started = time.perf_counter()
         now = datetime.now()
-        anniversaries = await self._fetch_anniversaries(now)
-        holidays = await self._fetch_holidays(anniversaries, now)
-        self.logger.info("holidays and anniversaries has been refreshed already.")
-        return {
-            "holidays": holidays,
-            "anniversaries": anniversaries,  # 字典，键是名字+类型+日期，元素是 dict
-        }
+        today = now.date()
+        previous: CoordinatorData | None = self.data
+        changed = set()
+
+        anniversaries_inputs = (today, self.config)
+        jobs = {"holiday_file": self.watchdog.awaiting("holiday_file", HOLIDAY_CACHE.async_load(self.hass))}
+        if previous is None or anniversaries_inputs != self._anniversaries_inputs:
+            jobs["anniversaries"] = self._fetch_anniversaries(now)
+        if self._almanac is None or self._almanac[0] != today:
+            jobs["almanac"] = self._fetch_almanac(today)
+        results = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+
+        if "anniversaries" not in results:
+            anniversaries = previous.anniversaries
+        else:
+            with self.watchdog.on_loop("anniversaries_diff"):
+                old = previous.anniversaries if previous is not None else {}
+                anniversaries = {}
+                for key, value in results["anniversaries"].items():
+                    # 比较时不含更新时间
+                    if old.get(key) == value:
+                        anniversaries[key] = old[key]
+                    else:
+                        anniversaries[key] = value
+                        changed.add(key)
+                changed.update(old.keys() - anniversaries.keys())
+            self._anniversaries_inputs = anniversaries_inputs
+
+        holidays_inputs = (today, HOLIDAY_CACHE.version)
+        # 纪念日有变化时“下一个纪念日”等属性也可能变化，需要重新计算
+        if (previous is not None and not changed and holidays_inputs == self._holidays_inputs
+                and HOLIDAY_CACHE.get_year(today.year)):
+            holidays = previous.holidays
+        else:
+            holidays = await self._fetch_holidays(anniversaries, now)
+            old = previous.holidays if previous is not None else None
+            if old is not None and old.state == holidays.state and self._same(
+                    old.attributes, holidays.attributes, "更新时间"):
+                holidays = old
+            else:
+                changed.add("holidays")
+            self._holidays_inputs = (today, HOLIDAY_CACHE.version)
 
-    async def _fetch_holidays(self, anniversaries: dict, now: datetime = None) -> dict:
-        if now is None:
-            now = datetime.now()
-        solar = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        lunar = Lunar.fromDate(solar)
-        lunar_full = lunar.toFullString().split()
-        this_festival, next_festival = self.get_festival(str(solar.month * 100 + solar.day).zfill(4))
-        next_jieqi: dict = {
-            'date': datetime.strptime(lunar.getNextJieQi().getSolar().toString(), FORMAT_DATE),
-            'name': lunar.getNextJieQi().toString()
-        }
-        rest_day = RestDay(solar)
-        state = rest_day.query(solar)
-
-        next_anni_date = [(v['hint'], v['next_date']) for v in anniversaries.values()]
-        next_anni_date.sort(key=lambda x: x[1])
-        anniversary = '无' if next_anni_date[0][1] - now > timedelta(days=1) else next_anni_date[0][0]
-
-        attributes = {
-            '今天': f'{solar.strftime("%Y年%m月%d日")} {lunar_full[9]}',
-            '农历': f'{lunar_full[1]} {lunar_full[0].split('年')[1]}',
-            '周数': solar.isocalendar().week,
-            '节气': lunar.getJieQi() if lunar.getJieQi() else f'{lunar.getPrevJieQi().toString()}后',
-            '节假日': '无' if not this_festival else ' '.join(this_festival),
-            '纪念日/生日': anniversary,
-            '宜': '、'.join(lunar.getDayYi()),
-            '忌': '、'.join(lunar.getDayJi()),
-            '冲': lunar.getDayChongDesc(),
-            '煞': lunar.getDaySha(),
-            '更新时间': now.strftime(FORMAT_DATETIME_SHORT),
-            '下一个节假日': f'{next_festival['date'].strftime("%m月%d日")} {" ".join(next_festival['name'])}',
-            '下一个节气': f'{next_jieqi['date'].strftime("%m月%d日")} {next_jieqi['name']}',
-            '下一个纪念日': f'{next_anni_date[0][1].strftime("%m月%d日")} {next_anni_date[0][0]}'
-        }
-        return {'state': state, 'attributes': attributes}
+        self._changed_contexts = changed if previous is not None else None
+        self.refresh_count += 1
+        self.last_refresh_time = now
+        self.last_refresh_duration = round((time.perf_counter() - started) * 1000, 3)
+        self.last_changed = len(changed)
+        self.logger.info(f"holidays and anniversaries has been refreshed already, {len(changed)} changed.")
+        return CoordinatorData(holidays, anniversaries)
+
+    @staticmethod
+    def _same(old: dict, new: dict, volatile: str) -> bool:
+        """比较两份数据，忽略每次刷新都会变化的更新时间"""
+        return old.keys() == new.keys() and all(old[k] == new[k] for k in old if k != volatile)
 
-    def get_festival(self,
-                     q_date: str = None,
-                     q_dict: dict = None,
-                     q_date_type: Literal['all', 'solar', 'lunar'] = 'all'
-                     ) -> tuple[list, dict]:
+    @callback
+    def _async_refresh_finished(self) -> None:
         """
-        查询指定日期或今天的节假日，及下一个节假日（注：指定日期只能是今年的）
-        :param q_date: 查询的日期，默认为空，指定为今天，所有q_date均指阳历，除非指定了q_date_type为lunar，q_date需传入阴历日期
-        :param q_dict:
-        :param q_date_type:
-        :return:
+        always_update=False时，数据与上一次相同（没有任何变化）且成功/失败状态不变的刷新，基类不会调用async_update_listeners，
+        性能指标传感器在这里单独通知，刷新次数和耗时不会停在上一次数据变化时
         """
-        today = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
-        if q_date is None:
-            _date = Lunar.fromDate(today)
-            q_date_solar = str(today.month * 100 + today.day).zfill(4)
-            q_date_lunar = str(_date.getMonth() * 100 + _date.getDay()).zfill(4)
-        else:
-            _date = Lunar.fromDate(datetime(today.year, int(q_date[0:2]), int(q_date[2:4])))
-            q_date_solar = q_date
-            q_date_lunar = str(_date.getMonth() * 100 + _date.getDay()).zfill(4)
-
-        if q_date_type == 'all':
-            this_festival_solar, next_festival_solar = self.get_festival(q_date_solar, SOLAR_FESTIVAL, 'solar')
-            this_festival_lunar, next_festival_lunar = self.get_festival(q_date_lunar, LUNAR_FESTIVAL, 'lunar')
-            # 合并统计日的节日
-            this_festival = this_festival_lunar + this_festival_solar
-            # 选择下一个统计日
-            q_date_lunar = next_festival_lunar['date']
-            q_date_solar = next_festival_solar['date']
-            if q_date_lunar == q_date_solar:
-                next_festival = {
-                    'date': q_date_lunar,
-                    'name': next_festival_lunar['name'] + next_festival_solar['name']
-                }
-            elif q_date_lunar < q_date_solar:
-                next_festival = next_festival_lunar
-            else:
-                next_festival = next_festival_solar
-            return this_festival, next_festival
+        if self._changed_contexts == set() and self.last_update_success == self._notified_success:
+            self._changed_contexts = None
+            self._async_update_metrics()
 
-        else:
-            q_keys = [int(k) for k in q_dict.keys()]
-            q_date_int = int(q_date)
-            this_festival = []
-            # 查询统计日是否为节日
-            if q_date_int in q_keys:
-                this_festival = q_dict[str(q_date_int).zfill(4)]
-            else:
-                q_keys.append(q_date_int)  # 否则将q_date加入列表，计算排序后的位置
-            # 查询下一个节日
-            q_keys.sort()
-            index_next = 0 if q_keys[-1] == q_date_int else q_keys.index(q_date_int) + 1
-            date_string = str(q_keys[index_next]).zfill(4)
-            if q_date_type == 'lunar':
-                _date_s = Lunar.fromYmd(today.year, int(date_string[0:2]),
-                                        int(date_string[2:4])).getSolar().toString()
-                _date = datetime.strptime(_date_s, FORMAT_DATE)
-            else:
-                _date = datetime(today.year, int(date_string[0:2]), int(date_string[2:4]))
-            next_festival = {'date': _date, 'name': q_dict[date_string]}
-            return this_festival, next_festival
+    @callback
+    def async_update_listeners(self) -> None:
+        """
+        只通知数据有变化的实体；首次刷新或刷新成功/失败状态变化时通知全部实体
+        写入状态的耗时记为state_write阶段，性能指标传感器在最后通知以便包含这一阶段
+        """
+        changed = self._changed_contexts
+        notify_all = changed is None or self.last_update_success != self._notified_success
+        self._notified_success = self.last_update_success
+        self._changed_contexts = None
+        with self.watchdog.on_loop("state_write"):
+            for update_callback, context in list(self._listeners.values()):
+                if context != METRICS_CONTEXT and (notify_all or context is None or context in changed):
+                    update_callback()
+        self._async_update_metrics()
 
-    async def _fetch_anniversaries(self, now: datetime = None) -> dict:
-        anniversaries = {
-            f"{entry['anniversary_name']}{entry['anniversary_type']}{entry['anniversary_date']}": self.get_anni_attributes(
-                entry, now)
-            for entry in self.config.get("anniversaries", [])
-        }
-        return anniversaries
+    @callback
+    def _async_update_metrics(self) -> None:
+        """通知性能指标传感器"""
+        for update_callback, context in list(self._listeners.values()):
+            if context == METRICS_CONTEXT:
+                update_callback()
 
-    def get_anni_attributes(self, entry, now):
+    async def _fetch_holidays(self, anniversaries: dict[str, AnniversaryRecord], now: datetime = None) -> HolidayData:
+        """
+        组装节假日传感器的状态和属性，调用前应已加载节假日文件并计算当天的黄历
+        :param anniversaries: 纪念日数据
+        :param now: 当前时间
+        :return:
+        """
         if now is None:
             now = datetime.now()
         solar = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        anniversary_date = datetime.strptime(
-            entry['anniversary_date'], '%Y%m%d'
-        ).replace(hour=0, minute=0, second=0, microsecond=0)
-
-        _slug_string = slugify(f'{entry['anniversary_name']}{entry['anniversary_type']}')
-        entity_id = f'sensor.anniversary_{_slug_string}'
-        _is_solar = entry['date_type'] == '阳历'
-        next_date = self._next_day(anniversary_date, _is_solar, solar)
-        age = next_date.year - anniversary_date.year
-        if entry['anniversary_type'] == '纪念日':
-            hint = f'{entry['anniversary_name']}{age}周年纪念日'
-        else:
-            hint = f'{entry['anniversary_name']}{entry['date_type']}{age}岁生日',
-        attr = {
-            'entity_id': entity_id,
-            'name': f'{entry["anniversary_name"]}{entry["anniversary_type"]}',
-            'hint': hint,
-            'anniversary_name': entry['anniversary_name'],
-            'date_type': entry['date_type'],
-            'is_solar': entry['date_type'] == '阳历',
-            'anniversary_type': entry['anniversary_type'],
-            'next_date': next_date,
-            'age': age,
-            'date': anniversary_date,
-            'days_left': (next_date - solar).days,
-            'days': (solar - anniversary_date).days,
-            'update_time': now.strftime(FORMAT_DATETIME_SHORT)
-        }
-        return attr
+        if self._almanac is None or self._almanac[0] != solar.date():
+            await self._fetch_almanac(solar.date())
+        almanac = self._almanac[1]
+        with self.watchdog.on_loop("holidays"):
+            # 缺少今年的数据时先按周末规则计算，由预取调度在后台获取后再刷新
+            rest_day = RestDay(solar, auto_update=False)
+
+        with self.watchdog.on_loop("holidays_assemble"):
+            state = rest_day.query(solar)
+            # 最近的纪念日直接取引擎堆顶，没有配置纪念日时为None
+            if (nearest := self.anniversary_engine.peek()) is None:
+                anniversary = next_anniversary = '无'
+            else:
+                next_anni = anniversaries[self.anniversary_engine.keys[nearest[0]]]
+                anniversary = '无' if next_anni.days_left > 1 else next_anni.hint
+                next_anniversary = f'{nearest[1].strftime("%m月%d日")} {next_anni.hint}'
+
+            attributes = {
+                '今天': almanac['今天'],
+                '农历': almanac['农历'],
+                '周数': solar.isocalendar().week,
+                '节气': almanac['节气'],
+                '节假日': almanac['节假日'],
+                '纪念日/生日': anniversary,
+                '宜': almanac['宜'],
+                '忌': almanac['忌'],
+                '冲': almanac['冲'],
+                '煞': almanac['煞'],
+                '更新时间': now.strftime(FORMAT_DATETIME_SHORT),
+                '下一个节假日': almanac['下一个节假日'],
+                '下一个节气': almanac['下一个节气'],
+                '下一个纪念日': next_anniversary
+            }
+        return HolidayData(state, attributes)
+
+    async def _fetch_almanac(self, day: date) -> dict:
+        """
+        在executor中计算当天的农历、黄历、节日和节气，结果按日期缓存
+        :param day: 阳历日期
+        :return:
+        """
+        almanac = await self.watchdog.in_executor(self.hass, "almanac", self._compute_almanac, day)
+        self._almanac = (day, almanac)
+        # 每天第一次计算后在后台补齐之后days_ahead天的黄历
+        ALMANAC_CACHE.async_schedule_precompute(self.hass, day)
+        return almanac
 
-    @staticmethod
-    def _next_day(_date: datetime, _is_solar: bool = True, now: datetime = None) -> datetime:
+    def _compute_almanac(self, day: date) -> dict:
         """
-        根据纪念日的日期，计算最近的一次纪念日日期
+        当天的农历、黄历、节日和节气（阻塞，在executor中执行）
+        :param day: 阳历日期
         :return:
         """
+        # 黄历通常已由后台预计算，直接读缓存
+        almanac = ALMANAC_CACHE.lookup(day)
+        this_festival, next_festival = self.get_festival(day)
+        # 节气直接查预先计算的交节时刻表
+        (_, previous_term), today_term, (next_term_date, next_term) = terms_around(day).day_terms(day)
+        return {
+            '今天': almanac.today,
+            '农历': almanac.lunar,
+            '节气': today_term or f'{previous_term}后',
+            '节假日': '无' if not this_festival else ' '.join(this_festival),
+            '宜': '、'.join(almanac.yi),
+            '忌': '、'.join(almanac.ji),
+            '冲': almanac.chong,
+            '煞': almanac.sha,
+            '下一个节假日': f'{next_festival['date'].strftime("%m月%d日")} {" ".join(next_festival['name'])}',
+            '下一个节气': f'{next_term_date.strftime("%m月%d日")} {next_term}',
+        }
+
+    def get_festival(self, q_date: date = None) -> tuple[list, dict]:
+        """
+        查询指定日期或今天的节假日，及下一个节假日（可跨年）
+        :param q_date: 查询的阳历日期，默认为今天
+        :return: (当天的节日列表, {'date': 下一个节日的阳历日期, 'name': 节日列表})
+        """
+        today = date.today()
+        q_date = date.fromordinal((q_date or today).toordinal())
+        if self.festival_index is None or self.festival_index.start != today:
+            self.festival_index = FestivalIndex(today)
+        index = self.festival_index if self.festival_index.covers(q_date) else FestivalIndex(q_date)
+        return index.festivals_on(q_date), index.next_festival(q_date)
+
+    async def _fetch_anniversaries(self, now: datetime = None) -> dict:
         if now is None:
-            now = datetime.today().replace(hour=0, minute=0, second=0, microsecond=0)
-        if _is_solar:
-            _next_day = _date.replace(year=now.year)
-            if _next_day < now:  # _solar_date < today说明要计算下一年的日期
-                _next_day = _date.replace(year=now.year + 1)
-            return _next_day
-        else:
-            # 农历日期在腊月时会比阳历早一年，如1988年1月实际上是农历的1987年
-            _lunar_date = Lunar.fromYmd(now.year, _date.month, _date.day)
-            _solar_date = datetime.strptime(_lunar_date.getSolar().toString(), FORMAT_DATE)
-            if _solar_date < now:  # _solar_date < today说明要计算下一年的日期
-                _lunar_date = Lunar.fromYmd(now.year + 1, _date.month, _date.day)
-                _solar_date = datetime.strptime(_lunar_date.getSolar().toString(), FORMAT_DATE)
-            elif _solar_date > now:  # _solar_date > today说明大概率是腊月出生的人，在年初更新
-                _lunar_date = Lunar.fromYmd(now.year - 1, _date.month, _date.day)
-                _solar_date = datetime.strptime(_lunar_date.getSolar().toString(), FORMAT_DATE)
-            return _solar_date
+            now = datetime.now()
+        # 引擎只推进已经过去的纪念日，其余条目的倒数天数、纪念天数整体计算；农历换算在executor中执行
+        return await self.watchdog.in_executor(self.hass, "anniversaries", self.anniversary_engine.build, now)
 
 
 class TimePeriodSensor(SensorEntity):
@@ -245,11 +342,11 @@ class TimePeriodSensor(SensorEntity):
 
     _attr_icon = "mdi:sun-clock"
     _attr_entity_category = EntityCategory.DIAGNOSTIC
-    _attr_should_poll = True  # 启用轮询自动更新
+    _attr_should_poll = False  # 不轮询，只在时间段边界触发更新
     _attr_device_class = SensorDeviceClass.ENUM
     _attr_options = TIME_PERIOD_ENUM_VALUES
 
-    def __init__(self, hass, name, entry_id):
+    def __init__(self, hass, name, entry_id, periods: list = None):
         self._attr_extra_state_attributes = {}
         self._hass = hass
         self._attr_name = name
@@ -261,8 +358,17 @@ class TimePeriodSensor(SensorEntity):
         self._lighting_option = None
         self._voice_option = "DND"
         self._state = None
-        # 修复2：初始化时异步加载日出日落时间
-        self._hass.loop.create_task(self.async_update())
+        # 时间段定义只解析一次，选项中的配置已在选项流程中校验过，解析失败时退回默认配置
+        try:
+            self._specs = parse_periods(periods or TIME_PERIODS)
+        except ValueError as e:
+            _LOGGER.error(f'时间段配置无效，使用默认配置：{e}')
+            self._specs = parse_periods(TIME_PERIODS)
+        self._attr_options = list(dict.fromkeys(label for _, _, label in self._specs)) + ["初始化中", "未知错误"]
+        # 当天编译好的时间段表，每天只编译一次
+        self._table: PeriodTable | None = None
+        self._period_end: datetime | None = None
+        self._unsub_transition = None
 
     @property
     def native_value(self):
@@ -276,16 +382,42 @@ class TimePeriodSensor(SensorEntity):
     def unique_id(self):
         return self._attr_unique_id  # 关键：确保每个传感器唯一
 
+    async def async_added_to_hass(self) -> None:
+        """加入HA后计算当前时间段，并安排下一个边界的回调"""
+        await super().async_added_to_hass()
+        await self._async_refresh_period()
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._cancel_transition()
+
     async def async_update(self):
-        """异步更新数据（确保时区正确）"""
-        local_now = datetime.now(self.tz)
+        """手动刷新（homeassistant.update_entity）时重新计算当前时间段，并重新安排下一个边界"""
+        await self._async_refresh_period()
+
+    async def _async_on_boundary(self, now: datetime) -> None:
+        """到达时间段边界时由async_track_point_in_time调用，只有这里会写入状态"""
+        self._unsub_transition = None
+        await self._async_refresh_period(now)
+        self.async_write_ha_state()
+
+    def _cancel_transition(self) -> None:
+        if self._unsub_transition is not None:
+            self._unsub_transition()
+            self._unsub_transition = None
+
+    async def _async_refresh_period(self, now: datetime = None) -> None:
+        """计算当前时间段和属性，变化时触发date_time_period_changed事件，并安排下一个边界的回调"""
         self.tz = ZoneInfo(self._hass.config.time_zone) if self.tz is None else self.tz
-        # 日期变更时重新获取日出日落
-        if self._update_time is None or local_now.day != self._update_time.day:
+        # 边界回调可能比实际时间略早触发，取两者中较晚的一个
+        local_now = datetime.now(self.tz) if now is None else max(now.astimezone(self.tz), datetime.now(self.tz))
+        # 日期变更时重新获取日出日落，并重新计算当天的时间段
+        if self._update_time is None or local_now.date() != self._update_time.date():
             self._local_sun = await self.async_get_sun_time()
+            self._table = self._build_periods(local_now)
             self._update_time = local_now
 
-        self._state = self._time_period()
+        previous = self._state
+        self._state = self._time_period(local_now)
         for index, option_list in enumerate(LIGHTING_OPTION):
             if self._state in option_list[0]:
                 self._lighting_option = option_list[1]
@@ -299,56 +431,115 @@ class TimePeriodSensor(SensorEntity):
         else:
             self._voice_option = "DND"
         self._attr_extra_state_attributes = {
-            "日出时间": self._local_sun.get("sunrise").strftime(FORMAT_DATETIME),
-            "日落时间": self._local_sun.get("sunset").strftime(FORMAT_DATETIME),
+            **{
+                label: self._local_sun[event].strftime(FORMAT_DATETIME) if event in self._local_sun else "无"
+                for event, label in SOLAR_EVENT_LABELS
+            },
             "开灯选项": self._lighting_option,
             "语音打扰": self._voice_option,
             "更新时间": local_now.strftime(FORMAT_DATETIME_SHORT),
             "时间区间": f'[{self.period[0]}, {self.period[1]})'
         }
 
+        if previous is not None and previous != self._state:
+            self._hass.bus.async_fire(EVENT_PERIOD_CHANGED, {
+                "entity_id": self.entity_id,
+                "from": previous,
+                "to": self._state,
+                "start": self.period[0],
+                "end": self.period[1],
+            })
+
+        self._cancel_transition()
+        # 找不到时间段时（配置有缺口）最迟在下一个整点重新计算
+        next_point = self._period_end or local_now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        self._unsub_transition = async_track_point_in_time(self._hass, self._async_on_boundary, next_point)
+
     async def async_get_sun_time(self) -> dict:
-        """异步获取日出日落时间（修复时区转换）"""
+        """从全年太阳事件表中获取今天的太阳事件（本地时区），表只在位置变化或跨年时重新计算"""
         today = datetime.now(self.tz).date()  # 用本地日期
+        events = await get_solar_cache(self._hass).async_get_events(today)
+        return {name: moment.astimezone(self.tz) for name, moment in events.items()}
 
-        # 替换：用 async_add_executor_job 执行同步函数，避免阻塞事件循环
-        sunrise_utc = await self._hass.async_add_executor_job(
-            get_astral_event_date, self._hass, "sunrise", today
-        )
-        sunset_utc = await self._hass.async_add_executor_job(
-            get_astral_event_date, self._hass, "sunset", today
-        )
-
-        # 正确将UTC时间转换为本地时区
-        return {
-            "sunrise": sunrise_utc.astimezone(self.tz),
-            "sunset": sunset_utc.astimezone(self.tz)
-        }
+    def _build_periods(self, base_date: datetime) -> PeriodTable | None:
+        """编译指定日期的时间段表，日出日落导致时间段有缺口或重叠时返回None"""
+        try:
+            return compile_periods(self._specs, base_date.date(), self.tz, self._local_sun)
+        except ValueError as e:
+            _LOGGER.error(f'{base_date.date()}的时间段无法编译：{e}')
+            return None
 
-    def _time_period(self) -> str:
+    def _time_period(self, local_now: datetime = None) -> str:
         """输出时间段（基于正确的本地时间）"""
         if not self._local_sun:  # 确保日出日落时间已加载
             return "初始化中"
 
-        local_now = datetime.now(self.tz)
-        for start, end, label in TIME_PERIODS:
-            s = self.get_datetime(start, base_date=local_now)
-            e = self.get_datetime(end, base_date=local_now)
-            # 处理23:00 - 0:00
-            e = e + timedelta(days=1) if e < s else e
-            if s <= local_now < e:
-                self.period = (s.strftime('%H:%M'), e.strftime('%H:%M'))
-                return label
-        self.period = ("-1", "-1")
-        return "未知错误"
-
-    def get_datetime(self, raw_dt: str, base_date: datetime = None) -> datetime:
-        if raw_dt in self._local_sun.keys():
-            return self._local_sun[raw_dt]
-        if base_date is None:
-            base_date = datetime.now(self.tz)
-        dt = datetime.strptime(raw_dt, "%H:%M")
-        return base_date.replace(hour=dt.hour, minute=dt.minute, second=0, microsecond=0)
+        if local_now is None:
+            local_now = datetime.now(self.tz)
+        found = self._table.lookup(local_now) if self._table else None
+        if found is None:
+            self.period = ("-1", "-1")
+            self._period_end = None
+            return "未知错误"
+        start, end, label = found
+        self.period = (start.strftime('%H:%M'), end.strftime('%H:%M'))
+        self._period_end = end
+        return label
+
+
+class SolarTermSensor(SensorEntity):
+    """当前节气，在交节时刻切换状态"""
+
+    _attr_icon = "mdi:sun-angle"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False  # 不轮询，只在交节时刻触发更新
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = list(SOLAR_TERMS)
+
+    def __init__(self, hass, entry_id):
+        self._hass = hass
+        self._attr_name = "节气"
+        self._attr_unique_id = f"{entry_id}_solar_term"  # 唯一标识
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = {}
+        self._unsub_transition = None
+
+    async def async_added_to_hass(self) -> None:
+        """加入HA后计算当前节气，并安排下一次交节的回调"""
+        await super().async_added_to_hass()
+        await self._async_refresh_term()
+
+    async def async_will_remove_from_hass(self) -> None:
+        if self._unsub_transition is not None:
+            self._unsub_transition()
+            self._unsub_transition = None
+
+    async def _async_on_term(self, now: datetime) -> None:
+        """到达交节时刻时由async_track_point_in_time调用"""
+        self._unsub_transition = None
+        await self._async_refresh_term(now)
+        self.async_write_ha_state()
+
+    async def _async_refresh_term(self, now: datetime = None) -> None:
+        """查表得到当前节气和下一次交节，并安排下一次交节的回调"""
+        # 回调可能比交节时刻略早触发，取两者中较晚的一个
+        now = dt_util.utcnow() if now is None else max(now, dt_util.utcnow())
+        year = now.year
+        table = get_terms()
+        # 表需要覆盖前一年（年初的当前节气是上一年的冬至）和后一年（年末的下一个节气是明年的小寒）
+        if table is None or not table.covers(year - 1, year + 1):
+            table = await self._hass.async_add_executor_job(load_terms, year - 1, year + 1)
+        start, name = table.current_term(now)
+        next_start, next_name = table.next_term(now)
+        self._attr_native_value = name
+        self._attr_extra_state_attributes = {
+            "交节时间": dt_util.as_local(start).strftime(FORMAT_DATETIME),
+            "下一个节气": next_name,
+            "下一个交节时间": dt_util.as_local(next_start).strftime(FORMAT_DATETIME),
+        }
+        if self._unsub_transition is not None:
+            self._unsub_transition()
+        self._unsub_transition = async_track_point_in_time(self._hass, self._async_on_term, next_start)
 
 
 class HolidaySensor(CoordinatorEntity, SensorEntity):
@@ -360,7 +551,7 @@ class HolidaySensor(CoordinatorEntity, SensorEntity):
     _attr_options = HOLIDAY_STATE_ENUM_VALUES
 
     def __init__(self, coordinator: DateCoordinator):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context="holidays")
         self.update_time = datetime.now()
         self._attr_unique_id = "holiday_sensor"  # 唯一标识
         self._attr_name = 'Holiday'
@@ -371,11 +562,11 @@ class HolidaySensor(CoordinatorEntity, SensorEntity):
 
     @property
     def native_value(self):
-        return self.coordinator.data["holidays"].get("state")
+        return self.coordinator.data.holidays.state
 
     @property
     def extra_state_attributes(self):
-        return self.coordinator.data["holidays"].get("attributes")
+        return self.coordinator.data.holidays.attributes
 
     @property
     def unique_id(self):
@@ -395,44 +586,84 @@ class AnniversarySensor(CoordinatorEntity, SensorEntity):
     _attr_state_class = SensorStateClass.MEASUREMENT
 
     def __init__(self, coordinator: DateCoordinator, key):
-        super().__init__(coordinator)
+        super().__init__(coordinator, context=key)
         self.key = key
         self._attr_unique_id = slugify(self.key)  # 唯一标识
+        self._record: AnniversaryRecord | None = None
+        self._update_from_record()
 
     @property
-    def name(self):
-        data = self.coordinator.data
-        if not data:
-            return f'{self.key} loading...'
-        try:
-            return data["anniversaries"][self.key]["name"]
-        except(KeyError, TypeError):
-            return f'{self.key} Unknown'
+    def unique_id(self):
+        return self._attr_unique_id  # 关键：确保每个传感器唯一
 
-    @property
-    def native_value(self):
+    def _update_from_record(self) -> None:
+        """数据变化时生成一次名称、状态和属性，之后每次读取状态都直接返回"""
         data = self.coordinator.data
-        if not data:
-            return f'{self.key} loading...'
-        try:
-            return data["anniversaries"][self.key]["days"]
-        except(KeyError, TypeError):
-            return f'{self.key} Unknown'
+        record = data.anniversaries.get(self.key) if data is not None else None
+        if record is not None and record is self._record:
+            return
+        self._record = record
+        if record is None:
+            self._attr_name = f'{self.key} loading...' if data is None else f'{self.key} Unknown'
+            self._attr_native_value = None
+            self._attr_extra_state_attributes = {}
+        else:
+            self._attr_name = record.name
+            self._attr_native_value = record.days
+            self._attr_extra_state_attributes = record.attributes()
 
-    @property
-    def unique_id(self):
-        return self._attr_unique_id  # 关键：确保每个传感器唯一
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """只有本纪念日的数据有变化时才会被通知"""
+        self._update_from_record()
+        self.async_write_ha_state()
 
-    @property
-    def extra_state_attributes(self):
-        data = self.coordinator.data["anniversaries"][self.key]
-        if not data:
-            return {}
-        return {
-            "纪念年数": data.get('age'),
-            "纪念日期": data.get('date'),
-            "到期日期": data.get('next_date'),
-            "倒数天数": data.get('days_left'),
-            "纪念名称": data.get('hint'),
-            "更新时间": data.get('update_time')
+
+class RefreshMetricsSensor(CoordinatorEntity, SensorEntity):
+    """最近一次刷新的耗时，属性为各阶段耗时、节假日数据源的状态、下一次预取的时间和缓存命中率"""
+    _attr_icon = "mdi:timer-cog-outline"
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = "ms"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 1
+
+    def __init__(self, coordinator: DateCoordinator):
+        super().__init__(coordinator, context=METRICS_CONTEXT)
+        self._attr_unique_id = "date_time_refresh_metrics"  # 唯一标识
+        self._attr_name = "刷新耗时"
+        self._attr_native_value = None
+        self._attr_extra_state_attributes = {}
+
+    def _update_from_metrics(self) -> None:
+        """汇总指标，状态和属性只在这里组装一次，读取时直接返回"""
+        metrics = collect(self.hass, self.coordinator)
+        refresh, provider, caches = metrics["refresh"], metrics["provider"], metrics["caches"]
+        self._attr_native_value = refresh["duration_ms"]
+        self._attr_extra_state_attributes = {
+            "刷新时间": refresh["time"],
+            "刷新次数": refresh["count"],
+            "变化实体数": refresh["changed"],
+            "各阶段耗时": {stage: value["ms"] for stage, value in metrics["stages"].items()},
+            "占用事件循环": metrics["loop_blocked_ms"],
+            "节假日数据源": provider["provider"],
+            "节假日数据源状态": provider["status"],
+            "节假日数据源耗时": provider["latency_ms"],
+            "节假日数据源请求次数": provider["requests"],
+            "节假日预取": metrics["prefetch"]["next_poll"],
+            "农历缓存命中率": caches["lunar"],
+            "节假日文件命中率": caches["holiday_file"]["hit_ratio"],
+            "太阳事件命中率": caches["solar_events"]["hit_ratio"] if caches["solar_events"] else None,
+            "黄历缓存": f'{caches["almanac"]["size"]}天，至{caches["almanac"]["precomputed_until"]}',
+            "黄历缓存命中率": caches["almanac"]["hit_ratio"],
         }
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._update_from_metrics()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """每次刷新后重新汇总指标"""
+        self._update_from_metrics()
+        self.async_write_ha_state()
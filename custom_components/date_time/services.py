@@ -0,0 +1,188 @@
+"""Services for Date and Time Sensor integration."""
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+
+from .almanac import ALMANAC_CACHE
+from .calc import RestDay, FestivalIndex, HOLIDAY_CACHE, festivals_of
+from .const import (DOMAIN, FORMAT_DATE, SERVICE_QUERY_RANGE, SERVICE_COUNT_WORKDAYS, SERVICE_ADD_WORKDAYS,
+                    SERVICE_QUERY_ALMANAC, SERVICE_QUERY_DATES, MAX_QUERY_DAYS, MAX_ALMANAC_DAYS, MAX_BATCH_DATES)
+from .lunar_cache import lunar_text, solar_to_lunar
+from .solar_terms import terms_for_days
+
+QUERY_RANGE_SCHEMA = vol.Schema({
+    vol.Optional("start_date"): cv.date,
+    vol.Exclusive("end_date", "range_end"): cv.date,
+    vol.Exclusive("days", "range_end"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_QUERY_DAYS)),
+})
+COUNT_WORKDAYS_SCHEMA = vol.Schema({
+    vol.Optional("start_date"): cv.date,
+    vol.Required("end_date"): cv.date,
+})
+QUERY_ALMANAC_SCHEMA = vol.Schema({
+    vol.Optional("start_date"): cv.date,
+    vol.Exclusive("end_date", "range_end"): cv.date,
+    vol.Exclusive("days", "range_end"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_ALMANAC_DAYS)),
+})
+QUERY_DATES_SCHEMA = vol.Schema({
+    vol.Exclusive("dates", "dates_source"): vol.All(cv.ensure_list, [cv.date], vol.Length(min=1, max=MAX_BATCH_DATES)),
+    vol.Exclusive("start_date", "dates_source"): cv.date,
+    vol.Exclusive("end_date", "range_end"): cv.date,
+    vol.Exclusive("days", "range_end"): vol.All(vol.Coerce(int), vol.Range(min=1, max=MAX_BATCH_DATES)),
+})
+ADD_WORKDAYS_SCHEMA = vol.Schema({
+    vol.Optional("start_date"): cv.date,
+    vol.Required("days"): vol.All(vol.Coerce(int), vol.Range(min=-MAX_QUERY_DAYS, max=MAX_QUERY_DAYS)),
+})
+
+
+async def _async_rest_day(hass: HomeAssistant) -> RestDay:
+    """在executor中刷新节假日缓存后，构造不做任何文件读写的RestDay"""
+    await HOLIDAY_CACHE.async_load(hass)
+    return RestDay(dt_util.now().replace(tzinfo=None), auto_update=False)
+
+
+@contextmanager
+def _date_range_errors() -> Iterator[None]:
+    """推算出的日期或其年度索引超出date支持的范围（1—9999年）时，转为服务参数错误"""
+    try:
+        yield
+    except (OverflowError, ValueError) as e:
+        raise ServiceValidationError(f"日期超出支持的范围：{e}") from e
+
+
+def describe_dates(rest_day: RestDay, days: list[date], festival_index: FestivalIndex = None) -> dict[date, dict]:
+    """
+    批量查询日期的节假日、农历、节日和节气（阻塞，在executor中执行）
+    节假日查年度索引，农历查对照表，节气查交节时刻表，只计算日期所在的年份（年初、年末的日期还有相邻的年份）；
+    节日在festival_index的覆盖范围内查索引，其余日期直接按农历和阳历的月日查询，不为零散的日期重建索引
+    :param rest_day: 已加载节假日缓存的RestDay
+    :param days: 日期，可以重复、无序
+    :param festival_index: 可复用的节日索引，如协调器当天的索引
+    :return: {日期: 查询结果}
+    """
+    unique = sorted(set(days))
+    terms = terms_for_days(unique)
+    # 有名称的节假日：{年份: {年内序号: 名称}}
+    names: dict[int, dict[int, str]] = {}
+    results = {}
+    for day in unique:
+        if day.year not in names:
+            record = HOLIDAY_CACHE.record(day.year)
+            names[day.year] = dict(record.entries) if record is not None else {}
+        lunar_year, lunar_month, lunar_day = solar_to_lunar(day)
+        (_, previous_term), today_term, _ = terms[day.year].day_terms(day)
+        if festival_index is not None and festival_index.covers(day):
+            festivals = festival_index.festivals_on(day)
+        else:
+            festivals = festivals_of(day)
+        results[day] = {
+            "date": day.strftime(FORMAT_DATE),
+            "weekday": day.isoweekday(),
+            "state": rest_day.query(day),
+            "holiday": names[day.year].get(day.toordinal() - date(day.year, 1, 1).toordinal()),
+            "lunar": {
+                "year": lunar_year,
+                "month": abs(lunar_month),
+                "day": lunar_day,
+                "leap": lunar_month < 0,
+                "text": lunar_text(day),
+            },
+            "festivals": festivals,
+            "solar_term": today_term,
+            "solar_term_period": today_term or previous_term,
+        }
+    return results
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """注册节假日批量查询服务"""
+
+    async def async_query_range(call: ServiceCall) -> ServiceResponse:
+        rest_day = await _async_rest_day(hass)
+        start: date = call.data.get("start_date") or rest_day.now.date()
+        with _date_range_errors():
+            end: date = call.data.get("end_date") or start + timedelta(days=call.data.get("days", 30))
+            if not 0 <= (end - start).days <= MAX_QUERY_DAYS:
+                raise ServiceValidationError(f"查询区间必须在0到{MAX_QUERY_DAYS}天之间")
+            states = rest_day.query_range(start, end)
+        return {
+            "dates": [
+                {"date": (start + timedelta(days=offset)).strftime(FORMAT_DATE), "state": state}
+                for offset, state in enumerate(states)
+            ]
+        }
+
+    async def async_count_workdays(call: ServiceCall) -> ServiceResponse:
+        rest_day = await _async_rest_day(hass)
+        start: date = call.data.get("start_date") or rest_day.now.date()
+        end: date = call.data["end_date"]
+        if abs((end - start).days) > MAX_QUERY_DAYS:
+            raise ServiceValidationError(f"起止日期最多相隔{MAX_QUERY_DAYS}天")
+        with _date_range_errors():
+            return {"workdays": rest_day.count_workdays(start, end)}
+
+    async def async_add_workdays(call: ServiceCall) -> ServiceResponse:
+        rest_day = await _async_rest_day(hass)
+        start: date = call.data.get("start_date") or rest_day.now.date()
+        with _date_range_errors():
+            return {"date": rest_day.add_workdays(start, call.data["days"]).strftime(FORMAT_DATE)}
+
+    async def async_query_almanac(call: ServiceCall) -> ServiceResponse:
+        start: date = call.data.get("start_date") or dt_util.now().date()
+        with _date_range_errors():
+            end: date = call.data.get("end_date") or start + timedelta(days=call.data.get("days", 1))
+            if not 0 <= (end - start).days <= MAX_ALMANAC_DAYS:
+                raise ServiceValidationError(f"查询区间必须在0到{MAX_ALMANAC_DAYS}天之间")
+            # 预计算范围内的日期直接读缓存，其余日期在executor中计算，预计算范围之外的不放入缓存
+            almanacs = await hass.async_add_executor_job(ALMANAC_CACHE.lookup_range, start, end)
+        return {"dates": [almanac.as_dict() for almanac in almanacs]}
+
+    async def async_query_dates(call: ServiceCall) -> ServiceResponse:
+        started = time.perf_counter()
+        rest_day = await _async_rest_day(hass)
+        if "dates" in call.data:
+            if "end_date" in call.data or "days" in call.data:
+                raise ServiceValidationError("dates不能与end_date、days同时使用")
+            days: list[date] = call.data["dates"]
+        else:
+            start: date = call.data.get("start_date") or rest_day.now.date()
+            with _date_range_errors():
+                end: date = call.data.get("end_date") or start + timedelta(days=call.data.get("days", 7))
+            if not 1 <= (end - start).days <= MAX_BATCH_DATES:
+                raise ServiceValidationError(f"查询区间必须在1到{MAX_BATCH_DATES}天之间")
+            days = [start + timedelta(days=offset) for offset in range((end - start).days)]
+        # 协调器当天的节日索引覆盖今天起13个月，能覆盖时直接复用
+        coordinator = hass.data.get(DOMAIN, {}).get('refreshable_sensor')
+        with _date_range_errors():
+            results = await hass.async_add_executor_job(
+                describe_dates, rest_day, days, coordinator.festival_index if coordinator is not None else None
+            )
+        return {
+            "count": len(days),
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "dates": [results[day] for day in days],
+        }
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_QUERY_RANGE, async_query_range, QUERY_RANGE_SCHEMA, SupportsResponse.ONLY
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_COUNT_WORKDAYS, async_count_workdays, COUNT_WORKDAYS_SCHEMA, SupportsResponse.ONLY
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_ADD_WORKDAYS, async_add_workdays, ADD_WORKDAYS_SCHEMA, SupportsResponse.ONLY
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_QUERY_ALMANAC, async_query_almanac, QUERY_ALMANAC_SCHEMA, SupportsResponse.ONLY
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_QUERY_DATES, async_query_dates, QUERY_DATES_SCHEMA, SupportsResponse.ONLY
+    )
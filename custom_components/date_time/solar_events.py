@@ -0,0 +1,183 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：solar_events.py
+@文档说明：
+全年的太阳事件表：一次批量计算所在位置全年每天的曙光、日出、正午、日落、暮光和黄金时刻，
+以UTC时间戳数组保存在HA的存储中，按经纬度、海拔和时区作为键，只有位置变化或跨年时才重新计算
+"""
+import asyncio
+import logging
+from array import array
+from datetime import date, datetime, timezone
+
+from astral import SunDirection
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.sun import get_astral_location
+
+from .const import DOMAIN, SOLAR_EVENTS
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f'{DOMAIN}.solar_events'
+# 时间戳数组中表示当天没有该事件（极昼、极夜）
+MISSING: int = 0
+
+
+class SolarEventTable:
+    """
+    某个位置某一年的太阳事件表，每个事件一个按年内序号排列的UTC时间戳数组
+    """
+    __slots__ = ('key', 'year', 'first_ordinal', 'events')
+
+    def __init__(self, key: str, year: int, events: dict[str, array]) -> None:
+        self.key = key
+        self.year = year
+        self.first_ordinal = date(year, 1, 1).toordinal()
+        self.events = events
+
+    @classmethod
+    def compute(cls, location, elevation, key: str, year: int) -> 'SolarEventTable':
+        """
+        批量计算全年的太阳事件（阻塞，应在executor中执行）
+        :param location: astral的Location，时区为本地时区
+        :param elevation: 观测点海拔
+        :param key: 位置键
+        :param year: 年份
+        :return:
+        """
+        first_ordinal = date(year, 1, 1).toordinal()
+        days = date(year + 1, 1, 1).toordinal() - first_ordinal
+        events = {name: array('q', [MISSING]) * days for name in SOLAR_EVENTS}
+        for offset in range(days):
+            day = date.fromordinal(first_ordinal + offset)
+            moments = {}
+            try:
+                moments.update(location.sun(day, local=True, observer_elevation=elevation))
+            except ValueError:
+                # 极昼、极夜时astral无法一次给出全部事件，逐个计算
+                moments['noon'] = location.noon(day, local=True)
+                for name in ('dawn', 'sunrise', 'sunset', 'dusk'):
+                    try:
+                        moments[name] = getattr(location, name)(day, local=True, observer_elevation=elevation)
+                    except ValueError:
+                        continue
+            for direction, prefix in ((SunDirection.RISING, 'golden_morning'), (SunDirection.SETTING, 'golden_evening')):
+                try:
+                    moments[f'{prefix}_start'], moments[f'{prefix}_end'] = location.golden_hour(
+                        direction, day, local=True, observer_elevation=elevation
+                    )
+                except ValueError:
+                    continue
+            for name, moment in moments.items():
+                events[name][offset] = int(moment.timestamp())
+        return cls(key, year, events)
+
+    def get(self, day: date) -> dict[str, datetime]:
+        """
+        指定日期的太阳事件
+        :param day: 本地日期，需在本表的年份内
+        :return: {事件名称: UTC时间}，当天没有的事件不包含在内
+        """
+        offset = day.toordinal() - self.first_ordinal
+        return {
+            name: datetime.fromtimestamp(timestamps[offset], timezone.utc)
+            for name, timestamps in self.events.items() if timestamps[offset] != MISSING
+        }
+
+    def as_dict(self) -> dict:
+        return {'key': self.key, 'year': self.year, 'events': {name: list(values) for name, values in self.events.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SolarEventTable':
+        return cls(data['key'], data['year'], {name: array('q', values) for name, values in data['events'].items()})
+
+
+class SolarEventCache:
+    """
+    按HA实例共享的太阳事件表，先读存储，位置或年份不符时在executor中重新计算并保存
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._tables: dict[int, SolarEventTable] = {}
+        self._lock = asyncio.Lock()
+        self._stored_loaded: bool = False
+        # 命中统计：内存命中、从存储读取、重新计算的次数
+        self.hits: int = 0
+        self.store_loads: int = 0
+        self.computes: int = 0
+
+    def location_key(self) -> str:
+        """由经纬度、海拔和时区组成的位置键"""
+        config = self.hass.config
+        return f'{config.latitude:.4f},{config.longitude:.4f},{config.elevation},{config.time_zone}'
+
+    async def async_get_table(self, year: int) -> SolarEventTable:
+        """
+        获取指定年份的太阳事件表
+        :param year: 年份
+        :return:
+        """
+        key = self.location_key()
+        table = self._tables.get(year)
+        if table is not None and table.key == key:
+            self.hits += 1
+            return table
+        async with self._lock:
+            return await self._async_load_or_compute(key, year)
+
+    async def _async_load_or_compute(self, key: str, year: int) -> SolarEventTable:
+        table = self._tables.get(year)
+        if table is not None and table.key == key:
+            return table
+        if not self._stored_loaded:
+            self._stored_loaded = True
+            if (data := await self._store.async_load()) is not None:
+                for item in data.get('tables', []):
+                    stored = SolarEventTable.from_dict(item)
+                    self._tables[stored.year] = stored
+                table = self._tables.get(year)
+                if table is not None and table.key == key:
+                    self.store_loads += 1
+                    return table
+        self.computes += 1
+        location, elevation = get_astral_location(self.hass)
+        _LOGGER.info(f'computing solar events of {year} for {key}')
+        table = await self.hass.async_add_executor_job(SolarEventTable.compute, location, elevation, key, year)
+        # 只保留当前位置去年及以后的表
+        self._tables = {
+            stored_year: stored for stored_year, stored in self._tables.items()
+            if stored.key == key and stored_year >= year - 1
+        }
+        self._tables[year] = table
+        await self._store.async_save({'tables': [stored.as_dict() for stored in self._tables.values()]})
+        return table
+
+    def stats(self) -> dict:
+        """命中统计"""
+        total = self.hits + self.store_loads + self.computes
+        return {
+            'hits': self.hits,
+            'store_loads': self.store_loads,
+            'computes': self.computes,
+            'hit_ratio': round(self.hits / total, 3) if total else None,
+        }
+
+    async def async_get_events(self, day: date) -> dict[str, datetime]:
+        """
+        指定本地日期的太阳事件
+        :param day: 本地日期
+        :return: {事件名称: UTC时间}
+        """
+        return (await self.async_get_table(day.year)).get(day)
+
+
+def get_solar_cache(hass: HomeAssistant) -> SolarEventCache:
+    """获取HA实例共享的太阳事件缓存"""
+    data = hass.data.setdefault(DOMAIN, {})
+    if 'solar_events' not in data:
+        data['solar_events'] = SolarEventCache(hass)
+    return data['solar_events']
@@ -0,0 +1,215 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：solar_terms.py
+@文档说明：
+二十四节气的交节时刻表：连续若干个阳历年、每年24个节气的UTC时间戳按时间顺序保存在一个数组中，
+第i个时间戳对应SOLAR_TERMS[i % 24]
+表由lunar_python一次性计算一个年份窗口（阻塞，在executor中执行），之后的“当前节气”“上一个节气”
+“下一个节气”都只是对数组的二分查找；窗口不够时只计算缺少的年份，生成新的表替换旧表
+节气所在的日期按北京时间（UTC+8）计算，与lunar_python一致
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta, timezone
+from typing import Iterable
+
+from .const import SOLAR_TERMS
+
+# 节气日期所用的时区
+CHINA_TZ = timezone(timedelta(hours=8))
+# lunar_python的节气表中，农历年末的冬至（阳历当年12月）以拼音为键，与年初的冬至区分
+_YEAR_END_WINTER_SOLSTICE = 'DONG_ZHI'
+# 按日期查询时，表覆盖所在年份的前后几年
+WINDOW_YEARS: int = 1
+
+
+def _compute_year(year: int) -> list[int]:
+    """
+    一个阳历年24个节气的交节时刻（阻塞）
+    :param year: 阳历年
+    :return: 按SOLAR_TERMS顺序的UTC时间戳
+    """
+    from lunar_python import Lunar
+    # 农历year年正月初一在阳历year年1月下旬或2月，其节气表包含阳历year年的小寒到冬至
+    table = Lunar.fromYmd(year, 1, 1).getJieQiTable()
+    timestamps = []
+    for name in SOLAR_TERMS:
+        solar = table[_YEAR_END_WINTER_SOLSTICE if name == '冬至' else name]
+        moment = datetime(solar.getYear(), solar.getMonth(), solar.getDay(), solar.getHour(), solar.getMinute(),
+                          solar.getSecond(), tzinfo=CHINA_TZ)
+        timestamps.append(int(moment.timestamp()))
+    return timestamps
+
+
+def _day_start(day: date) -> int:
+    """北京时间当天零点的时间戳"""
+    return int(datetime(day.year, day.month, day.day, tzinfo=CHINA_TZ).timestamp())
+
+
+class SolarTermTable:
+    """
+    first_year到last_year（含）的节气时刻表，只读，可在多个线程中同时使用
+    """
+    __slots__ = ('first_year', 'last_year', 'timestamps')
+
+    def __init__(self, first_year: int, timestamps: array) -> None:
+        self.first_year = first_year
+        self.last_year = first_year + len(timestamps) // len(SOLAR_TERMS) - 1
+        self.timestamps = timestamps
+
+    def covers(self, first_year: int, last_year: int) -> bool:
+        return self.first_year <= first_year and last_year <= self.last_year
+
+    def term(self, index: int) -> tuple[datetime, str]:
+        """
+        表中第index个节气
+        :param index: 序号
+        :return: (交节时刻（北京时间）, 节气名称)
+        :raises ValueError: 超出表的范围
+        """
+        if not 0 <= index < len(self.timestamps):
+            raise ValueError(f'节气表只覆盖{self.first_year}—{self.last_year}年')
+        return datetime.fromtimestamp(self.timestamps[index], CHINA_TZ), SOLAR_TERMS[index % len(SOLAR_TERMS)]
+
+    def current_term(self, moment: datetime) -> tuple[datetime, str]:
+        """
+        指定时刻所处的节气，即此前（含）最近一次交节
+        :param moment: 带时区的时间
+        :return: (交节时刻（北京时间）, 节气名称)
+        """
+        return self.term(bisect_right(self.timestamps, moment.timestamp()) - 1)
+
+    def next_term(self, moment: datetime) -> tuple[datetime, str]:
+        """
+        指定时刻之后的下一次交节
+        :param moment: 带时区的时间
+        :return: (交节时刻（北京时间）, 节气名称)
+        """
+        return self.term(bisect_right(self.timestamps, moment.timestamp()))
+
+    def day_terms(self, day: date) -> tuple[tuple[date, str], str | None, tuple[date, str]]:
+        """
+        按日期查询节气，日期按北京时间
+        :param day: 阳历日期
+        :return: (此前最近的节气(日期, 名称), 当天的节气名称（不是节气时为None）, 当天或之后的第一个节气(日期, 名称))
+        """
+        index = bisect_left(self.timestamps, _day_start(day))
+        previous_moment, previous_name = self.term(index - 1)
+        next_moment, next_name = self.term(index)
+        today = next_name if next_moment.date() == day else None
+        return (previous_moment.date(), previous_name), today, (next_moment.date(), next_name)
+
+    def year_terms(self, year: int) -> list[tuple[datetime, str]]:
+        """
+        一个阳历年的24个节气
+        :param year: 阳历年，需在表的范围内
+        :return: [(交节时刻（北京时间）, 节气名称), ...]
+        """
+        first = (year - self.first_year) * len(SOLAR_TERMS)
+        return [self.term(index) for index in range(first, first + len(SOLAR_TERMS))]
+
+
+_terms: SolarTermTable | None = None
+_terms_lock = threading.Lock()
+
+
+def _build_table(first_year: int, last_year: int, reuse: SolarTermTable | None) -> SolarTermTable:
+    """
+    计算first_year到last_year的节气表（阻塞），reuse中已有的年份直接复制
+    :param first_year: 起始年份
+    :param last_year: 结束年份（含）
+    :param reuse: 已有的表，可以为None
+    :return:
+    """
+    timestamps = array('q')
+    for year in range(first_year, last_year + 1):
+        if reuse is not None and reuse.first_year <= year <= reuse.last_year:
+            start = (year - reuse.first_year) * len(SOLAR_TERMS)
+            timestamps.extend(reuse.timestamps[start:start + len(SOLAR_TERMS)])
+        else:
+            timestamps.extend(_compute_year(year))
+    return SolarTermTable(first_year, timestamps)
+
+
+def load_terms(first_year: int, last_year: int) -> SolarTermTable:
+    """
+    获取覆盖first_year到last_year的节气表（阻塞，在事件循环中应放到executor中执行）
+    已加载的表覆盖不到时与其合并为连续的年份范围，只计算缺少的年份
+    :param first_year: 起始年份
+    :param last_year: 结束年份（含）
+    :return:
+    """
+    global _terms
+    with _terms_lock:
+        table = _terms
+        if table is not None and table.covers(first_year, last_year):
+            return table
+        if table is not None:
+            first_year, last_year = min(first_year, table.first_year), max(last_year, table.last_year)
+        _terms = _build_table(first_year, last_year, table)
+        return _terms
+
+
+def terms_for_years(first_year: int, last_year: int, shared: SolarTermTable | None = None) -> SolarTermTable:
+    """
+    获取覆盖first_year到last_year的节气表（阻塞），已加载的表能覆盖时直接使用，否则单独计算、不保存，不会让共享的表增大
+    :param first_year: 起始年份
+    :param last_year: 结束年份（含）
+    :param shared: 已加载的表，默认为当前共享的表
+    :return:
+    """
+    if shared is None:
+        shared = _terms
+    if shared is not None and shared.covers(first_year, last_year):
+        return shared
+    return _build_table(first_year, last_year, shared)
+
+
+def terms_for_days(days: Iterable[date]) -> dict[int, SolarTermTable]:
+    """
+    为零散的日期获取节气表（阻塞），只计算日期所在的年份，以及年初、年末的日期查询上一个、下一个节气所需的相邻年份
+    已加载的表能覆盖的直接使用，其余年份单独计算、不保存：不会为了连续而计算中间的年份，也不会让共享的表增大
+    :param days: 阳历日期，可以重复、无序
+    :return: {年份: 覆盖该年份中这些日期的节气表}
+    """
+    # 年份 -> 需要覆盖的(起始年份, 结束年份)；小寒在1月6日前后、冬至在12月22日前后，各留几天余量
+    ranges: dict[int, tuple[int, int]] = {}
+    for day in days:
+        first_year = day.year - 1 if (day.month, day.day) <= (1, 10) else day.year
+        last_year = day.year + 1 if (day.month, day.day) >= (12, 18) else day.year
+        if day.year in ranges:
+            first_year, last_year = min(first_year, ranges[day.year][0]), max(last_year, ranges[day.year][1])
+        ranges[day.year] = first_year, last_year
+    shared = _terms
+    tables: dict[int, SolarTermTable] = {}
+    # 按年份把重叠或相邻的范围合成一段，每段一张表
+    segment: list[int] = []
+    segment_last = 0
+    for year in sorted(ranges) + [None]:
+        if year is not None and segment and ranges[year][0] <= segment_last + 1:
+            segment.append(year)
+            segment_last = max(segment_last, ranges[year][1])
+            continue
+        if segment:
+            tables.update(dict.fromkeys(segment, terms_for_years(ranges[segment[0]][0], segment_last, shared)))
+        if year is not None:
+            segment, segment_last = [year], ranges[year][1]
+    return tables
+
+
+def terms_around(day: date) -> SolarTermTable:
+    """
+    覆盖指定日期前后WINDOW_YEARS年的节气表（阻塞）
+    :param day: 阳历日期
+    :return:
+    """
+    return load_terms(day.year - WINDOW_YEARS, day.year + WINDOW_YEARS)
+
+
+def get_terms() -> SolarTermTable | None:
+    """
+    获取已加载的节气表，不做任何计算；尚未加载时返回None
+    :return:
+    """
+    return _terms
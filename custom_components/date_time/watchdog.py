@@ -0,0 +1,80 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：watchdog.py
+@文档说明：
+刷新阶段计时：记录每个阶段的耗时，以及是在事件循环中还是在executor中执行
+在事件循环中执行的阶段超过阈值时记录告警，便于发现阻塞事件循环的同步代码
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from homeassistant.core import HomeAssistant
+
+
+class LoopWatchdog:
+    """
+    一次刷新内各阶段的计时，每次刷新开始时调用reset
+    """
+
+    def __init__(self, logger: logging.Logger, threshold: float) -> None:
+        """
+        :param logger:
+        :param threshold: 告警阈值，单位毫秒
+        """
+        self.logger = logger
+        self.threshold = threshold
+        # 阶段名称 -> (耗时毫秒, 是否占用事件循环)
+        self.timings: dict[str, tuple[float, bool]] = {}
+
+    def reset(self) -> None:
+        self.timings = {}
+
+    def _record(self, stage: str, elapsed: float, on_loop: bool) -> None:
+        elapsed = round(elapsed * 1000, 3)
+        self.timings[stage] = (elapsed, on_loop)
+        if on_loop and elapsed > self.threshold:
+            self.logger.warning(f"refresh stage '{stage}' blocked the event loop for {elapsed:.1f}ms "
+                                f"(threshold {self.threshold}ms)")
+
+    @contextmanager
+    def on_loop(self, stage: str):
+        """
+        在事件循环中执行的同步阶段，with块内不能有await
+        :param stage: 阶段名称
+        :return:
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(stage, time.perf_counter() - start, True)
+
+    async def in_executor(self, hass: HomeAssistant, stage: str, target: Callable[..., Any], *args) -> Any:
+        """
+        在executor中执行阶段，只记录耗时，不占用事件循环
+        :param hass:
+        :param stage: 阶段名称
+        :param target: 同步函数
+        :param args: 参数
+        :return: target的返回值
+        """
+        start = time.perf_counter()
+        try:
+            return await hass.async_add_executor_job(target, *args)
+        finally:
+            self._record(stage, time.perf_counter() - start, False)
+
+    async def awaiting(self, stage: str, awaitable) -> Any:
+        """
+        等待协程并记录耗时，如网络请求
+        :param stage: 阶段名称
+        :param awaitable: 协程
+        :return:
+        """
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self._record(stage, time.perf_counter() - start, False)
@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：convert_holiday_json.py
+@文档说明：
+旧版holiday.json与holiday.bin（节假日数据的紧凑二进制格式）互相转换
+用法：python scripts/convert_holiday_json.py [输入] [--output 路径]
+输入为.json时转换为holiday.bin，输入为.bin时还原为json，便于查看和比对
+文件格式见custom_components/date_time/holiday_store.py
+"""
+import argparse
+import importlib
+import json
+import os.path
+import sys
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_DIR = os.path.join(ROOT, 'custom_components', 'date_time')
+
+
+def _load_format():
+    """以不执行__init__.py的空包加载holiday_store.py及其依赖的const.py，避免导入依赖homeassistant的集成包"""
+    package = types.ModuleType('_date_time')
+    package.__path__ = [PACKAGE_DIR]
+    sys.modules.setdefault('_date_time', package)
+    return importlib.import_module('_date_time.holiday_store')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='holiday.json与holiday.bin互相转换')
+    parser.add_argument('input', nargs='?', default=os.path.join(PACKAGE_DIR, 'holiday.json'))
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    fmt = _load_format()
+    with open(args.input, 'rb') as file:
+        raw = file.read()
+    if args.input.endswith('.bin'):
+        data = json.dumps(fmt.to_json(fmt.HolidayStore(raw)), ensure_ascii=False, indent=2).encode('utf-8')
+        output = args.output or os.path.splitext(args.input)[0] + '.json'
+    else:
+        data = fmt.from_json(raw)
+        output = args.output or os.path.splitext(args.input)[0] + '.bin'
+    with open(output, 'wb') as file:
+        file.write(data)
+    print(f'{args.input}: {len(raw)} bytes -> {output}: {len(data)} bytes')
+
+
+if __name__ == '__main__':
+    main()
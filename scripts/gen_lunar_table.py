@@ -0,0 +1,70 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：gen_lunar_table.py
+@文档说明：
+用lunar_python生成custom_components/date_time/lunar_table.bin（农历/阳历对照表）
+用法：python scripts/gen_lunar_table.py [--first-year 1899] [--last-year 2100] [--output 路径]
+文件格式见custom_components/date_time/lunar_table.py
+"""
+import argparse
+import importlib.util
+import os.path
+from datetime import date
+
+from lunar_python import LunarYear, Solar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TABLE_MODULE = os.path.join(ROOT, 'custom_components', 'date_time', 'lunar_table.py')
+
+
+def _load_format():
+    """直接按文件加载lunar_table.py，避免导入依赖homeassistant的集成包"""
+    spec = importlib.util.spec_from_file_location('lunar_table', TABLE_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _ordinal(julian_day: float) -> int:
+    solar = Solar.fromJulianDay(julian_day)
+    return date(solar.getYear(), solar.getMonth(), solar.getDay()).toordinal()
+
+
+def build(first_year: int, last_year: int) -> bytes:
+    fmt = _load_format()
+    if first_year < fmt.BASE_YEAR or last_year - fmt.BASE_YEAR > 255:
+        raise SystemExit(f'年份范围必须在{fmt.BASE_YEAR}—{fmt.BASE_YEAR + 255}之间')
+    months = []
+    for year in range(first_year, last_year + 1):
+        # getMonths()包含上一年的冬月、腊月，只取属于本年的月份
+        months.extend(
+            (year, month.getMonth(), month.getDayCount(), _ordinal(month.getFirstJulianDay()))
+            for month in LunarYear.fromYear(year).getMonths() if month.getYear() == year
+        )
+    first_ordinal = months[0][3]
+    month_records = []
+    day_records = []
+    for year, month, days, ordinal in months:
+        if ordinal - first_ordinal != len(day_records):
+            raise SystemExit(f'农历{year}年{month}月与上一个月不连续')
+        month_records.append(fmt.MONTH_RECORD.pack(year, month, days, len(day_records)))
+        day_records.extend(fmt.DAY_RECORD.pack(year - fmt.BASE_YEAR, month, day) for day in range(1, days + 1))
+    header = fmt.HEADER.pack(fmt.MAGIC, fmt.VERSION, fmt.DAY_RECORD.size, first_ordinal, len(day_records),
+                             len(month_records))
+    return header + b''.join(month_records) + b''.join(day_records)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='生成农历/阳历对照表')
+    parser.add_argument('--first-year', type=int, default=1899)
+    parser.add_argument('--last-year', type=int, default=2100)
+    parser.add_argument('--output', default=_load_format().PATH)
+    args = parser.parse_args()
+    data = build(args.first_year, args.last_year)
+    with open(args.output, 'wb') as file:
+        file.write(data)
+    print(f'{args.output}: {len(data)} bytes')
+
+
+if __name__ == '__main__':
+    main()
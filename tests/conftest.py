@@ -0,0 +1,53 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：conftest.py
+@文档说明：
+测试的公共夹具：固定的2025年节假日数据和指向临时文件的节假日缓存
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from custom_components.date_time.calc import HOLIDAY_CACHE
+from custom_components.date_time.holiday_store import YearRecord, encode
+
+# 2025年的放假安排：(名称, (放假开始, 放假结束), (调休上班日, ...))
+HOLIDAYS_2025 = (
+    ('元旦', ('2025-01-01', '2025-01-01'), ()),
+    ('春节', ('2025-01-28', '2025-02-04'), ('2025-01-26', '2025-02-08')),
+    ('清明节', ('2025-04-04', '2025-04-06'), ()),
+    ('劳动节', ('2025-05-01', '2025-05-05'), ('2025-04-27',)),
+    ('端午节', ('2025-05-31', '2025-06-02'), ()),
+    ('国庆节,中秋节', ('2025-10-01', '2025-10-08'), ('2025-09-28', '2025-10-11')),
+)
+
+
+def holidays_2025() -> dict:
+    """按api的格式展开2025年的节假日数据"""
+    data = {}
+    for name, (first, last), workdays in HOLIDAYS_2025:
+        day, last = date.fromisoformat(first), date.fromisoformat(last)
+        while day <= last:
+            data[day.isoformat()] = {'date': day.isoformat(), 'name': name, 'isOffDay': True}
+            day += timedelta(days=1)
+        for workday in workdays:
+            data[workday] = {'date': workday, 'name': name, 'isOffDay': False}
+    return dict(sorted(data.items()))
+
+
+@pytest.fixture(scope='session')
+def holidays() -> dict:
+    return holidays_2025()
+
+
+@pytest.fixture
+def holiday_cache(tmp_path, monkeypatch):
+    """指向临时节假日文件的共享缓存，只包含2025年的数据，不会请求api"""
+    path = tmp_path / 'holiday.bin'
+    path.write_bytes(encode([YearRecord.from_holidays(2025, holidays_2025())]))
+    monkeypatch.setattr(HOLIDAY_CACHE, 'path', str(path))
+    monkeypatch.setattr(HOLIDAY_CACHE, 'seed_path', None)
+    monkeypatch.setattr(HOLIDAY_CACHE, 'legacy_path', None)
+    monkeypatch.setattr(HOLIDAY_CACHE, '_loaded', False)
+    HOLIDAY_CACHE.load()
+    return HOLIDAY_CACHE
@@ -0,0 +1,65 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_almanac.py
+@文档说明：
+黄历缓存：预计算范围之外的查询不放入缓存，不会挤掉预计算的黄历；黄历查询服务的区间检查
+"""
+from datetime import date, timedelta
+
+import pytest
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.date_time.almanac import AlmanacCache
+from custom_components.date_time.const import DOMAIN, MAX_ALMANAC_DAYS, SERVICE_QUERY_ALMANAC
+from custom_components.date_time.services import async_setup_services
+
+TODAY = date(2025, 6, 16)
+
+
+def test_far_range_keeps_precomputed_window():
+    cache = AlmanacCache(days_ahead=5, maxsize=5)
+    assert cache.precompute(TODAY) == 5
+    window = [TODAY + timedelta(days=offset) for offset in range(5)]
+
+    far = date(2030, 1, 1)
+    almanacs = cache.lookup_range(far, far + timedelta(days=10))
+    assert [almanac.day for almanac in almanacs] == [far + timedelta(days=offset) for offset in range(10)]
+    # 范围之外的日期只计算、不缓存，预计算的日期全部保留
+    assert len(cache) == 5
+    assert all(cache.get(day) is not None for day in window)
+    assert cache.get(far) is None
+
+    # 与预计算范围部分重叠的查询：范围内的命中缓存，范围外的不缓存
+    hits = cache.hits
+    almanacs = cache.lookup_range(TODAY + timedelta(days=3), TODAY + timedelta(days=8))
+    assert len(almanacs) == 5
+    assert cache.hits == hits + 2
+    assert len(cache) == 5
+
+
+def test_window_miss_is_cached():
+    cache = AlmanacCache(days_ahead=5, maxsize=5)
+    cache.precomputed_from = TODAY
+    cache.lookup_range(TODAY, TODAY + timedelta(days=2))
+    assert len(cache) == 2
+    assert not cache.in_window(TODAY - timedelta(days=1))
+    assert not cache.in_window(TODAY + timedelta(days=5))
+
+
+@pytest.mark.parametrize('data', [
+    {'start_date': date(9999, 12, 31), 'days': 2},
+    {'start_date': TODAY, 'end_date': TODAY - timedelta(days=1)},
+    {'start_date': TODAY, 'end_date': TODAY + timedelta(days=MAX_ALMANAC_DAYS + 1)},
+])
+async def test_query_almanac_bounds(hass, data):
+    async_setup_services(hass)
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(DOMAIN, SERVICE_QUERY_ALMANAC, data, blocking=True, return_response=True)
+
+
+async def test_query_almanac_near_upper_bound(hass):
+    # 结束日期不含，最后可查询到9999-12-30
+    async_setup_services(hass)
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_QUERY_ALMANAC, {'start_date': date(9999, 12, 30)}, blocking=True, return_response=True)
+    assert [item['date'] for item in response['dates']] == ['9999-12-30']
@@ -0,0 +1,78 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_anniversary.py
+@文档说明：
+纪念日引擎和ics导出共用的日期解析：农历纪念日按农历年月日保存，二月三十这类不是合法阳历日期的农历日期
+不会出错，在当月只有29天的年份落到当月最后一天；换算结果与lunar_python对比
+"""
+from datetime import date, datetime
+
+import pytest
+from lunar_python import Lunar
+
+from custom_components.date_time.anniversary import AnniversaryEngine, LunarDate, parse_origin
+from custom_components.date_time.ics_export import anniversary_events
+from custom_components.date_time.lunar_table import load_table
+
+# 农历1990年二月三十（阳历1990-03-26）；农历2025年的二月只有29天，2024年的二月有30天
+LUNAR_30TH = {'anniversary_name': '小明', 'date_type': '阴历', 'anniversary_type': '生日',
+              'anniversary_date': '19900230'}
+# 阳历闰日
+LEAP_DAY = {'anniversary_name': '小红', 'date_type': '阳历', 'anniversary_type': '纪念日',
+            'anniversary_date': '20000229'}
+
+
+def lunar_solar(year: int, month: int, day: int) -> date:
+    """不经过对照表，直接由lunar_python换算"""
+    solar = Lunar.fromYmd(year, month, day).getSolar()
+    return date(solar.getYear(), solar.getMonth(), solar.getDay())
+
+
+@pytest.fixture(autouse=True, scope='module')
+def lunar_table():
+    return load_table()
+
+
+def test_parse_origin():
+    assert parse_origin(LUNAR_30TH) == (LunarDate(1990, 2, 30), lunar_solar(1990, 2, 30))
+    assert parse_origin(LEAP_DAY) == (date(2000, 2, 29), date(2000, 2, 29))
+
+
+@pytest.mark.parametrize('today, expected', [
+    # 当年二月只有29天，取二月廿九
+    (date(2025, 3, 1), lunar_solar(2025, 2, 29)),
+    # 当年的二月三十存在
+    (date(2024, 3, 1), lunar_solar(2024, 2, 30)),
+])
+def test_engine_lunar_30th(today, expected):
+    engine = AnniversaryEngine([LUNAR_30TH, LEAP_DAY])
+    records = engine.build(datetime.combine(today, datetime.min.time()))
+    record = records['小明生日19900230']
+    origin = lunar_solar(1990, 2, 30)
+    assert record.origin == origin
+    assert record.next_date == expected
+    assert record.days_left == (expected - today).days
+    assert record.days == (today - origin).days
+    assert record.hint == f'小明阴历{expected.year - 1990}岁生日'
+    assert record.attributes()['纪念日期'] == datetime(1990, 3, 26)
+    # 阳历闰日已经过去，下一年是平年，取2月28日
+    assert records['小红纪念日20000229'].next_date == date(today.year + 1, 2, 28)
+
+
+def test_engine_advances_past_lunar_30th():
+    engine = AnniversaryEngine([LUNAR_30TH])
+    day = lunar_solar(2025, 2, 29)
+    engine.advance(day)
+    assert engine.peek() == (0, day)
+    # 过了当天，推进到下一年；农历2026年的二月也只有29天
+    assert engine.advance(date.fromordinal(day.toordinal() + 1)) == [0]
+    assert engine.peek() == (0, lunar_solar(2026, 2, 29))
+
+
+def test_ics_lunar_30th():
+    events = list(anniversary_events([LUNAR_30TH, LEAP_DAY], 2025))
+    day = lunar_solar(2025, 2, 29)
+    assert (day, date.fromordinal(day.toordinal() + 1), '小明阴历35岁生日', '生日') in events
+    assert (date(2025, 2, 28), date(2025, 3, 1), '小红25周年纪念日', '纪念日') in events
+    # 纪念日当年不导出
+    assert list(anniversary_events([LUNAR_30TH], 1990)) == []
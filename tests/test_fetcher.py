@@ -0,0 +1,152 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_fetcher.py
+@文档说明：
+HolidayFetcher对本地替身http服务的测试：200时记录ETag/Last-Modified、304时沿用上一次的数据、
+429/5xx时带退避重试、连接失败时返回已有数据
+"""
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from custom_components.date_time.calc import HolidayFetcher
+
+# pytest-homeassistant-custom-component默认禁用socket，替身服务只监听本机
+pytestmark = pytest.mark.usefixtures('socket_enabled')
+
+YEAR = 2025
+ETAG = '"holidays-2025-v1"'
+LAST_MODIFIED = 'Mon, 02 Dec 2024 08:00:00 GMT'
+HOLIDAYS = {
+    '2025-10-01': {'date': '2025-10-01', 'name': '国庆节,中秋节', 'isOffDay': True},
+    '2025-10-11': {'date': '2025-10-11', 'name': '国庆节,中秋节', 'isOffDay': False},
+}
+
+
+class StandIn:
+    """
+    节假日api的替身：按顺序返回预设的状态码，请求头与ETag匹配时返回304，记录收到的每个请求头
+    """
+
+    def __init__(self, statuses: tuple[int, ...] = (200,)) -> None:
+        self.statuses = list(statuses)
+        self.requests: list[dict] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests.append(dict(request.headers))
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        if status == 200 and request.headers.get('If-None-Match') == ETAG:
+            return web.Response(status=304)
+        if status == 200:
+            return web.json_response(HOLIDAYS, headers={'ETag': ETAG, 'Last-Modified': LAST_MODIFIED})
+        return web.Response(status=status)
+
+
+@pytest.fixture
+async def stand_in():
+    """启动替身服务，返回(替身, api地址)"""
+    api = StandIn()
+    app = web.Application()
+    app.router.add_get('/v1/holidays/{year}', api.handle)
+    server = TestServer(app)
+    await server.start_server()
+    yield api, str(server.make_url('/v1/holidays'))
+    await server.close()
+
+
+@pytest.fixture
+async def session():
+    async with aiohttp.ClientSession() as client:
+        yield client
+
+
+def make_fetcher(session: aiohttp.ClientSession, host_api: str) -> tuple[HolidayFetcher, list[float]]:
+    """退避时间缩短到毫秒级，并记录每次退避的时长"""
+    fetcher = HolidayFetcher(session, host_api)
+    fetcher.backoff_base = 0.001
+    fetcher.backoff_max = 0.01
+    delays = []
+    backoff = fetcher._backoff
+
+    def record(attempt: int) -> float:
+        delay = backoff(attempt)
+        delays.append(delay)
+        return delay
+
+    fetcher._backoff = record
+    return fetcher, delays
+
+
+async def test_ok_then_not_modified(stand_in, session):
+    api, host_api = stand_in
+    fetcher, delays = make_fetcher(session, host_api)
+
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+    assert fetcher.last_status == 200
+    assert 'If-None-Match' not in api.requests[0]
+
+    # 第二次请求带上校验信息，替身返回304，仍然得到上一次的数据
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+    assert fetcher.last_status == 304
+    assert api.requests[1]['If-None-Match'] == ETAG
+    assert api.requests[1]['If-Modified-Since'] == LAST_MODIFIED
+    assert fetcher.requests == 2
+    assert delays == []
+
+
+async def test_retry_with_backoff_on_server_error(stand_in, session):
+    api, host_api = stand_in
+    api.statuses = [503, 429, 500, 200]
+    fetcher, delays = make_fetcher(session, host_api)
+
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+    assert fetcher.last_attempts == 4
+    assert len(api.requests) == 4
+    # full jitter：第n次重试的退避在[0, min(上限, 基数*2^n)]内
+    assert len(delays) == 3
+    for attempt, delay in enumerate(delays, start=1):
+        assert 0 <= delay <= min(fetcher.backoff_max, fetcher.backoff_base * 2 ** attempt)
+
+
+async def test_server_error_keeps_last_good(stand_in, session):
+    api, host_api = stand_in
+    fetcher, delays = make_fetcher(session, host_api)
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+
+    api.statuses = [502]
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+    assert fetcher.last_status == 502
+    assert fetcher.last_attempts == fetcher.max_retries + 1
+    assert len(delays) == fetcher.max_retries
+
+
+async def test_not_published_is_not_retried(stand_in, session):
+    api, host_api = stand_in
+    api.statuses = [404]
+    fetcher, delays = make_fetcher(session, host_api)
+
+    assert await fetcher.async_fetch(YEAR + 1) is None
+    assert fetcher.last_status == 404
+    assert len(api.requests) == 1
+    assert delays == []
+
+
+async def test_connection_error(stand_in, session):
+    api, host_api = stand_in
+    fetcher, delays = make_fetcher(session, host_api)
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+
+    # 指向已关闭的端口：每次都连接失败，重试用尽后返回已有数据，没有数据的年度返回None
+    server = TestServer(web.Application())
+    await server.start_server()
+    closed_api = str(server.make_url('/v1/holidays'))
+    await server.close()
+    fetcher.host_api = closed_api
+
+    assert await fetcher.async_fetch(YEAR) == HOLIDAYS
+    assert fetcher.last_status == 'ClientConnectorError'
+    assert fetcher.last_attempts == fetcher.max_retries + 1
+    assert await fetcher.async_fetch(YEAR + 1) is None
+    assert len(api.requests) == 1
+    assert len(delays) == 2 * fetcher.max_retries
@@ -0,0 +1,143 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_holiday_store.py
+@文档说明：
+holiday.bin的编码与解码：与旧版holiday.json（data/holiday.json，由基线版本导出）逐日比对状态码、
+转换脚本的双向往返，以及写入在替换文件时被中断后原文件保持完整
+"""
+import json
+import os
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+from custom_components.date_time import holiday_store
+from custom_components.date_time.const import STATE_HOLIDAY, STATE_SHIFT_WORKDAY, STATE_WEEKEND, STATE_WORKDAY
+from custom_components.date_time.holiday_store import (
+    HolidayStore,
+    YearRecord,
+    encode,
+    from_json,
+    holiday_codes,
+    to_json,
+    write_atomic,
+)
+
+ROOT = Path(__file__).resolve().parents[1]
+LEGACY_JSON = Path(__file__).with_name('data') / 'holiday.json'
+SHIPPED_BIN = ROOT / 'custom_components' / 'date_time' / 'holiday.bin'
+SCRIPT = ROOT / 'scripts' / 'convert_holiday_json.py'
+
+
+@pytest.fixture(scope='module')
+def legacy() -> dict:
+    return json.loads(LEGACY_JSON.read_bytes())
+
+
+def expected_code(day: date, holidays: dict) -> int:
+    """不经过holiday_codes，直接由旧版json和星期推出一天的状态码"""
+    value = holidays.get(day.isoformat())
+    if value is not None:
+        return STATE_HOLIDAY if value['isOffDay'] else STATE_SHIFT_WORKDAY
+    return STATE_WEEKEND if day.weekday() >= 5 else STATE_WORKDAY
+
+
+def test_codes_match_legacy_json(legacy):
+    store = HolidayStore(from_json(LEGACY_JSON.read_bytes()))
+    assert store.years == sorted(int(year) for year in legacy)
+    for year, holidays in legacy.items():
+        record = store.record(int(year))
+        first = date(int(year), 1, 1)
+        # 2位打包后解出的每一天都与旧数据一致
+        assert [int(code) for code in record.codes] == [
+            expected_code(first + timedelta(days=offset), holidays) for offset in range(len(record.codes))
+        ]
+        assert record.codes == holiday_codes(int(year), holidays)
+        assert record.to_holidays() == holidays
+
+
+def test_json_round_trip(legacy):
+    raw = from_json(LEGACY_JSON.read_bytes())
+    assert to_json(HolidayStore(raw)) == legacy
+    # 随集成发布的holiday.bin就是由这份json转换得到的
+    assert raw == SHIPPED_BIN.read_bytes()
+
+
+@pytest.mark.parametrize('year', [2024, 2025, 9999])
+def test_packing_every_code(year):
+    # 覆盖闰年与非闰年的尾字节，4种状态码在每个位置都出现
+    days = 366 if year == 2024 else 365
+    codes = bytearray(offset * 7 // 3 % 4 for offset in range(days))
+    record = YearRecord(year, codes, [(0, '元旦'), (days - 1, '除夕')])
+    raw = encode([record])
+    assert len(holiday_store._pack(codes)) == (days + 3) // 4
+    decoded = HolidayStore(raw).record(year)
+    assert decoded.codes == codes
+    assert decoded.entries == record.entries
+
+
+def test_names_stored_once(legacy):
+    records = [YearRecord.from_holidays(int(year), holidays) for year, holidays in legacy.items()]
+    records.append(YearRecord(2026, holiday_codes(2026), [(0, '元旦')]))
+    store = HolidayStore(encode(records))
+    assert store.names.count('元旦') == 1
+    assert store.record(2026).to_holidays()['2026-01-01']['name'] == '元旦'
+
+
+@pytest.mark.parametrize('raw', [b'DTHD', b'XXXX' + bytes(6), holiday_store.HEADER.pack(b'DTHD', 99, 0, 0)])
+def test_rejects_foreign_files(raw):
+    with pytest.raises(ValueError):
+        HolidayStore(raw)
+
+
+def test_convert_script_both_ways(tmp_path, legacy):
+    source = tmp_path / 'holiday.json'
+    source.write_bytes(LEGACY_JSON.read_bytes())
+    subprocess.run([sys.executable, str(SCRIPT), str(source)], check=True, capture_output=True)
+    converted = tmp_path / 'holiday.bin'
+    assert converted.read_bytes() == SHIPPED_BIN.read_bytes()
+
+    restored = tmp_path / 'restored.json'
+    subprocess.run(
+        [sys.executable, str(SCRIPT), str(converted), '--output', str(restored)], check=True, capture_output=True,
+    )
+    assert json.loads(restored.read_bytes()) == legacy
+
+
+def test_write_atomic_interrupted_rename(tmp_path, monkeypatch):
+    path = tmp_path / 'holiday.bin'
+    path.write_bytes(b'old')
+
+    def interrupted(src, dst):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(os, 'replace', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        write_atomic(str(path), b'new')
+    # 目标文件保持原样，临时文件已删除
+    assert path.read_bytes() == b'old'
+    assert sorted(os.listdir(tmp_path)) == ['holiday.bin']
+
+
+def test_write_atomic_interrupted_sync(tmp_path, monkeypatch):
+    path = tmp_path / 'holiday.bin'
+    path.write_bytes(b'old')
+
+    def failed(descriptor):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'fsync', failed)
+    with pytest.raises(OSError):
+        write_atomic(str(path), b'new')
+    assert path.read_bytes() == b'old'
+    assert sorted(os.listdir(tmp_path)) == ['holiday.bin']
+
+
+def test_write_atomic_creates_directory(tmp_path):
+    path = tmp_path / 'storage' / 'holiday.bin'
+    write_atomic(str(path), b'new')
+    assert path.read_bytes() == b'new'
+    assert sorted(os.listdir(path.parent)) == ['holiday.bin']
@@ -0,0 +1,78 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_lunar_table.py
+@文档说明：
+农历对照表的月天数、闰月和三十日的换算规则：与lunar_python逐月对比，
+小月的三十落到当月最后一天，当年没有的闰月取同名的普通月；表之外的后备换算结果一致
+"""
+from datetime import date
+
+import pytest
+from lunar_python import Lunar, LunarMonth, LunarYear
+
+from custom_components.date_time import lunar_cache
+from custom_components.date_time.lunar_table import load_table
+
+
+def lunar_solar(year: int, month: int, day: int) -> date:
+    solar = Lunar.fromYmd(year, month, day).getSolar()
+    return date(solar.getYear(), solar.getMonth(), solar.getDay())
+
+
+@pytest.fixture(scope='module')
+def table():
+    table = load_table()
+    assert table is not None
+    return table
+
+
+def test_month_days(table):
+    for year in range(1900, 2101):
+        leap = LunarYear.fromYear(year).getLeapMonth()
+        for month in range(1, 13):
+            assert table.month_days(year, month) == LunarMonth.fromYm(year, month).getDayCount(), (year, month)
+        for month in range(1, 13):
+            expected = LunarMonth.fromYm(year, -month).getDayCount() if month == leap else None
+            assert table.month_days(year, -month) == expected, (year, -month)
+
+
+def test_30th_in_short_months(table):
+    short = 0
+    for year in range(1900, 2101):
+        for month in range(1, 13):
+            days = table.month_days(year, month)
+            resolved = table.resolve(year, month, 30)
+            assert resolved == lunar_solar(year, month, days), (year, month)
+            if days == 29:
+                short += 1
+                # 小月没有三十：直接换算报错，按纪念日的规则取廿九
+                with pytest.raises(ValueError):
+                    table.lunar_to_solar(year, month, 30)
+                assert resolved == table.lunar_to_solar(year, month, 29)
+    assert short > 1000
+
+
+@pytest.mark.parametrize('year, month, day', [
+    # 闰六月只有29天，闰六月三十落到闰六月廿九
+    (2025, -6, 30),
+    # 2024年没有闰月，闰六月取六月
+    (2024, -6, 30),
+    # 2023年有闰二月
+    (2023, -2, 15),
+])
+def test_leap_month_resolve(table, year, month, day):
+    target = month if LunarYear.fromYear(year).getLeapMonth() == -month else -month
+    expected = lunar_solar(year, target, min(day, LunarMonth.fromYm(year, target).getDayCount()))
+    assert table.resolve(year, month, day) == expected
+
+
+@pytest.mark.parametrize('year', [1990, 2024, 2025, 2026])
+def test_fallback_matches_table(table, monkeypatch, year):
+    # 对照表之外走lunar_python后备，结果与查表一致
+    expected = [lunar_cache.resolve_lunar(year, month, 30) for month in range(1, 13)]
+    lunar_cache.cache_clear()
+    monkeypatch.setattr(lunar_cache, 'get_table', lambda: None)
+    try:
+        assert [lunar_cache.resolve_lunar(year, month, 30) for month in range(1, 13)] == expected
+    finally:
+        lunar_cache.cache_clear()
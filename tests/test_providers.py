@@ -0,0 +1,137 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_providers.py
+@文档说明：
+节假日数据源的解析：iCalendar的折行、全天与带时间的DTSTART/DTEND、格式不对的输入，
+IcsProvider按摘要区分放假和调休上班，json数据源的顶层类型检查
+"""
+import json
+from datetime import date
+
+import pytest
+
+from custom_components.date_time.providers import IcsProvider, IcsReader, JsonFileProvider, parse_ics
+
+
+def ics(*events: str) -> list[str]:
+    """拼出一个完整的日历，每行以CRLF结尾"""
+    lines = ['BEGIN:VCALENDAR', 'VERSION:2.0']
+    for event in events:
+        lines += ['BEGIN:VEVENT', *event.split('\n'), 'END:VEVENT']
+    lines.append('END:VCALENDAR')
+    return [f'{line}\r\n' for line in lines]
+
+
+def test_folded_lines():
+    lines = ics('DTSTART;VALUE=DATE:20251001\nSUMMARY:国庆节\n  中秋节\n\t放假')
+    assert list(parse_ics(lines)) == [(date(2025, 10, 1), date(2025, 10, 2), '国庆节 中秋节放假')]
+
+
+def test_folded_line_split_anywhere():
+    # 折行可以出现在属性名、参数和值的任意位置
+    lines = ics('DTST\n ART;VALUE=DA\n TE:2025\n 0101\nSUMMARY:元旦')
+    assert list(parse_ics(lines)) == [(date(2025, 1, 1), date(2025, 1, 2), '元旦')]
+
+
+def test_escapes():
+    lines = ics('DTSTART;VALUE=DATE:20251001\nSUMMARY:国庆节\\,中秋节\\;休\\n')
+    assert list(parse_ics(lines)) == [(date(2025, 10, 1), date(2025, 10, 2), '国庆节,中秋节;休')]
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    # 全天事件：DTEND不含
+    ('DTSTART;VALUE=DATE:20251001', 'DTEND;VALUE=DATE:20251009', (date(2025, 10, 1), date(2025, 10, 9))),
+    # 全天事件没有DTEND时为一天
+    ('DTSTART;VALUE=DATE:20251001', '', (date(2025, 10, 1), date(2025, 10, 2))),
+    # 带时间的事件按日期处理，结束时间不在零点时包含结束当天
+    ('DTSTART:20251011T090000Z', 'DTEND:20251011T180000Z', (date(2025, 10, 11), date(2025, 10, 12))),
+    ('DTSTART;TZID=Asia/Shanghai:20251011T090000', 'DTEND;TZID=Asia/Shanghai:20251013T120000',
+     (date(2025, 10, 11), date(2025, 10, 14))),
+    # 结束在零点时不含结束当天
+    ('DTSTART:20251011T000000', 'DTEND:20251012T000000', (date(2025, 10, 11), date(2025, 10, 12))),
+    # 结束早于开始时至少为一天
+    ('DTSTART:20251011T090000', 'DTEND:20251010T090000', (date(2025, 10, 11), date(2025, 10, 12))),
+])
+def test_dtstart_dtend(start, end, expected):
+    lines = ics('\n'.join(line for line in (start, end, 'SUMMARY:补班') if line))
+    assert list(parse_ics(lines)) == [(*expected, '补班')]
+
+
+@pytest.mark.parametrize('dtstart', [
+    'DTSTART;VALUE=DATE:2025-10-01',
+    'DTSTART;VALUE=DATE:20251301',
+    'DTSTART;VALUE=DATE:2025',
+    'DTSTART:20251001X090000',
+    'DTSTART;VALUE=DATE:',
+])
+def test_malformed_event_is_dropped(dtstart):
+    # 日期格式不对的事件丢弃，前后的事件不受影响
+    lines = ics('DTSTART;VALUE=DATE:20250101\nSUMMARY:元旦',
+                f'{dtstart}\nSUMMARY:坏数据',
+                'DTSTART;VALUE=DATE:20250501\nSUMMARY:劳动节')
+    assert [summary for _, _, summary in parse_ics(lines)] == ['元旦', '劳动节']
+
+
+def test_malformed_structure():
+    lines = [
+        ' 开头的折行没有可以接上的行\r\n',
+        'END:VEVENT\r\n',
+        '没有冒号的行\r\n',
+        'BEGIN:VEVENT\r\n',
+        'SUMMARY:没有开始日期\r\n',
+        'END:VEVENT\r\n',
+        'BEGIN:VEVENT\r\n',
+        'DTSTART;VALUE=DATE:20250404\r\n',
+        'SUMMARY:清明节\r\n',
+        'END:VEVENT\r\n',
+        # 没有结束的事件
+        'BEGIN:VEVENT\r\n',
+        'DTSTART;VALUE=DATE:20250531\r\n',
+    ]
+    assert list(parse_ics(lines)) == [(date(2025, 4, 4), date(2025, 4, 5), '清明节')]
+
+
+def test_reader_emits_on_next_line():
+    # 逻辑行要等到下一行不是折行时才完整，END:VEVENT所在的事件在下一行或close时输出
+    reader = IcsReader()
+    assert list(reader.feed('BEGIN:VEVENT')) == []
+    assert list(reader.feed('DTSTART;VALUE=DATE:20250101')) == []
+    assert list(reader.feed('END:VEVENT')) == []
+    assert list(reader.close()) == [(date(2025, 1, 1), date(2025, 1, 2), '')]
+
+
+def test_ics_provider_markers(tmp_path):
+    path = tmp_path / 'holidays.ics'
+    path.write_text(''.join(ics(
+        'DTSTART;VALUE=DATE:20251231\nDTEND;VALUE=DATE:20260102\nSUMMARY:元旦 休',
+        'DTSTART;VALUE=DATE:20250928\nSUMMARY:国庆节（班）',
+        'DTSTART;VALUE=DATE:20251011\nSUMMARY:国庆节补班',
+        'DTSTART:20250531T080000\nDTEND:20250602T170000\nSUMMARY:端午节',
+        'DTSTART;VALUE=DATE:bad\nSUMMARY:坏数据 休',
+    )), encoding='utf-8')
+    provider = IcsProvider(None, str(path), None)
+    holidays = provider._read_file(2025)
+    assert holidays == {
+        '2025-05-31': {'date': '2025-05-31', 'name': '端午节', 'isOffDay': True},
+        '2025-06-01': {'date': '2025-06-01', 'name': '端午节', 'isOffDay': True},
+        '2025-06-02': {'date': '2025-06-02', 'name': '端午节', 'isOffDay': True},
+        '2025-09-28': {'date': '2025-09-28', 'name': '国庆节', 'isOffDay': False},
+        '2025-10-11': {'date': '2025-10-11', 'name': '国庆节', 'isOffDay': False},
+        '2025-12-31': {'date': '2025-12-31', 'name': '元旦', 'isOffDay': True},
+    }
+    # 跨年的事件只取落在该年度内的日期
+    assert provider._read_file(2026) == {'2026-01-01': {'date': '2026-01-01', 'name': '元旦', 'isOffDay': True}}
+
+
+@pytest.mark.parametrize('data', [[], '2025', {'2025': []}])
+def test_json_select_rejects_non_objects(data):
+    with pytest.raises(TypeError):
+        JsonFileProvider.select(data, 2025)
+
+
+async def test_json_provider_reports_type_error(hass, tmp_path):
+    path = tmp_path / 'holiday.json'
+    path.write_text(json.dumps([{'date': '2025-01-01'}]), encoding='utf-8')
+    provider = JsonFileProvider(hass, str(path))
+    assert await provider.async_fetch(2025) is None
+    assert provider.last_status == 'TypeError'
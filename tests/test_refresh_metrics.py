@@ -0,0 +1,41 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_refresh_metrics.py
+@文档说明：
+性能指标传感器在每次刷新后都更新：协调器的always_update=False，数据与上一次相同的刷新不会通知其他实体，
+但刷新次数、刷新时间仍要写入状态
+"""
+import logging
+
+from pytest_homeassistant_custom_component.common import MockEntityPlatform
+
+from custom_components.date_time.sensor import DateCoordinator, HolidaySensor, RefreshMetricsSensor
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def test_metrics_update_on_identical_refresh(hass, holiday_cache):
+    coordinator = DateCoordinator(hass, {'anniversaries': []}, _LOGGER)
+    await coordinator.async_refresh()
+    metrics, holidays = RefreshMetricsSensor(coordinator), HolidaySensor(coordinator)
+    await MockEntityPlatform(hass).async_add_entities([metrics, holidays])
+    holiday_writes = []
+    write_state = holidays.async_write_ha_state
+    holidays.async_write_ha_state = lambda: holiday_writes.append(write_state())
+    try:
+        first = hass.states.get(metrics.entity_id)
+        assert first.attributes['刷新次数'] == 1
+
+        # 两次刷新的数据完全相同：节假日传感器不写入状态，性能指标传感器每次都更新
+        for count in (2, 3):
+            data = coordinator.data
+            await coordinator.async_refresh()
+            await hass.async_block_till_done()
+            assert coordinator.data == data
+            assert coordinator.last_changed == 0
+            state = hass.states.get(metrics.entity_id)
+            assert state.attributes['刷新次数'] == count
+            assert state.attributes['变化实体数'] == 0
+        assert holiday_writes == []
+    finally:
+        await coordinator.async_shutdown()
@@ -0,0 +1,135 @@
+# -*- coding:utf-8 -*-
+"""
+@文档：test_workdays.py
+@文档说明：
+节假日年度索引上的区间查询、工作日统计和工作日推算，与逐日遍历的结果对比；以及相关服务的范围检查
+"""
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+import voluptuous as vol
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.date_time.calc import RestDay
+from custom_components.date_time.const import (DOMAIN, MAX_QUERY_DAYS, SERVICE_ADD_WORKDAYS, SERVICE_COUNT_WORKDAYS,
+                                               SERVICE_QUERY_RANGE)
+from custom_components.date_time.services import async_setup_services
+
+
+class Walk:
+    """不经过索引、逐日遍历的参照实现：api数据优先，其余按周末规则"""
+
+    def __init__(self, holidays: dict) -> None:
+        self.holidays = holidays
+
+    def is_workday(self, day: date) -> bool:
+        if (entry := self.holidays.get(day.isoformat())) is not None:
+            return not entry['isOffDay']
+        return day.weekday() < 5
+
+    def count(self, start: date, end: date) -> int:
+        if end < start:
+            return -self.count(end, start)
+        return sum(self.is_workday(start + timedelta(days=offset)) for offset in range((end - start).days))
+
+    def add(self, start: date, days: int) -> date:
+        step = 1 if days > 0 else -1
+        day, remaining = start, abs(days)
+        while remaining:
+            day += timedelta(days=step)
+            remaining -= self.is_workday(day)
+        return day
+
+
+@pytest.fixture
+def walk(holidays) -> Walk:
+    return Walk(holidays)
+
+
+@pytest.fixture
+def rest_day(holiday_cache) -> RestDay:
+    return RestDay(datetime(2025, 6, 16), auto_update=False, cache=holiday_cache)
+
+
+def test_query_range_matches_walk(rest_day, walk):
+    start, end = date(2024, 11, 1), date(2026, 3, 1)
+    states = rest_day.query_range(start, end)
+    assert len(states) == (end - start).days
+    for offset, state in enumerate(states):
+        day = start + timedelta(days=offset)
+        assert state == rest_day.query(day)
+        assert (state in ('工作日', '调休日')) == walk.is_workday(day)
+    assert rest_day.query(date(2025, 1, 26)) == '调休日'
+    assert rest_day.query(date(2025, 10, 1)) == '节假日'
+
+
+def test_count_workdays_matches_walk(rest_day, walk):
+    rng = random.Random(4)
+    first = date(2023, 6, 1)
+    for _ in range(300):
+        start = first + timedelta(days=rng.randrange(1200))
+        end = first + timedelta(days=rng.randrange(1200))
+        assert rest_day.count_workdays(start, end) == walk.count(start, end), (start, end)
+    # 跨年、空区间、反向区间
+    for start, end in ((date(2024, 12, 30), date(2025, 1, 3)), (date(2025, 5, 1), date(2025, 5, 1)),
+                       (date(2025, 2, 10), date(2025, 1, 20))):
+        assert rest_day.count_workdays(start, end) == walk.count(start, end), (start, end)
+    assert rest_day.count_workdays(date(2025, 5, 1), date(2025, 5, 1)) == 0
+
+
+def test_add_workdays_matches_walk(rest_day, walk):
+    rng = random.Random(5)
+    first = date(2024, 1, 1)
+    for _ in range(300):
+        start = first + timedelta(days=rng.randrange(1100))
+        days = rng.randint(-400, 400)
+        expected = start if days == 0 else walk.add(start, days)
+        assert rest_day.add_workdays(start, days) == expected, (start, days)
+    # 春节前后：调休上班日计入，假期跳过
+    assert rest_day.add_workdays(date(2025, 1, 24), 1) == date(2025, 1, 26)
+    assert rest_day.add_workdays(date(2025, 1, 27), 1) == date(2025, 2, 5)
+    assert rest_day.add_workdays(date(2025, 2, 5), -1) == date(2025, 1, 27)
+    # 跨年
+    assert rest_day.add_workdays(date(2024, 12, 31), 1) == date(2025, 1, 2)
+    assert rest_day.add_workdays(date(2025, 1, 2), -1) == date(2024, 12, 31)
+
+
+def test_year_9999(rest_day, walk):
+    start, end = date(9999, 1, 1), date(9999, 12, 31)
+    assert rest_day.count_workdays(start, end) == walk.count(start, end)
+    with pytest.raises(ValueError):
+        rest_day.add_workdays(date(9999, 12, 20), 30)
+
+
+async def call(hass, service: str, data: dict):
+    return await hass.services.async_call(DOMAIN, service, data, blocking=True, return_response=True)
+
+
+async def test_services_bounds(hass, holiday_cache, walk):
+    async_setup_services(hass)
+
+    response = await call(hass, SERVICE_COUNT_WORKDAYS, {'start_date': '2025-01-01', 'end_date': '2026-01-01'})
+    assert response == {'workdays': walk.count(date(2025, 1, 1), date(2026, 1, 1))}
+    response = await call(hass, SERVICE_ADD_WORKDAYS, {'start_date': '2025-09-30', 'days': 1})
+    assert response == {'date': '2025-10-09'}
+
+    limit = date(2025, 1, 1) + timedelta(days=MAX_QUERY_DAYS + 1)
+    with pytest.raises(ServiceValidationError):
+        await call(hass, SERVICE_COUNT_WORKDAYS, {'start_date': '2025-01-01', 'end_date': limit.isoformat()})
+    with pytest.raises(ServiceValidationError):
+        await call(hass, SERVICE_COUNT_WORKDAYS, {'start_date': limit.isoformat(), 'end_date': '2025-01-01'})
+    with pytest.raises(vol.Invalid):
+        await call(hass, SERVICE_ADD_WORKDAYS, {'start_date': '2025-01-01', 'days': MAX_QUERY_DAYS + 1})
+    with pytest.raises(vol.Invalid):
+        await call(hass, SERVICE_ADD_WORKDAYS, {'start_date': '2025-01-01', 'days': -MAX_QUERY_DAYS - 1})
+
+    # 超出date支持的范围：转为服务参数错误，而不是未处理的异常
+    with pytest.raises(ServiceValidationError):
+        await call(hass, SERVICE_ADD_WORKDAYS, {'start_date': '9999-06-01', 'days': 3000})
+    with pytest.raises(ServiceValidationError):
+        await call(hass, SERVICE_ADD_WORKDAYS, {'start_date': '0001-06-01', 'days': -3000})
+    with pytest.raises(ServiceValidationError):
+        await call(hass, SERVICE_QUERY_RANGE, {'start_date': '9999-12-01', 'days': 100})
+    response = await call(hass, SERVICE_COUNT_WORKDAYS, {'start_date': '9999-01-01', 'end_date': '9999-12-31'})
+    assert response == {'workdays': walk.count(date(9999, 1, 1), date(9999, 12, 31))}